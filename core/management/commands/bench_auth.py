@@ -0,0 +1,85 @@
+import base64
+import time
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.http import HttpResponse
+from django.test import RequestFactory
+from django.utils.module_loading import import_string
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework.request import Request
+from internal.authentication import get_profile_authenticators
+from internal.middleware import SkipApiRoutesMixin
+
+
+def legacy_middleware_class(path):
+    """Return the stock Django class behind one of our route-skipping wrappers."""
+    cls = import_string(path)
+    if issubclass(cls, SkipApiRoutesMixin):
+        return next(base for base in cls.__mro__[1:] if not issubclass(base, SkipApiRoutesMixin))
+    return cls
+
+
+def build_chain(classes):
+    def view(request):
+        return HttpResponse()
+
+    handler = view
+    hooks = []
+    for cls in reversed(classes):
+        handler = cls(handler)
+        if hasattr(handler, "process_view"):
+            hooks.insert(0, handler.process_view)
+
+    def run(request):
+        # Mirror BaseHandler: process_view hooks run before the innermost view
+        for hook in hooks:
+            hook(request, view, (), {})
+        return handler(request)
+    return run
+
+
+class Command(BaseCommand):
+    help = "Measure per-request CPU spent in authentication and middleware on API routes"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--iterations", type=int, default=2000)
+        parser.add_argument("--path", default="/manager/lesson")
+
+    def timed(self, label, func, iterations):
+        start = time.process_time()
+        for _ in range(iterations):
+            func()
+        elapsed = time.process_time() - start
+        self.stdout.write(f"{label:<40} {elapsed * 1e6 / iterations:10.1f} us/request")
+        return elapsed
+
+    def handle(self, *args, **options):
+        iterations = options["iterations"]
+        path = options["path"]
+        factory = RequestFactory()
+
+        # A mismatched header: wrong scheme with credentials that do not exist
+        credentials = base64.b64encode(b"nobody@example.com:wrong-password").decode()
+        bad_header = {"HTTP_AUTHORIZATION": f"Basic {credentials}"}
+
+        def authenticate(authenticators):
+            request = Request(factory.get(path, **bad_header))
+            for authenticator in authenticators:
+                try:
+                    if authenticator.authenticate(request) is not None:
+                        return
+                except AuthenticationFailed:
+                    return
+
+        self.stdout.write(f"Authentication, {iterations} requests to {path} with a bad Basic header")
+        legacy = self.timed("  all classes", lambda: authenticate(get_profile_authenticators("default")), iterations)
+        routed = self.timed("  route profile", lambda: authenticate(get_profile_authenticators("api")), iterations)
+        self.stdout.write(f"  saved {(legacy - routed) * 1e6 / iterations:.1f} us/request")
+
+        legacy_chain = build_chain([legacy_middleware_class(p) for p in settings.MIDDLEWARE])
+        routed_chain = build_chain([import_string(p) for p in settings.MIDDLEWARE])
+
+        self.stdout.write(f"Middleware, {iterations} requests to {path}")
+        legacy = self.timed("  stock chain", lambda: legacy_chain(factory.get(path)), iterations)
+        routed = self.timed("  route-skipping chain", lambda: routed_chain(factory.get(path)), iterations)
+        self.stdout.write(f"  saved {(legacy - routed) * 1e6 / iterations:.1f} us/request")
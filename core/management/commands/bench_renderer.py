@@ -0,0 +1,95 @@
+import datetime
+import time
+import uuid
+from decimal import Decimal
+from django.core.management.base import BaseCommand, CommandError
+from rest_framework.renderers import JSONRenderer
+from internal.renderers import ORJSONRenderer
+
+
+def lesson_list(size):
+    start = datetime.datetime(2025, 1, 6, 9, 0, tzinfo=datetime.timezone.utc)
+    return [
+        {
+            "code": f"L{index:07d}",
+            "start_time": (start + datetime.timedelta(hours=index)).isoformat(),
+            "end_time": start + datetime.timedelta(hours=index, minutes=45),
+            "course_name": "Private Swimming ว่ายน้ำ",
+            "course_uuid": str(uuid.uuid4()),
+            "teacher_name": "Somchai Jaidee",
+            "bookings": [
+                {
+                    "student_name": f"Student {index}-{seat}",
+                    "code": f"B{index:05d}{seat}",
+                    "check_in": "09:00:00",
+                    "check_out": None,
+                    "status": "COM",
+                }
+                for seat in range(3)
+            ],
+            "status": "CON",
+        }
+        for index in range(size)
+    ]
+
+
+def purchases(size):
+    return [
+        {
+            "uuid": uuid.uuid4(),
+            "student_name": "Nok Srisuk",
+            "teacher_name": "Somchai Jaidee",
+            "teacher_uuid": uuid.uuid4(),
+            "course_name": "Group Lesson",
+            "amount": Decimal("1500.00") + index,
+            "paid_price": 1499.5,
+            "registered_date": datetime.date(2025, 1, 1) + datetime.timedelta(days=index % 365),
+            "payment_status": "waiting",
+        }
+        for index in range(size)
+    ]
+
+
+def available_slots(size):
+    day = datetime.datetime(2025, 1, 6, 8, 0, tzinfo=datetime.timezone.utc)
+    return [
+        {"date": (day + datetime.timedelta(days=index // 16)).date(), "start": datetime.time(8 + index % 8, 30), "datetime": day + datetime.timedelta(minutes=30 * index)}
+        for index in range(size)
+    ]
+
+
+class Command(BaseCommand):
+    help = "Compare serialization throughput of DRF's JSONRenderer and ORJSONRenderer"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--size", type=int, default=1000)
+        parser.add_argument("--iterations", type=int, default=50)
+
+    def timed(self, renderer, data, iterations):
+        start = time.perf_counter()
+        for _ in range(iterations):
+            body = renderer.render(data)
+        return (time.perf_counter() - start) / iterations, body
+
+    def handle(self, *args, **options):
+        size, iterations = options["size"], options["iterations"]
+        payloads = {
+            "lessons": lesson_list(size),
+            "purchases": purchases(size),
+            "slots": available_slots(size * 10),
+        }
+        drf, fast = JSONRenderer(), ORJSONRenderer()
+
+        for name, data in payloads.items():
+            drf_time, drf_body = self.timed(drf, data, iterations)
+            fast_time, fast_body = self.timed(fast, data, iterations)
+            if drf_body != fast_body:
+                raise CommandError(f"{name}: ORJSONRenderer output differs from JSONRenderer")
+            megabytes = len(drf_body) / 1e6
+            self.stdout.write(
+                f"{name:<10} {len(drf_body):>9} bytes  "
+                f"drf {drf_time * 1000:8.2f} ms ({megabytes / drf_time:6.1f} MB/s)  "
+                f"orjson {fast_time * 1000:8.2f} ms ({megabytes / fast_time:6.1f} MB/s)  "
+                f"x{drf_time / fast_time:.1f}"
+            )
+        self.stdout.write(self.style.SUCCESS("Outputs are identical"))
@@ -0,0 +1,205 @@
+import json
+import random
+import secrets
+from datetime import timedelta
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.utils import timezone
+from core.models import User
+from school.models import School, Course
+from student.models import Booking, CourseRegistration, Student
+from teacher.models import Lesson, Teacher
+
+INDEX_NODE_TYPES = {"Index Scan", "Index Only Scan", "Bitmap Index Scan"}
+
+
+class Rollback(Exception):
+    """Raised to undo the seeded rows once the plans are captured."""
+
+
+def plan_nodes(plan):
+    """Every node of a JSON EXPLAIN plan, depth first."""
+    yield plan
+    for child in plan.get("Plans", []):
+        yield from plan_nodes(child)
+
+
+def table_indexes(model):
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT indexname FROM pg_indexes WHERE tablename = %s", [model._meta.db_table])
+        return {row[0] for row in cursor.fetchall()}
+
+
+def hot_queries(sample):
+    """(label, queryset, index we expect the planner to pick) for each hot query shape."""
+    now = timezone.now()
+    return [
+        (
+            "lesson conflicts",
+            Lesson.objects.filter(
+                teacher_id=sample["teacher_id"], status__in=["CON", "PENTE"],
+                datetime__lt=now + timedelta(hours=1), end_datetime__gt=now,
+            ),
+            "lesson_teacher_status_dt_idx",
+        ),
+        (
+            "upcoming lessons of a school",
+            Lesson.objects.filter(school_id=sample["school_id"], datetime__gte=now),
+            "lesson_school_datetime_idx",
+        ),
+        (
+            "lesson reminders",
+            Lesson.objects.filter(datetime__lte=now + timedelta(minutes=60), status="CON", notified=False),
+            "lesson_reminder_due_idx",
+        ),
+        (
+            "student bookings by status",
+            Booking.objects.filter(student_id=sample["student_id"], status="COM"),
+            "booking_student_status_idx",
+        ),
+        (
+            "lesson bookings by status",
+            Booking.objects.filter(lesson_id=sample["lesson_id"], status="COM"),
+            "booking_lesson_status_idx",
+        ),
+        (
+            "student registrations by payment",
+            CourseRegistration.objects.filter(student_id=sample["student_id"], payment_status="waiting"),
+            "reg_student_payment_idx",
+        ),
+        (
+            "user by phone and country",
+            User.objects.filter(phone_number=sample["phone_number"], country_code="66"),
+            "user_phone_country_idx",
+        ),
+    ]
+
+
+class Command(BaseCommand):
+    help = (
+        "EXPLAIN the hot query shapes and fail unless each one is served by an index. "
+        "Seeds data inside a transaction that is rolled back, unless --no-seed is given."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--schools", type=int, default=4)
+        parser.add_argument("--lessons", type=int, default=20000, help="Lessons per school")
+        parser.add_argument("--students", type=int, default=500, help="Students per school")
+        parser.add_argument("--no-seed", action="store_true", help="Explain against the existing rows")
+
+    def handle(self, *args, **options):
+        if connection.vendor != "postgresql":
+            raise CommandError("EXPLAIN checks need PostgreSQL.")
+
+        failures = []
+        try:
+            with transaction.atomic():
+                if not options["no_seed"]:
+                    self.seed(options["schools"], options["lessons"], options["students"])
+                failures = self.explain_all(self.sample())
+                raise Rollback
+        except Rollback:
+            pass
+
+        if failures:
+            raise CommandError(f"Not served by an index: {', '.join(failures)}")
+        self.stdout.write(self.style.SUCCESS("Every hot query uses an index."))
+
+    def sample(self):
+        """Ids to bind the hot queries to, taken from a busy corner of the data."""
+        lesson = Lesson.objects.filter(teacher__isnull=False, school__isnull=False).order_by("-id").first()
+        booking = Booking.objects.filter(student__isnull=False).select_related("student__user").order_by("-id").first()
+        if lesson is None or booking is None:
+            raise CommandError("No lessons or bookings to explain against; drop --no-seed.")
+        return {
+            "school_id": lesson.school_id,
+            "teacher_id": lesson.teacher_id,
+            "lesson_id": lesson.id,
+            "student_id": booking.student_id,
+            "phone_number": booking.student.user.phone_number,
+        }
+
+    def explain_all(self, sample):
+        failures = []
+        for label, queryset, expected in hot_queries(sample):
+            plan = json.loads(queryset.explain(format="json"))
+            nodes = list(plan_nodes(plan[0]["Plan"]))
+
+            table = queryset.model._meta.db_table
+            indexes = table_indexes(queryset.model)
+            used = [node["Index Name"] for node in nodes if node["Node Type"] in INDEX_NODE_TYPES and node["Index Name"] in indexes]
+            seq_scan = any(node["Node Type"] == "Seq Scan" and node.get("Relation Name") == table for node in nodes)
+
+            if seq_scan or not used:
+                failures.append(label)
+                self.stdout.write(self.style.ERROR(f"{label:<36} seq scan on {table}"))
+            elif expected not in used:
+                self.stdout.write(self.style.WARNING(f"{label:<36} {', '.join(used)} (expected {expected})"))
+            else:
+                self.stdout.write(f"{label:<36} {', '.join(used)}")
+        return failures
+
+    def seed(self, schools, lessons_per_school, students_per_school):
+        token = secrets.token_hex(2)
+        now = timezone.now()
+        numbers = iter(random.sample(range(10 ** 8, 10 ** 9), schools * (students_per_school + 20)))
+
+        def users(count, **fields):
+            return User.objects.bulk_create([
+                User(
+                    email=f"explain-{token}-{next_id}@example.com",
+                    phone_number=f"0{next_id}",
+                    **fields,
+                )
+                for next_id in (next(numbers) for _ in range(count))
+            ])
+
+        for school_index in range(schools):
+            school = School.objects.bulk_create([School(name=f"explain-{token}-{school_index}")])[0]
+            courses = Course.objects.bulk_create([
+                Course(name=f"course {i}", no_exp=True, school=school, is_group=i == 0) for i in range(5)
+            ])
+            teachers = Teacher.objects.bulk_create([Teacher(user=user, school=school) for user in users(20)])
+            students = Student.objects.bulk_create([
+                Student(user=user) for user in users(students_per_school, is_teacher=False)
+            ])
+            Student.school.through.objects.bulk_create([
+                Student.school.through(student=student, school=school) for student in students
+            ])
+            CourseRegistration.objects.bulk_create([
+                CourseRegistration(
+                    student=student, course=random.choice(courses), teacher=random.choice(teachers),
+                    payment_status=random.choices(["confirm", "waiting", "denied"], [90, 5, 5])[0],
+                )
+                for student in students for _ in range(2)
+            ])
+
+            lessons = []
+            for i in range(lessons_per_school):
+                start = now + timedelta(minutes=30 * random.randint(-8640, 2016))
+                lessons.append(Lesson(
+                    code=f"x{token}{school_index * lessons_per_school + i:07d}",
+                    datetime=start,
+                    end_datetime=start + timedelta(hours=1),
+                    status=random.choices(["PENTE", "CON", "COM", "CAN"], [5, 15, 70, 10])[0],
+                    course=random.choice(courses),
+                    school=school,
+                    teacher=random.choice(teachers),
+                    notified=start < now,
+                ))
+            lessons = Lesson.objects.bulk_create(lessons, batch_size=2000)
+            Booking.objects.bulk_create([
+                Booking(
+                    code=f"b{lesson.code[1:]}",
+                    lesson=lesson,
+                    school=school,
+                    student=random.choice(students),
+                    status=random.choices(["COM", "CAN", "MIS"], [85, 10, 5])[0],
+                )
+                for lesson in lessons
+            ], batch_size=2000)
+
+        # Give the planner statistics for the new rows
+        with connection.cursor() as cursor:
+            for model in (User, Lesson, Booking, CourseRegistration, Student):
+                cursor.execute(f'ANALYZE "{model._meta.db_table}"')
@@ -0,0 +1,27 @@
+from django.utils.functional import SimpleLazyObject
+from core.principal import get_principal
+from core.tokens import ClaimsUser
+
+
+def resolve_principal(request):
+    user = getattr(request, "user", None)
+    # JWT users were resolved from the principal cache on authentication
+    if isinstance(user, ClaimsUser):
+        return user.principal
+    return get_principal(user)
+
+
+class PrincipalMiddleware:
+    """
+    Attach a lazily resolved `request.principal` to every request.
+
+    The principal is evaluated on first access, so DRF views see the user
+    authenticated by their authentication classes (JWT included).
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        request.principal = SimpleLazyObject(lambda: resolve_principal(request))
+        return self.get_response(request)
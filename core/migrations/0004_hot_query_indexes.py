@@ -0,0 +1,17 @@
+# Generated by Django 4.2.13 on 2026-10-19 16:24
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0003_user_search_trgm'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='user',
+            index=models.Index(fields=['phone_number', 'country_code'], name='user_phone_country_idx'),
+        ),
+    ]
@@ -6,6 +6,8 @@ from django.db.models.fields import BooleanField
 from django.forms import IntegerField
 import uuid
 from django.db import models
+from django.contrib.postgres.indexes import GinIndex, OpClass
+from django.db.models.functions import Upper
 from django.utils.translation import gettext_lazy as _
 
 # Create your models here.
@@ -80,6 +82,16 @@ class User(AbstractBaseUser, PermissionsMixin):
     USERNAME_FIELD = "email"
     REQUIRED_FIELDS = ["first_name", "last_name", "phone_number", "profile_image"]
 
+    class Meta:
+        # Trigram indexes for core.search; icontains compares UPPER(column)
+        indexes = [
+            GinIndex(OpClass(Upper(field), name="gin_trgm_ops"), name=f"user_{field}_trgm_idx")
+            for field in ("first_name", "last_name", "email", "phone_number")
+        ] + [
+            # OTP login looks users up by phone and country code
+            models.Index(fields=["phone_number", "country_code"], name="user_phone_country_idx"),
+        ]
+
     def get_full_name(self):
         return f"{self.first_name} {self.last_name}"
 
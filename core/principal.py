@@ -0,0 +1,89 @@
+from dataclasses import dataclass
+from typing import Optional, Tuple
+from django.conf import settings
+from django.contrib.postgres.aggregates import ArrayAgg
+from django.core.cache import cache
+from core.models import User
+
+PRINCIPAL_CACHE_TIMEOUT = getattr(settings, "PRINCIPAL_CACHE_TIMEOUT", 60)
+
+
+@dataclass(frozen=True)
+class Principal:
+    """
+    The caller's role context, resolved once per request.
+    """
+    user_id: Optional[int] = None
+    is_teacher: bool = False
+    is_manager: bool = False
+    admin_id: Optional[int] = None
+    teacher_id: Optional[int] = None
+    student_id: Optional[int] = None
+    school_id: Optional[int] = None
+    school_ids: Tuple[int, ...] = ()
+
+    @property
+    def is_authenticated(self):
+        return self.user_id is not None
+
+
+ANONYMOUS = Principal()
+
+
+def principal_cache_key(user_id):
+    return f"principal:{user_id}"
+
+
+def load_principal(user_id):
+    """Build the principal for a user with a single query."""
+    row = User.objects.filter(id=user_id).values(
+        "is_teacher",
+        "is_manager",
+        "admin__id",
+        "admin__school_id",
+        "teacher__id",
+        "teacher__school_id",
+        "student__id",
+    ).annotate(
+        student_school_ids=ArrayAgg("student__school__id", distinct=True, ordering="student__school__id"),
+    ).first()
+    if row is None:
+        return ANONYMOUS
+
+    student_school_ids = tuple(school_id for school_id in row["student_school_ids"] if school_id is not None)
+    # Admin school wins over the teacher school; students fall back to their first school
+    school_id = row["admin__school_id"] or row["teacher__school_id"]
+    if school_id is None and student_school_ids:
+        school_id = student_school_ids[0]
+
+    return Principal(
+        user_id=user_id,
+        is_teacher=row["is_teacher"],
+        is_manager=row["is_manager"],
+        admin_id=row["admin__id"],
+        teacher_id=row["teacher__id"],
+        student_id=row["student__id"],
+        school_id=school_id,
+        school_ids=student_school_ids or ((school_id,) if school_id else ()),
+    )
+
+
+def cached_principal(user_id):
+    """Return the principal of a user id, cached for PRINCIPAL_CACHE_TIMEOUT."""
+    key = principal_cache_key(user_id)
+    principal = cache.get(key)
+    if principal is None:
+        principal = load_principal(user_id)
+        cache.set(key, principal, PRINCIPAL_CACHE_TIMEOUT)
+    return principal
+
+
+def get_principal(user):
+    """Return the cached principal for an authenticated user."""
+    if user is None or not user.is_authenticated:
+        return ANONYMOUS
+    return cached_principal(user.id)
+
+
+def invalidate_principal(user_id):
+    cache.delete(principal_cache_key(user_id))
@@ -0,0 +1,24 @@
+from django.contrib.postgres.search import TrigramSimilarity
+from django.db.models import Q
+from django.db.models.functions import Greatest
+
+SEARCH_FIELDS = ("first_name", "last_name", "email", "phone_number")
+MIN_SEARCH_LENGTH = 2
+
+
+def search_users(queryset, term, prefix=""):
+    """
+    Filter `queryset` to rows whose user matches `term`, best match first.
+
+    Matching is a case-insensitive substring test on each of SEARCH_FIELDS,
+    served by the pg_trgm indexes on core.User; rows are ranked by their best
+    trigram similarity. `prefix` is the path to the user, e.g. "user__".
+    """
+    fields = [f"{prefix}{name}" for name in SEARCH_FIELDS]
+
+    matches = Q()
+    for field in fields:
+        matches |= Q(**{f"{field}__icontains": term})
+
+    rank = Greatest(*(TrigramSimilarity(field, term) for field in fields))
+    return queryset.filter(matches).annotate(search_rank=rank).order_by("-search_rank", "pk")
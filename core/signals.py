@@ -0,0 +1,212 @@
+from django.db.models.signals import pre_save, post_save, pre_delete, post_delete, m2m_changed
+from django.dispatch import receiver
+from core.models import User
+from core.principal import invalidate_principal
+from internal.conditional import COURSES, STAFF, CLIENTS, touch_resource
+from manager.models import Admin
+from manager.metrics import bump, lesson_day
+from manager.rollups import mark_stale
+from school.config import invalidate_school_config
+from school.models import Course, School, SchoolSettings, Facilities
+from teacher.models import Teacher, Lesson
+from student.models import Student, Booking, CourseRegistration
+
+
+# Principal cache invalidation
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def invalidate_user_principal(sender, instance, **kwargs):
+    invalidate_principal(instance.id)
+
+
+@receiver(post_save, sender=Admin)
+@receiver(post_delete, sender=Admin)
+@receiver(post_save, sender=Teacher)
+@receiver(post_delete, sender=Teacher)
+@receiver(post_save, sender=Student)
+@receiver(post_delete, sender=Student)
+def invalidate_role_principal(sender, instance, **kwargs):
+    invalidate_principal(instance.user_id)
+
+
+@receiver(m2m_changed, sender=Student.school.through)
+def invalidate_student_school_principal(sender, instance, action, reverse, pk_set, **kwargs):
+    if action not in ("post_add", "post_remove", "pre_clear"):
+        return
+    if not reverse:
+        invalidate_principal(instance.user_id)
+        return
+    # School side of the relation: invalidate every affected student
+    students = Student.objects.filter(school=instance) if action == "pre_clear" else Student.objects.filter(id__in=pk_set)
+    for user_id in students.values_list("user_id", flat=True):
+        invalidate_principal(user_id)
+
+
+# List resource versions (ETag / Last-Modified)
+USER_LISTED_FIELDS = {"first_name", "last_name", "email", "phone_number", "profile_image", "is_manager"}
+
+
+@receiver(post_save, sender=Course)
+@receiver(post_delete, sender=Course)
+def touch_courses(sender, instance, **kwargs):
+    touch_resource(instance.school_id, COURSES)
+
+
+@receiver(post_save, sender=Teacher)
+@receiver(post_delete, sender=Teacher)
+def touch_staff(sender, instance, **kwargs):
+    touch_resource(instance.school_id, STAFF)
+
+
+@receiver(post_save, sender=Student)
+@receiver(pre_delete, sender=Student)
+def touch_clients(sender, instance, created=False, **kwargs):
+    # New students have no school yet; the m2m add below covers them
+    if created:
+        return
+    for school_id in instance.school.values_list("id", flat=True):
+        touch_resource(school_id, CLIENTS)
+
+
+@receiver(m2m_changed, sender=Student.school.through)
+def touch_client_schools(sender, instance, action, reverse, pk_set, **kwargs):
+    if action not in ("post_add", "post_remove", "pre_clear"):
+        return
+    if reverse:
+        touch_resource(instance.id, CLIENTS)
+        return
+    school_ids = instance.school.values_list("id", flat=True) if action == "pre_clear" else pk_set
+    for school_id in school_ids:
+        touch_resource(school_id, CLIENTS)
+
+
+@receiver(post_save, sender=User)
+def touch_user_lists(sender, instance, update_fields=None, **kwargs):
+    # Login bookkeeping (otp, pin, last_login) does not show up in any list
+    if update_fields is not None and not USER_LISTED_FIELDS.intersection(update_fields):
+        return
+    for school_id in Teacher.objects.filter(user_id=instance.id).values_list("school_id", flat=True):
+        touch_resource(school_id, STAFF)
+    for school_id in Student.school.through.objects.filter(student__user_id=instance.id).values_list("school_id", flat=True):
+        touch_resource(school_id, CLIENTS)
+
+
+# School config cache invalidation
+@receiver(post_save, sender=School)
+@receiver(post_delete, sender=School)
+def invalidate_school(sender, instance, **kwargs):
+    invalidate_school_config(instance.id)
+
+
+@receiver(post_save, sender=SchoolSettings)
+@receiver(post_delete, sender=SchoolSettings)
+def invalidate_school_settings(sender, instance, **kwargs):
+    for school_id in School.objects.filter(settings_id=instance.id).values_list("id", flat=True):
+        invalidate_school_config(school_id)
+
+
+@receiver(post_save, sender=Facilities)
+@receiver(post_delete, sender=Facilities)
+def invalidate_school_facilities(sender, instance, **kwargs):
+    invalidate_school_config(instance.school_id)
+
+
+# Denormalized school on lessons and bookings
+@receiver(post_save, sender=Course)
+def sync_course_school(sender, instance, created, **kwargs):
+    if created:
+        return
+    Lesson.objects.filter(course=instance).exclude(school_id=instance.school_id).update(school_id=instance.school_id)
+    Booking.objects.filter(lesson__course=instance).exclude(school_id=instance.school_id).update(school_id=instance.school_id)
+
+
+# Dashboard metrics (bulk writes bypass these; the nightly reconcile catches up)
+def school_deletion(origin):
+    """Whether a delete cascades from a school, whose metrics go with it."""
+    return isinstance(origin, School) or getattr(origin, "model", None) is School
+
+
+@receiver(pre_save, sender=CourseRegistration)
+def remember_registration_price(sender, instance, **kwargs):
+    instance._metrics_paid_price = None
+    if instance.pk is not None:
+        instance._metrics_paid_price = CourseRegistration.objects.filter(pk=instance.pk).values_list("paid_price", flat=True).first()
+
+
+@receiver(post_save, sender=CourseRegistration)
+def count_registration(sender, instance, created, **kwargs):
+    earnings = (instance.paid_price or 0) - (getattr(instance, "_metrics_paid_price", None) or 0)
+    bump(instance.course.school_id, instance.registered_date, purchases=int(created), earnings=earnings)
+
+
+@receiver(post_delete, sender=CourseRegistration)
+def uncount_registration(sender, instance, origin=None, **kwargs):
+    if school_deletion(origin):
+        return
+    bump(instance.course.school_id, instance.registered_date, purchases=-1, earnings=-(instance.paid_price or 0))
+
+
+@receiver(post_save, sender=Teacher)
+def count_teacher(sender, instance, created, **kwargs):
+    if created:
+        bump(instance.school_id, staffs=1)
+
+
+@receiver(post_delete, sender=Teacher)
+def uncount_teacher(sender, instance, origin=None, **kwargs):
+    if not school_deletion(origin):
+        bump(instance.school_id, staffs=-1)
+
+
+@receiver(m2m_changed, sender=Student.school.through)
+def count_client_schools(sender, instance, action, reverse, pk_set, **kwargs):
+    if action not in ("post_add", "post_remove", "pre_clear"):
+        return
+    sign = 1 if action == "post_add" else -1
+    # pre_clear runs while the links still exist
+    applied = action != "pre_clear"
+    if reverse:
+        count = instance.student.count() if action == "pre_clear" else len(pk_set)
+        bump(instance.id, already_applied=applied, clients=sign * count)
+        return
+    school_ids = list(instance.school.values_list("id", flat=True)) if action == "pre_clear" else pk_set
+    for school_id in school_ids:
+        bump(school_id, already_applied=applied, clients=sign)
+
+
+@receiver(pre_delete, sender=Student)
+def uncount_client(sender, instance, **kwargs):
+    # The school links are deleted without m2m_changed, and still exist here
+    for school_id in list(instance.school.values_list("id", flat=True)):
+        bump(school_id, already_applied=False, clients=-1)
+
+
+@receiver(post_save, sender=Lesson)
+def count_lesson(sender, instance, created, **kwargs):
+    if created:
+        bump(instance.school_id, lesson_day(instance), lessons=1)
+
+
+@receiver(post_delete, sender=Lesson)
+def uncount_lesson(sender, instance, origin=None, **kwargs):
+    if not school_deletion(origin):
+        bump(instance.school_id, lesson_day(instance), lessons=-1)
+
+
+# Revenue and attendance rollups, rebuilt per day after commit
+@receiver(post_save, sender=CourseRegistration)
+@receiver(post_delete, sender=CourseRegistration)
+def stale_registration_rollup(sender, instance, **kwargs):
+    mark_stale(instance.course.school_id, instance.registered_date)
+
+
+@receiver(post_save, sender=Lesson)
+@receiver(post_delete, sender=Lesson)
+def stale_lesson_rollup(sender, instance, **kwargs):
+    mark_stale(instance.school_id, lesson_day(instance))
+
+
+@receiver(post_save, sender=Booking)
+@receiver(post_delete, sender=Booking)
+def stale_booking_rollup(sender, instance, **kwargs):
+    mark_stale(instance.school_id, lesson_day(instance.lesson))
@@ -0,0 +1,142 @@
+from django.contrib.auth import get_user_model
+from django.utils.functional import SimpleLazyObject
+from django.utils.translation import gettext_lazy as _
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed, InvalidToken
+from rest_framework_simplejwt.serializers import TokenObtainPairSerializer, TokenRefreshSerializer
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.tokens import RefreshToken
+from core.principal import cached_principal, load_principal
+
+PRINCIPAL_CLAIMS = (
+    "is_teacher",
+    "is_manager",
+    "admin_id",
+    "teacher_id",
+    "student_id",
+    "school_id",
+    "school_ids",
+)
+
+
+def set_principal_claims(token, principal):
+    """Copy the role flags, role ids and school ids of a principal onto a token."""
+    for claim in PRINCIPAL_CLAIMS:
+        value = getattr(principal, claim)
+        token[claim] = list(value) if claim == "school_ids" else value
+
+
+class PrincipalRefreshToken(RefreshToken):
+    """
+    Refresh token carrying the user's principal as claims.
+    Access tokens created from it inherit the same claims.
+    """
+
+    @classmethod
+    def for_user(cls, user):
+        token = super().for_user(user)
+        set_principal_claims(token, load_principal(user.id))
+        return token
+
+
+class PrincipalTokenObtainPairSerializer(TokenObtainPairSerializer):
+    token_class = PrincipalRefreshToken
+
+
+class PrincipalTokenRefreshSerializer(TokenRefreshSerializer):
+    """
+    Re-read the principal on refresh so role or school changes reach the next access token.
+    """
+    token_class = PrincipalRefreshToken
+
+    def validate(self, attrs):
+        refresh = self.token_class(attrs["refresh"])
+
+        user_id = refresh.payload.get(api_settings.USER_ID_CLAIM, None)
+        user = get_user_model().objects.filter(**{api_settings.USER_ID_FIELD: user_id}).first()
+        if user is None or not api_settings.USER_AUTHENTICATION_RULE(user):
+            raise AuthenticationFailed(
+                self.error_messages["no_active_account"],
+                "no_active_account",
+            )
+
+        set_principal_claims(refresh, load_principal(user.id))
+        data = {"access": str(refresh.access_token)}
+
+        if api_settings.ROTATE_REFRESH_TOKENS:
+            refresh.set_jti()
+            refresh.set_exp()
+            refresh.set_iat()
+            data["refresh"] = str(refresh)
+
+        return data
+
+
+def load_user(user_id):
+    try:
+        return get_user_model().objects.get(pk=user_id)
+    except get_user_model().DoesNotExist:
+        raise AuthenticationFailed("User not found", code="user_not_found")
+
+
+class ClaimsUser(SimpleLazyObject):
+    """
+    User backed by the token's user id and the cached principal.
+
+    `id`, `pk`, the role flags and `principal` are answered without a query;
+    any other attribute (or passing it to the ORM) loads the `User` row once.
+    `is_active` is assumed True until the access token expires; a deleted
+    user fails with 401 once the principal cache expires.
+    """
+
+    def __init__(self, principal):
+        self.__dict__["principal"] = principal
+        super().__init__(lambda: load_user(principal.user_id))
+
+    @property
+    def id(self):
+        return self.principal.user_id
+
+    pk = id
+
+    def __bool__(self):
+        # IsAuthenticated checks `request.user and ...`; answer without loading the row
+        return True
+
+    @property
+    def is_teacher(self):
+        return self.principal.is_teacher
+
+    @property
+    def is_manager(self):
+        return self.principal.is_manager
+
+    @property
+    def is_active(self):
+        return True
+
+    @property
+    def is_authenticated(self):
+        return True
+
+    @property
+    def is_anonymous(self):
+        return False
+
+
+class PrincipalJWTAuthentication(JWTAuthentication):
+    """
+    JWT authentication that resolves roles and schools from the principal cache
+    instead of loading the user. The token's role claims are not trusted: they
+    live as long as the access token, while the cache is invalidated on role and
+    school changes and expires within PRINCIPAL_CACHE_TIMEOUT.
+    """
+
+    def get_user(self, validated_token):
+        if api_settings.USER_ID_CLAIM not in validated_token:
+            raise InvalidToken(_("Token contained no recognizable user identification"))
+
+        principal = cached_principal(int(validated_token[api_settings.USER_ID_CLAIM]))
+        if not principal.is_authenticated:
+            raise AuthenticationFailed("User not found", code="user_not_found")
+        return ClaimsUser(principal)
@@ -8,13 +8,13 @@ from django.shortcuts import render
 from rest_framework import status
 import random
 from django.utils.timezone import now
-from rest_framework_simplejwt.tokens import RefreshToken
 from django.contrib.auth.hashers import make_password, check_password
 from utils.sms import SMSClient
 from django.core.cache import cache
 import hashlib
 import secrets
 from core.models import User
+from core.tokens import PrincipalRefreshToken
 from core.serializers import NotificationSerializer
 from phonenumbers import is_valid_number, parse, NumberParseException, region_code_for_country_code
 
@@ -196,7 +196,7 @@ class PinViewSet(ViewSet):
             return Response({'error': 'Invalid PIN.'}, status=status.HTTP_400_BAD_REQUEST)
 
         # Generate JWT tokens
-        refresh = RefreshToken.for_user(user)
+        refresh = PrincipalRefreshToken.for_user(user)
         access_token = str(refresh.access_token)
 
         return Response({
@@ -248,7 +248,7 @@ class PinViewSet(ViewSet):
         cache.delete(temp_key)
 
         # Generate JWT tokens
-        refresh = RefreshToken.for_user(user)
+        refresh = PrincipalRefreshToken.for_user(user)
         access_token = str(refresh.access_token)
 
         return Response({
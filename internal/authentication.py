@@ -0,0 +1,41 @@
+from functools import lru_cache
+from django.conf import settings
+from django.utils.module_loading import import_string
+from rest_framework.authentication import BaseAuthentication
+
+
+def is_api_path(path):
+    """True for the pure JWT API routes listed in `API_ROUTE_PREFIXES`."""
+    return path.startswith(tuple(settings.API_ROUTE_PREFIXES))
+
+
+@lru_cache(maxsize=None)
+def get_profile_authenticators(profile):
+    return [import_string(path)() for path in settings.AUTHENTICATION_PROFILES[profile]]
+
+
+class RouteProfileAuthentication(BaseAuthentication):
+    """
+    Dispatch to the authentication profile matching the request path.
+
+    API routes only try JWT, so a wrong header can never fall through to
+    BasicAuthentication and its password hashing. Other routes keep the
+    full session/basic/token stack.
+    """
+
+    def get_authenticators(self, request):
+        profile = "api" if is_api_path(request.path_info) else "default"
+        return get_profile_authenticators(profile)
+
+    def authenticate(self, request):
+        for authenticator in self.get_authenticators(request):
+            user_auth_tuple = authenticator.authenticate(request)
+            if user_auth_tuple is not None:
+                return user_auth_tuple
+        return None
+
+    def authenticate_header(self, request):
+        authenticators = self.get_authenticators(request)
+        if authenticators:
+            return authenticators[0].authenticate_header(request)
+        return None
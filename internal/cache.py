@@ -0,0 +1,276 @@
+import logging
+import os
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from django.conf import settings
+from django.core.cache import cache
+from django.core.cache.backends.base import DEFAULT_TIMEOUT
+from django.core.cache.backends.redis import RedisCache
+
+logger = logging.getLogger(__name__)
+
+_redis_clients = {}
+
+
+def get_redis():
+    """Raw redis client for `REDIS_URL`, one per process."""
+    import redis
+
+    pid = os.getpid()
+    if pid not in _redis_clients:
+        _redis_clients.clear()
+        _redis_clients[pid] = redis.Redis.from_url(settings.REDIS_URL)
+    return _redis_clients[pid]
+
+
+class LocalLRU:
+    """
+    Bounded, thread-safe in-process store of serialized values with expiry.
+    """
+
+    def __init__(self, max_entries):
+        self.max_entries = max_entries
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return None
+            raw, expires_at = entry
+            if expires_at <= time.monotonic():
+                del self._data[key]
+                return None
+            self._data.move_to_end(key)
+            return raw
+
+    def set(self, key, raw, timeout):
+        with self._lock:
+            self._data[key] = (raw, time.monotonic() + timeout)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+
+    def delete(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+
+class TieredRedisCache(RedisCache):
+    """
+    Redis cache with a per-process LRU in front of it.
+
+    Every write publishes the key on a pub/sub channel; a daemon thread in each
+    process drops its local copy when another process writes. Local entries are
+    only served while that listener is connected, and never outlive
+    `LOCAL_TIMEOUT` or the key's TTL in Redis, so a missed message cannot keep
+    a stale value around.
+
+    Extra OPTIONS: LOCAL_MAX_ENTRIES (default 1000), LOCAL_TIMEOUT (default 30).
+    """
+    clear_message = "*"
+
+    def __init__(self, server, params):
+        options = dict(params.get("OPTIONS", {}))
+        self._local_max_entries = int(options.pop("LOCAL_MAX_ENTRIES", 1000))
+        self._local_timeout = float(options.pop("LOCAL_TIMEOUT", 30))
+        super().__init__(server, {**params, "OPTIONS": options})
+        self._local = LocalLRU(self._local_max_entries)
+        self._channel = f"{self.key_prefix or 'cache'}:invalidate"
+        self._sender = uuid.uuid4().hex
+        self._listener_pid = None
+        self._listening = threading.Event()
+        self._listener_lock = threading.Lock()
+
+    # Pub/sub invalidation
+    def _ensure_listener(self):
+        pid = os.getpid()
+        if self._listener_pid == pid:
+            return
+        with self._listener_lock:
+            if self._listener_pid == pid:
+                return
+            # Forked worker: nothing inherited from the parent is trusted
+            self._local.clear()
+            self._listening.clear()
+            self._sender = uuid.uuid4().hex
+            self._listener_pid = pid
+            thread = threading.Thread(target=self._listen, name="cache-invalidation", daemon=True)
+            thread.start()
+
+    def _listen(self):
+        pid = os.getpid()
+        while self._listener_pid == pid:
+            pubsub = None
+            try:
+                pubsub = self._cache.get_client(write=False).pubsub(ignore_subscribe_messages=True)
+                pubsub.subscribe(self._channel)
+                self._listening.set()
+                for message in pubsub.listen():
+                    self._handle_message(message["data"])
+            except Exception:
+                logger.warning("Cache invalidation listener disconnected", exc_info=True)
+            finally:
+                self._listening.clear()
+                self._local.clear()
+                if pubsub is not None:
+                    pubsub.close()
+            time.sleep(1)
+
+    def _handle_message(self, data):
+        sender, _, key = data.decode().partition(" ")
+        if sender == self._sender:
+            return
+        if key == self.clear_message:
+            self._local.clear()
+        else:
+            self._local.delete(key)
+
+    def _publish(self, *keys):
+        self._ensure_listener()
+        client = self._cache.get_client(write=True)
+        for key in keys:
+            self._local.delete(key)
+            client.publish(self._channel, f"{self._sender} {key}")
+
+    def _local_timeout_for(self, timeout):
+        if timeout is None:
+            return self._local_timeout
+        return min(self._local_timeout, timeout)
+
+    def _read_raw(self, key):
+        self._ensure_listener()
+        if self._listening.is_set():
+            raw = self._local.get(key)
+            if raw is not None:
+                return raw
+        # Read the remaining TTL with the value, so a local copy never outlives the Redis key
+        pipe = self._cache.get_client(key).pipeline(transaction=False)
+        pipe.get(key)
+        pipe.pttl(key)
+        raw, pttl = pipe.execute()
+        if raw is not None and self._listening.is_set() and (pttl == -1 or pttl > 0):
+            self._local.set(key, raw, self._local_timeout_for(None if pttl == -1 else pttl / 1000))
+        return raw
+
+    # Reads
+    def get(self, key, default=None, version=None):
+        key = self.make_and_validate_key(key, version=version)
+        raw = self._read_raw(key)
+        if raw is None:
+            return default
+        return self._cache._serializer.loads(raw)
+
+    def get_many(self, keys, version=None):
+        key_map = {self.make_and_validate_key(key, version=version): key for key in keys}
+        found = {}
+        for made_key, key in key_map.items():
+            raw = self._read_raw(made_key)
+            if raw is not None:
+                found[key] = self._cache._serializer.loads(raw)
+        return found
+
+    def has_key(self, key, version=None):
+        return self.get(key, version=version) is not None
+
+    # Writes
+    def set(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        super().set(key, value, timeout, version=version)
+        made_key = self.make_and_validate_key(key, version=version)
+        self._publish(made_key)
+        if self._listening.is_set():
+            backend_timeout = self.get_backend_timeout(timeout)
+            raw = self._cache._serializer.dumps(value)
+            if isinstance(raw, int):
+                raw = str(raw).encode()
+            self._local.set(made_key, raw, self._local_timeout_for(backend_timeout))
+
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        added = super().add(key, value, timeout, version=version)
+        if added:
+            self._publish(self.make_and_validate_key(key, version=version))
+        return added
+
+    def touch(self, key, timeout=DEFAULT_TIMEOUT, version=None):
+        touched = super().touch(key, timeout, version=version)
+        self._publish(self.make_and_validate_key(key, version=version))
+        return touched
+
+    def delete(self, key, version=None):
+        deleted = super().delete(key, version=version)
+        self._publish(self.make_and_validate_key(key, version=version))
+        return deleted
+
+    def incr(self, key, delta=1, version=None):
+        value = super().incr(key, delta, version=version)
+        self._publish(self.make_and_validate_key(key, version=version))
+        return value
+
+    def set_many(self, data, timeout=DEFAULT_TIMEOUT, version=None):
+        failed = super().set_many(data, timeout, version=version)
+        self._publish(*(self.make_and_validate_key(key, version=version) for key in data))
+        return failed
+
+    def delete_many(self, keys, version=None):
+        keys = list(keys)
+        super().delete_many(keys, version=version)
+        self._publish(*(self.make_and_validate_key(key, version=version) for key in keys))
+
+    def clear(self):
+        cleared = super().clear()
+        self._publish(self.clear_message)
+        self._local.clear()
+        return cleared
+
+
+# School-namespaced version counters
+def school_key(school_id, *parts):
+    return ":".join(["school", str(school_id), *map(str, parts)])
+
+
+def version_key(school_id, resource):
+    return school_key(school_id, "version", resource)
+
+
+def version_seed():
+    """
+    Starting value for a missing counter. Milliseconds since the epoch, so a
+    counter recreated after an eviction or flush never repeats old versions.
+    """
+    return int(time.time() * 1000)
+
+
+def get_version(school_id, resource):
+    """Current version of a school's resource."""
+    key = version_key(school_id, resource)
+    version = cache.get(key)
+    if version is None:
+        seed = version_seed()
+        cache.add(key, seed, None)
+        version = cache.get(key, seed)
+    return version
+
+
+def bump_version(school_id, resource):
+    """Invalidate every cached entry derived from a school's resource."""
+    key = version_key(school_id, resource)
+    try:
+        return cache.incr(key)
+    except ValueError:
+        # Counter never read (or evicted): restart from a fresh seed
+        seed = version_seed()
+        if cache.add(key, seed, None):
+            return seed
+        return cache.incr(key)
+
+
+def versioned_key(school_id, resource, *parts):
+    """Cache key that changes whenever `bump_version(school_id, resource)` runs."""
+    return school_key(school_id, resource, f"v{get_version(school_id, resource)}", *parts)
@@ -0,0 +1,72 @@
+import time
+from functools import wraps
+from django.core.cache import cache
+from django.db import transaction
+from django.utils.http import http_date, parse_http_date_safe, quote_etag
+from rest_framework.response import Response
+from internal.cache import bump_version, get_version, school_key
+
+# Per-school resources whose list responses are served with validators
+COURSES = "courses"
+STAFF = "staff"
+CLIENTS = "clients"
+
+
+def modified_key(school_id, resource):
+    return school_key(school_id, "modified", resource)
+
+
+def touch_resource(school_id, resource):
+    """Bump a school's resource version and record when it changed, once the change is committed."""
+    if school_id is None:
+        return
+
+    def touch():
+        bump_version(school_id, resource)
+        cache.set(modified_key(school_id, resource), int(time.time()), None)
+    transaction.on_commit(touch)
+
+
+def principal_school(request):
+    return (request.principal.school_id,)
+
+
+def principal_schools(request):
+    return request.principal.school_ids
+
+
+def conditional_list(resource, schools=principal_school):
+    """
+    Serve a list endpoint with ETag/Last-Modified validators.
+
+    The validators come from the per-school version counters, so a client
+    revalidating with a matching ETag gets a 304 before the view runs.
+    """
+    def decorator(view_method):
+        @wraps(view_method)
+        def wrapper(self, request, *args, **kwargs):
+            school_ids = sorted(school_id for school_id in schools(request) if school_id)
+            if not school_ids:
+                return view_method(self, request, *args, **kwargs)
+
+            versions = ".".join(f"{school_id}-{get_version(school_id, resource)}" for school_id in school_ids)
+            etag = quote_etag(f"{resource}:{view_method.__name__}:{versions}")
+            modified = cache.get_many([modified_key(school_id, resource) for school_id in school_ids])
+            last_modified = max(modified.values()) if modified else None
+
+            if_none_match = request.headers.get("If-None-Match")
+            if if_none_match is not None:
+                not_modified = etag in [tag.strip() for tag in if_none_match.split(",")]
+            else:
+                since = parse_http_date_safe(request.headers.get("If-Modified-Since", ""))
+                not_modified = bool(since and last_modified and last_modified <= since)
+
+            response = Response(status=304) if not_modified else view_method(self, request, *args, **kwargs)
+            if response.status_code in (200, 304):
+                response["ETag"] = etag
+                if last_modified:
+                    response["Last-Modified"] = http_date(last_modified)
+                response["Cache-Control"] = "private, no-cache"
+            return response
+        return wrapper
+    return decorator
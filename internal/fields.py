@@ -0,0 +1,18 @@
+from rest_framework import serializers
+
+# Format the mobile apps parse: local wall time with a literal "Z" suffix
+LEGACY_DATETIME_FORMAT = '%Y-%m-%dT%H:%M:%SZ'
+
+
+class ZonedDateTimeField(serializers.DateTimeField):
+    """
+    DateTimeField rendered in the `timezone` passed through serializer context.
+
+    Without a timezone it behaves like DRF's DateTimeField (ISO 8601, UTC).
+    """
+
+    def to_representation(self, value):
+        zone = self.context.get("timezone")
+        if zone is None or not value:
+            return super().to_representation(value)
+        return value.astimezone(zone).strftime(LEGACY_DATETIME_FORMAT)
@@ -0,0 +1,41 @@
+from django.contrib.auth.middleware import AuthenticationMiddleware
+from django.contrib.messages.middleware import MessageMiddleware
+from django.contrib.sessions.middleware import SessionMiddleware
+from django.middleware.csrf import CsrfViewMiddleware
+from internal.authentication import is_api_path
+
+
+class SkipApiRoutesMixin:
+    """
+    Bypass the wrapped middleware on JWT API routes.
+    Admin and HTML routes still run it unchanged.
+    """
+
+    def __call__(self, request):
+        if is_api_path(request.path_info):
+            return self.get_response(request)
+        return super().__call__(request)
+
+    def process_view(self, request, callback, callback_args, callback_kwargs):
+        if is_api_path(request.path_info):
+            return None
+        parent = getattr(super(), "process_view", None)
+        if parent is None:
+            return None
+        return parent(request, callback, callback_args, callback_kwargs)
+
+
+class SessionMiddleware(SkipApiRoutesMixin, SessionMiddleware):
+    pass
+
+
+class CsrfViewMiddleware(SkipApiRoutesMixin, CsrfViewMiddleware):
+    pass
+
+
+class AuthenticationMiddleware(SkipApiRoutesMixin, AuthenticationMiddleware):
+    pass
+
+
+class MessageMiddleware(SkipApiRoutesMixin, MessageMiddleware):
+    pass
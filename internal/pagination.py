@@ -0,0 +1,117 @@
+import base64
+import binascii
+import orjson
+from django.core.exceptions import ValidationError
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import LimitOffsetPagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+
+
+class KeysetPagination:
+    """
+    Keyset (cursor) pagination over a `(key, id)` ordering.
+
+    Each page continues strictly after the last row of the previous one, so
+    with a matching composite index page N costs the same as page 1. The
+    cursor is an opaque urlsafe token holding that last `(key, id)` pair.
+
+    `segments` is an optional list of disjoint filters served one after the
+    other (e.g. waiting slips before the rest), each in `(key, id)` order.
+
+    Pagination only kicks in when the client sends `cursor` or `page_size`;
+    other requests keep the legacy unpaginated list (see `is_requested`).
+    """
+    cursor_query_param = "cursor"
+    page_size_query_param = "page_size"
+    page_size = 50
+    max_page_size = 200
+    invalid_cursor_message = "Invalid cursor"
+
+    def __init__(self, key, descending=False, segments=None):
+        self.key = key
+        self.descending = descending
+        self.segments = segments or [Q()]
+        self.ordering = (f"-{key}", "-id") if descending else (key, "id")
+        self.next_cursor = None
+
+    def is_requested(self, request):
+        return (
+            self.cursor_query_param in request.query_params
+            or self.page_size_query_param in request.query_params
+        )
+
+    def get_page_size(self, request):
+        try:
+            size = int(request.query_params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return self.page_size
+        return min(max(size, 1), self.max_page_size)
+
+    def encode_cursor(self, segment, row):
+        key, pk = self.row_value(row, self.key), self.row_value(row, "id")
+        token = orjson.dumps([segment, key, pk], option=orjson.OPT_UTC_Z)
+        return base64.urlsafe_b64encode(token).decode("ascii").rstrip("=")
+
+    def decode_cursor(self, queryset, cursor):
+        try:
+            token = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+            segment, key, pk = orjson.loads(token)
+            field = queryset.model._meta.get_field(self.key)
+            segment, key, pk = int(segment), field.to_python(key), int(pk)
+        except (binascii.Error, ValueError, TypeError, ValidationError):
+            raise NotFound(self.invalid_cursor_message)
+        if not 0 <= segment < len(self.segments):
+            raise NotFound(self.invalid_cursor_message)
+        return segment, key, pk
+
+    @staticmethod
+    def row_value(row, name):
+        return row[name] if isinstance(row, dict) else getattr(row, name)
+
+    def after(self, queryset, key, pk):
+        # Range on the leading index column, then drop the ties already served
+        if self.descending:
+            return queryset.filter(**{f"{self.key}__lte": key}).exclude(Q(**{self.key: key}) & Q(id__gte=pk))
+        return queryset.filter(**{f"{self.key}__gte": key}).exclude(Q(**{self.key: key}) & Q(id__lte=pk))
+
+    def paginate_queryset(self, queryset, request):
+        """Return one page of `queryset` as a list and remember the next cursor."""
+        self.request = request
+        segment, position = 0, None
+        cursor = request.query_params.get(self.cursor_query_param)
+        if cursor:
+            segment, *position = self.decode_cursor(queryset, cursor)
+
+        # Walk the segments in order until the page plus one extra row is filled
+        size = self.get_page_size(request)
+        rows = []
+        while segment < len(self.segments) and len(rows) <= size:
+            part = queryset.filter(self.segments[segment])
+            if position:
+                part = self.after(part, *position)
+            rows.extend((segment, row) for row in part.order_by(*self.ordering)[:size + 1 - len(rows)])
+            segment, position = segment + 1, None
+
+        page, has_next = rows[:size], len(rows) > size
+        self.next_cursor = self.encode_cursor(*page[-1]) if has_next else None
+        return [row for _, row in page]
+
+    def get_next_link(self):
+        if self.next_cursor is None:
+            return None
+        url = self.request.build_absolute_uri()
+        return replace_query_param(url, self.cursor_query_param, self.next_cursor)
+
+    def get_paginated_data(self, results):
+        return {"next": self.get_next_link(), "cursor": self.next_cursor, "results": results}
+
+    def get_paginated_response(self, results):
+        return Response(self.get_paginated_data(results))
+
+
+class SearchPagination(LimitOffsetPagination):
+    """Offset pages for ranked search hits, which have no stable key to page on."""
+    default_limit = 20
+    max_limit = 50
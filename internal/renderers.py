@@ -0,0 +1,60 @@
+import orjson
+from django.conf import settings
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import JSONRenderer
+
+# orjson writes UTF-8; these two are escaped so the output stays a JavaScript subset
+LINE_SEPARATOR = "\u2028".encode()
+PARAGRAPH_SEPARATOR = "\u2029".encode()
+
+
+class ORJSONRenderer(JSONRenderer):
+    """
+    JSONRenderer backed by orjson, byte-for-byte compatible with DRF's output.
+
+    UUIDs, datetimes, dates and times are encoded natively (UTC as "Z", like
+    DRF); anything else (Decimal, timedelta, lazy strings, querysets...) goes
+    through DRF's JSONEncoder. Indented output and values orjson rejects
+    (e.g. integers beyond 64 bits) fall back to the stdlib renderer.
+    """
+    options = orjson.OPT_UTC_Z | orjson.OPT_NON_STR_KEYS
+
+    def __init__(self):
+        self.default = self.encoder_class().default
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+
+        renderer_context = renderer_context or {}
+        indent = self.get_indent(accepted_media_type, renderer_context)
+        if indent is not None or self.ensure_ascii or not self.compact:
+            return super().render(data, accepted_media_type, renderer_context)
+
+        try:
+            ret = orjson.dumps(data, default=self.default, option=self.options)
+        except orjson.JSONEncodeError:
+            return super().render(data, accepted_media_type, renderer_context)
+
+        if b"\xe2\x80" in ret:
+            ret = ret.replace(LINE_SEPARATOR, b"\\u2028").replace(PARAGRAPH_SEPARATOR, b"\\u2029")
+        return ret
+
+
+class ORJSONParser(JSONParser):
+    """
+    JSONParser backed by orjson. Non UTF-8 request bodies use the stdlib parser.
+    """
+    renderer_class = ORJSONRenderer
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        parser_context = parser_context or {}
+        encoding = parser_context.get('encoding', settings.DEFAULT_CHARSET)
+        if encoding.lower().replace("_", "-") not in ("utf-8", "utf8"):
+            return super().parse(stream, media_type, parser_context)
+
+        try:
+            return orjson.loads(stream.read())
+        except orjson.JSONDecodeError as exc:
+            raise ParseError('JSON parse error - %s' % str(exc))
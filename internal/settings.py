@@ -1,7 +1,6 @@
 from pathlib import Path
 from datetime import timedelta
 import os
-from storages.backends.s3boto3 import S3Boto3Storage
 from firebase_admin import initialize_app, credentials
 from google.auth import load_credentials_from_file
 import os
@@ -31,14 +30,19 @@ activate(TIME_ZONE)
 
 CORS_ORIGIN_ALLOW_ALL = True
 
+# Redis shared by Celery and the cache layer
+REDIS_URL = os.getenv("REDIS_URL", "redis://localhost:6379/0")
+
 if not DEBUG:
     CACHES = {
         "default": {
-            "BACKEND": "django.core.cache.backends.filebased.FileBasedCache",
-            "LOCATION": "/var/tmp/django_cache",  # Choose a directory with write access
+            "BACKEND": "internal.cache.TieredRedisCache",
+            "LOCATION": REDIS_URL,
             "TIMEOUT": 600,  # Cache timeout in seconds (10 minutes)
+            "KEY_PREFIX": "flick",
             "OPTIONS": {
-                "MAX_ENTRIES": 1000,  # Limit number of cache entries
+                "LOCAL_MAX_ENTRIES": 1000,  # Per-process LRU in front of Redis
+                "LOCAL_TIMEOUT": 30,  # Upper bound on a local copy's age
             },
         }
     }
@@ -50,6 +54,7 @@ INSTALLED_APPS = [
     'django.contrib.sessions',
     'django.contrib.messages',
     'django.contrib.staticfiles',
+    'django.contrib.postgres',
     
     'notifications',
     'django_celery_beat',
@@ -69,11 +74,12 @@ INSTALLED_APPS = [
 MIDDLEWARE = [
     'corsheaders.middleware.CorsMiddleware',
     'django.middleware.security.SecurityMiddleware',
-    'django.contrib.sessions.middleware.SessionMiddleware',
+    'internal.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
-    'django.middleware.csrf.CsrfViewMiddleware',
-    'django.contrib.auth.middleware.AuthenticationMiddleware',
-    'django.contrib.messages.middleware.MessageMiddleware',
+    'internal.middleware.CsrfViewMiddleware',
+    'internal.middleware.AuthenticationMiddleware',
+    'core.middleware.PrincipalMiddleware',
+    'internal.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
 
@@ -179,11 +185,33 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': [
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        'internal.authentication.RouteProfileAuthentication',
+    ],
+    'DEFAULT_RENDERER_CLASSES': [
+        'internal.renderers.ORJSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ],
+    'DEFAULT_PARSER_CLASSES': [
+        'internal.renderers.ORJSONParser',
+        'rest_framework.parsers.FormParser',
+        'rest_framework.parsers.MultiPartParser',
+    ],
+}
+
+# Pure JWT API routes: no session, CSRF, auth or message middleware
+API_ROUTE_PREFIXES = ('/student/', '/teacher/', '/manager/')
+
+# Authentication classes per route profile, see internal.authentication
+AUTHENTICATION_PROFILES = {
+    'api': [
+        'core.tokens.PrincipalJWTAuthentication',
+    ],
+    'default': [
+        'core.tokens.PrincipalJWTAuthentication',
         'rest_framework.authentication.BasicAuthentication',
         'rest_framework.authentication.SessionAuthentication',
         'rest_framework.authentication.TokenAuthentication',
-    ]
+    ],
 }
 
 """
@@ -214,10 +242,15 @@ SIMPLE_JWT = {
     'AUTH_HEADER_TYPES': ('JWT',),
     'ACCESS_TOKEN_LIFETIME': timedelta(hours=10),
     'REFRESH_TOKEN_LIFETIME': timedelta(days=365*100),
+    'TOKEN_OBTAIN_SERIALIZER': 'core.tokens.PrincipalTokenObtainPairSerializer',
+    'TOKEN_REFRESH_SERIALIZER': 'core.tokens.PrincipalTokenRefreshSerializer',
 }
 
 AUTH_USER_MODEL = 'core.User'
 
+# Seconds a resolved request principal (role ids + school) stays cached
+PRINCIPAL_CACHE_TIMEOUT = 60
+
 """
 =====================================
 Email Integration
@@ -238,10 +271,6 @@ DEBUG_TOOLBAR_CONFIG = {
 
 
 # STORAGE 
-class MediaStorage(S3Boto3Storage):
-    location = 'media'
-    file_overwrite = True
-    
 if DEBUG == False:
     AWS_ACCESS_KEY_ID = os.getenv("AWS_ACCESS_KEY_ID")
     AWS_SECRET_ACCESS_KEY = os.getenv("AWS_SECRET_ACCESS_KEY")
@@ -252,7 +281,7 @@ if DEBUG == False:
     AWS_S3_FILE_OVERWRITE = True
 
     STATICFILES_STORAGE = 'storages.backends.s3boto3.S3Boto3Storage'
-    DEFAULT_FILE_STORAGE = 'storages.backends.s3boto3.S3Boto3Storage'
+    DEFAULT_FILE_STORAGE = 'internal.storage.MediaStorage'
     AWS_LOCATION = 'static'
 else:
     STATIC_ROOT = os.path.join(BASE_DIR.parent, 'static')
@@ -302,8 +331,8 @@ GOOGLE_SCOPES = [
 
 
 # CELERY
-CELERY_BROKER_URL = 'redis://localhost:6379/0'
-CELERY_RESULT_BACKEND = 'redis://localhost:6379/0'
+CELERY_BROKER_URL = REDIS_URL
+CELERY_RESULT_BACKEND = REDIS_URL
 CELERY_BROKER_CONNECTION_RETRY_ON_STARTUP = True
 CELERY_ACCEPT_CONTENT = ['json']
 CELERY_TASK_SERIALIZER = 'json'
@@ -318,6 +347,26 @@ CELERY_BEAT_SCHEDULE = {
         'schedule': crontab(minute='*/15'),  # Executes every 15 minutes
         'args': (),
     },
+    'reconcile-group-seats-every-10-minutes': {
+        'task': 'teacher.tasks.reconcile_group_seats',
+        'schedule': crontab(minute='*/10'),  # Executes every 10 minutes
+        'args': (),
+    },
+    'reconcile-school-metrics-nightly': {
+        'task': 'manager.tasks.reconcile_school_metrics',
+        'schedule': crontab(hour=3, minute=0),  # Executes nightly at 03:00 UTC
+        'args': (),
+    },
+    'refresh-recent-rollups-nightly': {
+        'task': 'manager.tasks.refresh_recent_rollups',
+        'schedule': crontab(hour=3, minute=30),  # Executes nightly at 03:30 UTC
+        'args': (),
+    },
+    'refresh-teacher-utilization-nightly': {
+        'task': 'manager.tasks.refresh_teacher_utilization',
+        'schedule': crontab(hour=4, minute=0),  # Executes nightly at 04:00 UTC
+        'args': (),
+    },
     # 'send-guest-notification-every-15-minutes': {
     #     'task': 'teacher.tasks.send_guest_lesson_notification',
     #     'schedule': crontab(minute='*/15'),  # Executes every 15 minutes
@@ -0,0 +1,148 @@
+"""
+Accounting exports of registrations, lessons and bookings.
+
+Rows are read with server-side cursors (`.iterator(chunk_size=...)`) and
+written out one at a time, so memory stays flat whatever the school's size:
+CSV is streamed straight into the response, XLSX is built by a Celery job in
+openpyxl's write-only mode and saved to storage.
+"""
+import csv
+import tempfile
+import uuid
+from datetime import time
+from django.core.files import File
+from django.core.files.storage import default_storage
+from manager.rollups import local_range
+from student.models import Booking, CourseRegistration
+from teacher.models import Lesson
+
+CHUNK_SIZE = 2000  # Rows fetched per server-side cursor round trip
+LINES_PER_BLOCK = 500  # CSV lines per streamed chunk
+EXPORT_PREFIX = "exports/"  # Private in MediaStorage: served through presigned URLs
+FORMULA_PREFIXES = ("=", "+", "-", "@")  # Spreadsheet apps evaluate cells starting with these
+
+
+def full_name(first_name, last_name):
+    return " ".join(part for part in (first_name, last_name) if part)
+
+
+def local(value, tz):
+    if not value:
+        return ""
+    if isinstance(value, time):
+        # TimeField values are stored as wall-clock times without a zone
+        return value.strftime("%H:%M")
+    return value.astimezone(tz).strftime("%Y-%m-%d %H:%M")
+
+
+def cell(value):
+    """Quote text that a spreadsheet app would run as a formula."""
+    if isinstance(value, str) and value.startswith(FORMULA_PREFIXES):
+        return f"'{value}"
+    return value
+
+
+def registration_rows(school_id, start, end):
+    yield [
+        "registration_uuid", "registered_date", "student_name", "student_email", "course_name",
+        "teacher_name", "paid_price", "discount", "payment_status", "payment_slip", "lessons_left", "exp_date",
+    ]
+    rows = CourseRegistration.objects.filter(
+        course__school_id=school_id, registered_date__range=(start, end),
+    ).order_by("registered_date", "id").values_list(
+        "uuid", "registered_date", "student__user__first_name", "student__user__last_name", "student__user__email",
+        "course__name", "teacher__user__first_name", "teacher__user__last_name",
+        "paid_price", "discount", "payment_status", "payment_slip", "lessons_left", "exp_date",
+    )
+    for (
+        registration_uuid, registered_date, student_first, student_last, student_email, course_name,
+        teacher_first, teacher_last, paid_price, discount, payment_status, payment_slip, lessons_left, exp_date,
+    ) in rows.iterator(chunk_size=CHUNK_SIZE):
+        yield [
+            registration_uuid, registered_date, full_name(student_first, student_last), student_email, course_name,
+            full_name(teacher_first, teacher_last), paid_price, discount, payment_status,
+            "uploaded" if payment_slip else "", lessons_left, exp_date or "",
+        ]
+
+
+def lesson_rows(school_id, start, end):
+    tz, lower, upper = local_range(school_id, start, end)
+    yield ["lesson_code", "start", "end", "status", "course_name", "is_group", "teacher_name", "number_of_client"]
+    rows = Lesson.objects.filter(
+        school_id=school_id, datetime__gte=lower, datetime__lt=upper,
+    ).order_by("datetime", "id").values_list(
+        "code", "datetime", "end_datetime", "status", "course__name", "course__is_group",
+        "teacher__user__first_name", "teacher__user__last_name", "number_of_client",
+    )
+    for code, start_at, end_at, status, course_name, is_group, teacher_first, teacher_last, clients in rows.iterator(chunk_size=CHUNK_SIZE):
+        yield [
+            code, local(start_at, tz), local(end_at, tz), status, course_name, is_group,
+            full_name(teacher_first, teacher_last), clients,
+        ]
+
+
+def booking_rows(school_id, start, end):
+    tz, lower, upper = local_range(school_id, start, end)
+    yield [
+        "booking_code", "lesson_code", "lesson_start", "course_name", "teacher_name",
+        "user_type", "client_name", "status", "check_in", "check_out",
+    ]
+    rows = Booking.objects.filter(
+        school_id=school_id, lesson__datetime__gte=lower, lesson__datetime__lt=upper,
+    ).order_by("lesson__datetime", "id").values_list(
+        "code", "lesson__code", "lesson__datetime", "lesson__course__name",
+        "lesson__teacher__user__first_name", "lesson__teacher__user__last_name", "user_type",
+        "student__user__first_name", "student__user__last_name", "guest__name",
+        "status", "check_in", "check_out",
+    )
+    for (
+        code, lesson_code, lesson_start, course_name, teacher_first, teacher_last, user_type,
+        student_first, student_last, guest_name, status, check_in, check_out,
+    ) in rows.iterator(chunk_size=CHUNK_SIZE):
+        yield [
+            code, lesson_code, local(lesson_start, tz), course_name, full_name(teacher_first, teacher_last), user_type,
+            guest_name if user_type == "guest" else full_name(student_first, student_last),
+            status, local(check_in, tz), local(check_out, tz),
+        ]
+
+
+EXPORTS = {
+    "registrations": registration_rows,
+    "lessons": lesson_rows,
+    "bookings": booking_rows,
+}
+
+
+class Echo:
+    """File-like object whose write() hands the line back, for csv.writer."""
+
+    def write(self, value):
+        return value
+
+
+def stream_csv(kind, school_id, start, end):
+    """CSV text of an export in blocks of LINES_PER_BLOCK lines."""
+    writer = csv.writer(Echo())
+    block = ["\ufeff"]  # BOM so spreadsheet apps detect UTF-8
+    for row in EXPORTS[kind](school_id, start, end):
+        block.append(writer.writerow([cell(value) for value in row]))
+        if len(block) >= LINES_PER_BLOCK:
+            yield "".join(block)
+            block = []
+    yield "".join(block)
+
+
+def write_xlsx(kind, school_id, start, end):
+    """Build an XLSX export in a temporary file, save it to storage and return its name."""
+    from openpyxl import Workbook
+
+    workbook = Workbook(write_only=True)
+    sheet = workbook.create_sheet(kind)
+    for row in EXPORTS[kind](school_id, start, end):
+        sheet.append([cell(value if isinstance(value, (int, float, str)) or value is None else str(value)) for value in row])
+
+    name = f"{EXPORT_PREFIX}{school_id}/{kind}-{start}-{end}-{uuid.uuid4().hex[:8]}.xlsx"
+    with tempfile.TemporaryFile() as temp:
+        workbook.save(temp)
+        temp.seek(0)
+        return default_storage.save(name, File(temp))
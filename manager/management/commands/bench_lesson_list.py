@@ -0,0 +1,56 @@
+import time
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.db.models import Prefetch
+from django.test.utils import CaptureQueriesContext
+from django.utils.dateparse import parse_date
+from rest_framework.renderers import JSONRenderer
+from manager.serializers import LessonSerializer, LessonListProjection
+from student.models import Booking
+from teacher.models import Lesson
+
+
+class Command(BaseCommand):
+    help = "Compare the DRF and projection serializers of the manager lesson list"
+
+    def add_arguments(self, parser):
+        parser.add_argument("school_id", type=int)
+        parser.add_argument("--start-date")
+        parser.add_argument("--end-date")
+        parser.add_argument("--iterations", type=int, default=5)
+
+    def run(self, label, serialize, iterations):
+        renderer = JSONRenderer()
+        with CaptureQueriesContext(connection) as queries:
+            body = renderer.render(serialize())
+        query_count = len(queries)
+
+        start = time.perf_counter()
+        for _ in range(iterations):
+            renderer.render(serialize())
+        elapsed = (time.perf_counter() - start) / iterations
+        self.stdout.write(f"{label:<12} {elapsed * 1000:9.1f} ms  {query_count} queries  {len(body)} bytes")
+        return body
+
+    def handle(self, *args, **options):
+        filters = {"school_id": options["school_id"]}
+        for option, lookup in (("start_date", "datetime__gte"), ("end_date", "datetime__lte")):
+            if options[option]:
+                value = parse_date(options[option])
+                if value is None:
+                    raise CommandError(f"Invalid {option}, use YYYY-MM-DD.")
+                filters[lookup] = value
+
+        lessons = Lesson.objects.filter(**filters)
+        legacy = lessons.select_related("course", "teacher__user").prefetch_related(
+            Prefetch("booking", queryset=Booking.objects.select_related("student__user").order_by("id"), to_attr="prefetched_bookings")
+        )
+        self.stdout.write(f"{lessons.count()} lessons")
+
+        iterations = options["iterations"]
+        drf_body = self.run("drf", lambda: LessonSerializer(legacy, many=True).data, iterations)
+        projection_body = self.run("projection", lambda: LessonListProjection(lessons).data, iterations)
+
+        if drf_body != projection_body:
+            raise CommandError("Projection output differs from LessonSerializer output.")
+        self.stdout.write(self.style.SUCCESS("Outputs are identical"))
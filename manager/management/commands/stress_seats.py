@@ -0,0 +1,119 @@
+import random
+import secrets
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.utils import timezone
+from internal.cache import get_redis
+from school.models import Course, School
+from student import services as booking_services
+from teacher.models import Lesson
+from utils import seats
+
+
+class Command(BaseCommand):
+    help = (
+        "Fire parallel bookings at a scratch group lesson through the Redis seat gate and "
+        "the guarded Postgres UPDATE (acquire, take_seat, confirm on commit), with concurrent "
+        "reconciles mixed in. Fails if a seat is oversold, if Redis turns bookings away while "
+        "Postgres has room, or if the counter drifts. The scratch school is deleted afterwards."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--group-size", type=int, default=20)
+        parser.add_argument("--attempts", type=int, default=500)
+        parser.add_argument("--workers", type=int, default=50)
+        parser.add_argument(
+            "--fail-ratio", type=float, default=0.1,
+            help="Share of admitted requests that give their hold back without booking",
+        )
+        parser.add_argument(
+            "--reconcile-ratio", type=float, default=0.1,
+            help="Share of requests that also reconcile the counter, as a cancel would",
+        )
+
+    def handle(self, *args, **options):
+        group_size = options["group_size"]
+        school = School.objects.create(name=f"stress-seats-{secrets.token_hex(4)}")
+        lesson = None
+        try:
+            course = Course.objects.create(name="stress seats", no_exp=True, school=school, is_group=True, group_size=group_size)
+            start = timezone.now() + timedelta(days=1)
+            lesson = Lesson.objects.create(
+                datetime=start, end_datetime=start + timedelta(hours=1), status="CON", course=course, school=school,
+            )
+            self.run(lesson, options)
+        finally:
+            if lesson is not None:
+                get_redis().delete(*seats.seat_keys(lesson))
+            school.delete()
+
+    def run(self, lesson, options):
+        group_size = options["group_size"]
+        barrier = threading.Barrier(min(options["workers"], options["attempts"]))
+        outcomes = {"booked": 0, "released": 0, "rejected": 0, "full": 0}
+        lock = threading.Lock()
+
+        def reconcile():
+            seats.reconcile(Lesson.objects.select_related("course").get(pk=lesson.pk))
+
+        def attempt(_):
+            # Each thread books through its own connection and its own copy of the row
+            own = Lesson.objects.select_related("course").get(pk=lesson.pk)
+            try:
+                barrier.wait(timeout=10)
+            except threading.BrokenBarrierError:
+                pass
+            try:
+                if random.random() < options["reconcile_ratio"]:
+                    reconcile()
+                try:
+                    hold = seats.acquire(own)
+                except seats.SeatsUnavailable:
+                    outcome = "rejected"
+                else:
+                    if hold is None:
+                        raise CommandError("Seat gate unavailable, check REDIS_URL.")
+                    if random.random() < options["fail_ratio"]:
+                        seats.release(own, hold)
+                        outcome = "released"
+                    else:
+                        try:
+                            with transaction.atomic():
+                                booking_services.take_seat(own)
+                                transaction.on_commit(lambda: seats.confirm(own, hold))
+                            outcome = "booked"
+                        except booking_services.BookingTransitionError:
+                            seats.release(own, hold)
+                            outcome = "full"
+                with lock:
+                    outcomes[outcome] += 1
+            finally:
+                connection.close()
+
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=options["workers"]) as pool:
+            list(pool.map(attempt, range(options["attempts"])))
+        elapsed = time.perf_counter() - started
+
+        lesson.refresh_from_db(fields=["number_of_client"])
+        counter_key, holds_key = seats.seat_keys(lesson)
+        left = int(get_redis().get(counter_key) or 0)
+        pending = get_redis().zcard(holds_key)
+
+        self.stdout.write(
+            f"{options['attempts']} attempts in {elapsed * 1000:.1f} ms: {outcomes['booked']} booked, "
+            f"{outcomes['released']} released, {outcomes['rejected']} rejected by Redis, "
+            f"{outcomes['full']} rejected by Postgres; {lesson.number_of_client} seats taken in Postgres, "
+            f"{left} left in Redis, {pending} holds pending"
+        )
+        if lesson.number_of_client > group_size or outcomes["booked"] != lesson.number_of_client:
+            raise CommandError(f"Oversold: {lesson.number_of_client} seats for a group of {group_size}.")
+        if outcomes["rejected"] and lesson.number_of_client < group_size:
+            raise CommandError("Redis turned bookings away while Postgres had room.")
+        if left + pending != group_size - lesson.number_of_client:
+            raise CommandError("Seat counter drifted from Postgres.")
+        self.stdout.write(self.style.SUCCESS("No seat was oversold and the counter matches Postgres"))
@@ -0,0 +1,108 @@
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F, Sum
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+from manager.models import SchoolMetrics, SchoolDailyMetrics
+from school.config import get_school_timezone
+from student.models import CourseRegistration, Student
+from teacher.models import Lesson, Teacher
+
+DAILY_FIELDS = ("earnings", "purchases", "lessons")
+
+
+def school_totals(school_id):
+    """Exact dashboard totals of a school, one cheap aggregate per metric."""
+    registrations = CourseRegistration.objects.filter(course__school_id=school_id).aggregate(
+        earnings=Sum("paid_price"), purchases=Count("id"),
+    )
+    return {
+        "earnings": registrations["earnings"] or 0,
+        "purchases": registrations["purchases"],
+        "staffs": Teacher.objects.filter(school_id=school_id).count(),
+        "clients": Student.school.through.objects.filter(school_id=school_id).count(),
+        "lessons": Lesson.objects.filter(school_id=school_id).count(),
+    }
+
+
+def daily_totals(school_id, day=None):
+    """Exact per-day buckets of a school as {day: {field: value}}, optionally for one day."""
+    registrations = CourseRegistration.objects.filter(course__school_id=school_id)
+    lessons = Lesson.objects.filter(school_id=school_id).annotate(
+        day=TruncDate("datetime", tzinfo=get_school_timezone(school_id)),
+    )
+    if day is not None:
+        registrations = registrations.filter(registered_date=day)
+        lessons = lessons.filter(day=day)
+
+    buckets = {}
+    for row in registrations.values("registered_date").annotate(earnings=Sum("paid_price"), purchases=Count("id")):
+        buckets[row["registered_date"]] = {"earnings": row["earnings"] or 0, "purchases": row["purchases"], "lessons": 0}
+    for row in lessons.values("day").annotate(lessons=Count("id")):
+        buckets.setdefault(row["day"], {"earnings": 0, "purchases": 0})["lessons"] = row["lessons"]
+    return buckets
+
+
+def add(model, key, deltas, initial, already_applied=True):
+    """
+    Apply `deltas` with F() to the row at `key`, creating it from `initial()` if
+    missing. `already_applied` says whether the exact values of `initial()`
+    include the change: true from post-* signals, false from pre-* ones.
+    """
+    changes = {field: F(field) + value for field, value in deltas.items()}
+    if model.objects.filter(**key).update(**changes):
+        return
+    try:
+        with transaction.atomic():
+            model.objects.create(**key, **initial())
+    except IntegrityError:
+        # Created concurrently without our change; add it on top
+        model.objects.filter(**key).update(**changes)
+        return
+    if not already_applied:
+        # Read before the change happened; add it on top
+        model.objects.filter(**key).update(**changes)
+
+
+def bump(school_id, day=None, already_applied=True, **deltas):
+    """
+    Add `deltas` to a school's running totals and, given `day`, to that day's
+    bucket. Runs inside the caller's transaction, so the metrics commit or
+    roll back with the change they describe. Pass already_applied=False when
+    the change is not in the database yet (pre-* signals).
+    """
+    deltas = {field: value for field, value in deltas.items() if value}
+    if school_id is None or not deltas:
+        return
+
+    add(SchoolMetrics, {"school_id": school_id}, deltas, lambda: school_totals(school_id), already_applied)
+
+    daily = {field: value for field, value in deltas.items() if field in DAILY_FIELDS}
+    if day is not None and daily:
+        add(
+            SchoolDailyMetrics, {"school_id": school_id, "day": day}, daily,
+            lambda: daily_totals(school_id, day).get(day, dict.fromkeys(DAILY_FIELDS, 0)),
+            already_applied,
+        )
+
+
+def lesson_day(lesson):
+    return timezone.localdate(lesson.datetime, get_school_timezone(lesson.school_id))
+
+
+@transaction.atomic
+def reconcile_school(school_id):
+    """Recompute a school's totals and daily buckets from the source tables."""
+    metrics, _ = SchoolMetrics.objects.update_or_create(
+        school_id=school_id, defaults={**school_totals(school_id), "reconciled_at": timezone.now()},
+    )
+    SchoolDailyMetrics.objects.filter(school_id=school_id).delete()
+    SchoolDailyMetrics.objects.bulk_create([
+        SchoolDailyMetrics(school_id=school_id, day=day, **values)
+        for day, values in daily_totals(school_id).items()
+    ])
+    return metrics
+
+
+def get_school_metrics(school_id):
+    """The dashboard row of a school: a primary-key read, built on first use."""
+    return SchoolMetrics.objects.filter(pk=school_id).first() or reconcile_school(school_id)
@@ -0,0 +1,42 @@
+# Generated by Django 4.2.13 on 2026-10-19 16:28
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('school', '0008_school_timezone'),
+        ('manager', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SchoolMetrics',
+            fields=[
+                ('school', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='metrics', serialize=False, to='school.school')),
+                ('earnings', models.FloatField(default=0)),
+                ('purchases', models.IntegerField(default=0)),
+                ('staffs', models.IntegerField(default=0)),
+                ('clients', models.IntegerField(default=0)),
+                ('lessons', models.IntegerField(default=0)),
+                ('reconciled_at', models.DateTimeField(blank=True, null=True)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='SchoolDailyMetrics',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField()),
+                ('earnings', models.FloatField(default=0)),
+                ('purchases', models.IntegerField(default=0)),
+                ('lessons', models.IntegerField(default=0)),
+                ('school', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='daily_metrics', to='school.school')),
+            ],
+        ),
+        migrations.AddConstraint(
+            model_name='schooldailymetrics',
+            constraint=models.UniqueConstraint(fields=('school', 'day'), name='school_daily_metrics_unique'),
+        ),
+    ]
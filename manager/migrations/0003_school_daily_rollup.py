@@ -0,0 +1,34 @@
+# Generated by Django 4.2.13 on 2026-10-19 16:29
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('school', '0008_school_timezone'),
+        ('teacher', '0005_lesson_school'),
+        ('manager', '0002_school_metrics'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SchoolDailyRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField()),
+                ('earnings', models.FloatField(default=0)),
+                ('purchases', models.IntegerField(default=0)),
+                ('lessons_completed', models.IntegerField(default=0)),
+                ('lessons_canceled', models.IntegerField(default=0)),
+                ('no_shows', models.IntegerField(default=0)),
+                ('course', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='+', to='school.course')),
+                ('school', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='daily_rollups', to='school.school')),
+                ('teacher', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='teacher.teacher')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['school', 'day'], name='rollup_school_day_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,30 @@
+# Generated by Django 4.2.13 on 2026-10-19 16:30
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('teacher', '0005_lesson_school'),
+        ('manager', '0003_school_daily_rollup'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TeacherWeeklyUtilization',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('week_start', models.DateField()),
+                ('offered_minutes', models.IntegerField(default=0)),
+                ('booked_minutes', models.IntegerField(default=0)),
+                ('computed_at', models.DateTimeField(auto_now=True)),
+                ('teacher', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='weekly_utilization', to='teacher.teacher')),
+            ],
+        ),
+        migrations.AddConstraint(
+            model_name='teacherweeklyutilization',
+            constraint=models.UniqueConstraint(fields=('teacher', 'week_start'), name='teacher_week_utilization_unique'),
+        ),
+    ]
@@ -6,4 +6,64 @@ from school.models import School
 class Admin(models.Model):
     user = models.OneToOneField(User, models.CASCADE)
     school = models.ForeignKey(School, on_delete=models.CASCADE, related_name="admins")
-    
\ No newline at end of file
+    
+
+class SchoolMetrics(models.Model):
+    """Running totals behind the manager dashboard, maintained by manager.metrics."""
+    school = models.OneToOneField(School, on_delete=models.CASCADE, primary_key=True, related_name="metrics")
+    earnings = models.FloatField(default=0)
+    purchases = models.IntegerField(default=0)
+    staffs = models.IntegerField(default=0)
+    clients = models.IntegerField(default=0)
+    lessons = models.IntegerField(default=0)
+    reconciled_at = models.DateTimeField(null=True, blank=True)
+
+
+class SchoolDailyMetrics(models.Model):
+    """Per-day buckets of SchoolMetrics: purchases by registration date, lessons by local lesson date."""
+    school = models.ForeignKey(School, on_delete=models.CASCADE, related_name="daily_metrics")
+    day = models.DateField()
+    earnings = models.FloatField(default=0)
+    purchases = models.IntegerField(default=0)
+    lessons = models.IntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["school", "day"], name="school_daily_metrics_unique"),
+        ]
+
+
+class SchoolDailyRollup(models.Model):
+    """
+    Revenue and attendance counters per (school, day, teacher, course), rebuilt
+    a day at a time by manager.rollups. Reports sum these instead of scanning
+    registrations, lessons and bookings.
+    """
+    school = models.ForeignKey(School, on_delete=models.CASCADE, related_name="daily_rollups")
+    day = models.DateField()
+    teacher = models.ForeignKey("teacher.Teacher", on_delete=models.SET_NULL, null=True, blank=True, related_name="+")
+    course = models.ForeignKey("school.Course", on_delete=models.CASCADE, null=True, blank=True, related_name="+")
+    earnings = models.FloatField(default=0)
+    purchases = models.IntegerField(default=0)
+    lessons_completed = models.IntegerField(default=0)
+    lessons_canceled = models.IntegerField(default=0)
+    no_shows = models.IntegerField(default=0)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["school", "day"], name="rollup_school_day_idx"),
+        ]
+
+
+class TeacherWeeklyUtilization(models.Model):
+    """Offered versus booked minutes of a teacher for one local week, stored by manager.utilization."""
+    teacher = models.ForeignKey("teacher.Teacher", on_delete=models.CASCADE, related_name="weekly_utilization")
+    week_start = models.DateField()  # Monday
+    offered_minutes = models.IntegerField(default=0)
+    booked_minutes = models.IntegerField(default=0)
+    computed_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["teacher", "week_start"], name="teacher_week_utilization_unique"),
+        ]
@@ -0,0 +1,99 @@
+import datetime
+from collections import defaultdict
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Count, Q, Sum
+from django.db.models.functions import TruncDate, TruncDay, TruncMonth, TruncWeek
+from manager.models import SchoolDailyRollup
+from internal.cache import school_key
+from school.config import get_school_timezone
+from school.models import School
+from student.models import Booking, CourseRegistration
+from teacher.models import Lesson
+
+COUNTERS = ("earnings", "purchases", "lessons_completed", "lessons_canceled", "no_shows")
+PERIODS = {"day": TruncDay, "week": TruncWeek, "month": TruncMonth}
+REFRESH_DELAY = 30  # Seconds; changes to the same day within this window share one rebuild
+
+
+def local_range(school_id, start, end):
+    """Aware datetimes bounding the school's local days start..end inclusive."""
+    tz = get_school_timezone(school_id)
+    lower = tz.localize(datetime.datetime.combine(start, datetime.time.min))
+    upper = tz.localize(datetime.datetime.combine(end + datetime.timedelta(days=1), datetime.time.min))
+    return tz, lower, upper
+
+
+def compute_rollups(school_id, start, end):
+    """Counters of a school for days start..end, keyed by (day, teacher_id, course_id)."""
+    tz, lower, upper = local_range(school_id, start, end)
+    rows = defaultdict(lambda: dict.fromkeys(COUNTERS, 0))
+
+    registrations = CourseRegistration.objects.filter(
+        course__school_id=school_id, registered_date__range=(start, end),
+    ).values("registered_date", "teacher_id", "course_id").annotate(earnings=Sum("paid_price"), purchases=Count("id"))
+    for row in registrations:
+        bucket = rows[row["registered_date"], row["teacher_id"], row["course_id"]]
+        bucket["earnings"], bucket["purchases"] = row["earnings"] or 0, row["purchases"]
+
+    lessons = Lesson.objects.filter(
+        school_id=school_id, datetime__gte=lower, datetime__lt=upper, status__in=["COM", "CAN"],
+    ).annotate(day=TruncDate("datetime", tzinfo=tz)).values("day", "teacher_id", "course_id").annotate(
+        completed=Count("id", filter=Q(status="COM")), canceled=Count("id", filter=Q(status="CAN")),
+    )
+    for row in lessons:
+        bucket = rows[row["day"], row["teacher_id"], row["course_id"]]
+        bucket["lessons_completed"], bucket["lessons_canceled"] = row["completed"], row["canceled"]
+
+    no_shows = Booking.objects.filter(
+        school_id=school_id, status="MIS", lesson__datetime__gte=lower, lesson__datetime__lt=upper,
+    ).annotate(day=TruncDate("lesson__datetime", tzinfo=tz)).values(
+        "day", "lesson__teacher_id", "lesson__course_id",
+    ).annotate(no_shows=Count("id"))
+    for row in no_shows:
+        rows[row["day"], row["lesson__teacher_id"], row["lesson__course_id"]]["no_shows"] = row["no_shows"]
+
+    return rows
+
+
+@transaction.atomic
+def refresh_rollups(school_id, start, end=None):
+    """Rebuild the rollup rows of a school for days start..end from the source tables."""
+    end = end or start
+    # Serialize rebuilds per school; rollup rows have no unique key, so overlapping runs would both insert
+    School.objects.select_for_update().filter(pk=school_id).first()
+    rows = compute_rollups(school_id, start, end)
+    SchoolDailyRollup.objects.filter(school_id=school_id, day__range=(start, end)).delete()
+    SchoolDailyRollup.objects.bulk_create([
+        SchoolDailyRollup(school_id=school_id, day=day, teacher_id=teacher_id, course_id=course_id, **counters)
+        for (day, teacher_id, course_id), counters in rows.items()
+    ])
+    return len(rows)
+
+
+def mark_stale(school_id, day):
+    """Queue a rebuild of one rollup day once the current transaction commits."""
+    if school_id is None or day is None:
+        return
+    from manager.tasks import refresh_rollup_day
+
+    def schedule():
+        if cache.add(school_key(school_id, "rollup", day.isoformat()), 1, REFRESH_DELAY):
+            refresh_rollup_day.apply_async((school_id, day.isoformat()), countdown=REFRESH_DELAY)
+    transaction.on_commit(schedule)
+
+
+def rollup_report(school_id, start, end, period="week", teacher_id=None, course_id=None):
+    """Sum the rollup buckets of a date range per day, week or month."""
+    rollups = SchoolDailyRollup.objects.filter(school_id=school_id, day__range=(start, end))
+    if teacher_id is not None:
+        rollups = rollups.filter(teacher_id=teacher_id)
+    if course_id is not None:
+        rollups = rollups.filter(course_id=course_id)
+
+    sums = {counter: Sum(counter) for counter in COUNTERS}
+    buckets = rollups.annotate(period=PERIODS[period]("day")).values("period").annotate(**sums).order_by("period")
+    return {
+        "buckets": list(buckets),
+        "total": {counter: value or 0 for counter, value in rollups.aggregate(**sums).items()},
+    }
@@ -6,9 +6,15 @@ from teacher.models import Teacher, Lesson, AvailableTime
 from school.models import Course, School
 from dateutil.relativedelta import relativedelta
 from datetime import date, timedelta
+from collections import defaultdict
+from django.db.models import Value
+from django.db.models.functions import Concat
 from core.models import User  # Add this import
 from school.models import SchoolSettings  # Add this import
 from utils.notification_utils import send_notification
+from internal.storage import media_url
+
+MAX_REASSIGN_DAYS = 366
 
 class CourseRegistrationSerializer(serializers.ModelSerializer):
     teacher_uuid = serializers.UUIDField(write_only=True, required=True)
@@ -234,7 +240,7 @@ class TeacherSerializer(serializers.ModelSerializer):
         fields = ['profile_picture', 'first_name', 'last_name', 'uuid', 'phone_number', 'email', 'available_times']
 
     def get_profile_picture(self, obj):
-        return obj.user.profile_image.url if obj.user.profile_image else ""
+        return media_url(obj.user.profile_image)
 
 class StudentSerializer(serializers.ModelSerializer):
     profile_picture = serializers.SerializerMethodField()
@@ -244,7 +250,7 @@ class StudentSerializer(serializers.ModelSerializer):
         fields = ['profile_picture', 'first_name', 'last_name', 'uuid', 'phone_number']
 
     def get_profile_picture(self, obj):
-        return obj.user.profile_image.url if obj.user.profile_image else ""
+        return media_url(obj.user.profile_image)
 
 class RegistrationSerializer(serializers.ModelSerializer):
     course_name = serializers.CharField(source='course.name')
@@ -285,6 +291,66 @@ class LessonSerializer(serializers.ModelSerializer):
         """Calculate the lesson end time based on duration."""
         return obj.datetime + timedelta(minutes=obj.course.duration)
 
+
+class LessonListProjection:
+    """
+    Fast path for LessonSerializer(many=True) over flat `.values_list()` rows.
+
+    Two queries (lessons, then their bookings) and no model instances; the
+    output is the same as LessonSerializer with prefetched bookings.
+    """
+    datetime_field = serializers.DateTimeField()
+    time_field = serializers.TimeField()
+
+    def __init__(self, lessons):
+        self.lessons = lessons
+
+    def lesson_rows(self):
+        return self.lessons.annotate(
+            teacher_name=Concat("teacher__user__first_name", Value(" "), "teacher__user__last_name"),
+        ).values_list(
+            "id", "code", "datetime", "status", "course__name", "course__uuid", "course__duration",
+            "teacher_id", "teacher_name",
+        )
+
+    def booking_rows(self):
+        return Booking.objects.filter(lesson__in=self.lessons.values("id")).annotate(
+            student_name=Concat("student__user__first_name", Value(" "), "student__user__last_name"),
+        ).order_by("id").values_list(
+            "lesson_id", "student_id", "student_name", "code", "check_in", "check_out", "status",
+        )
+
+    def time(self, value):
+        return None if value is None else self.time_field.to_representation(value)
+
+    @property
+    def data(self):
+        # Group bookings by lesson in one pass
+        bookings = defaultdict(list)
+        for lesson_id, student_id, student_name, code, check_in, check_out, booking_status in self.booking_rows():
+            bookings[lesson_id].append({
+                "student_name": student_name if student_id is not None else None,
+                "code": code,
+                "check_in": self.time(check_in),
+                "check_out": self.time(check_out),
+                "status": booking_status,
+            })
+
+        return [
+            {
+                "code": code,
+                "start_time": self.datetime_field.to_representation(start),
+                "end_time": start + timedelta(minutes=duration),
+                "course_name": course_name,
+                "course_uuid": str(course_uuid),
+                "teacher_name": teacher_name if teacher_id is not None else None,
+                "bookings": bookings.get(lesson_id, []),
+                "status": lesson_status,
+            }
+            for lesson_id, code, start, lesson_status, course_name, course_uuid, duration, teacher_id, teacher_name
+            in self.lesson_rows()
+        ]
+
 class ProfileSerializer(serializers.ModelSerializer):
     uuid = serializers.UUIDField(read_only=True)
     
@@ -377,6 +443,20 @@ class CreateLessonSerializer(serializers.ModelSerializer):
 
         return lesson
 
+class ReassignTeacherSerializer(serializers.Serializer):
+    to_teacher_uuid = serializers.UUIDField()
+    start_date = serializers.DateField()
+    end_date = serializers.DateField()
+    registrations = serializers.BooleanField(default=False)
+    skip_conflicts = serializers.BooleanField(default=False)
+
+    def validate(self, data):
+        if data["end_date"] < data["start_date"]:
+            raise serializers.ValidationError({"end_date": "end_date must not be before start_date."})
+        if (data["end_date"] - data["start_date"]).days > MAX_REASSIGN_DAYS:
+            raise serializers.ValidationError({"end_date": f"The range is limited to {MAX_REASSIGN_DAYS} days."})
+        return data
+
 class EditLessonSerializer(serializers.ModelSerializer):
     datetime = serializers.DateTimeField(required=False)
     student_uuid = serializers.UUIDField(write_only=True, required=False)
@@ -1,6 +1,58 @@
 from school.models import School, SchoolSettings
 from student.models import CourseRegistration
 from django.utils.timezone import now
-from datetime import timedelta
+from datetime import date, timedelta
 from utils.schedule_utils import compute_available_time
-from typing import List
\ No newline at end of file
+from typing import List
+from celery import shared_task
+from celery_singleton import Singleton
+from manager.exports import write_xlsx
+from manager.metrics import reconcile_school
+from manager.rollups import refresh_rollups
+from manager.utilization import current_week_start, refresh_week
+
+ROLLUP_RECONCILE_DAYS = 35
+
+
+# Rebuild dashboard metrics from the source tables, catching up on bulk writes that skip signals
+@shared_task(base=Singleton)
+def reconcile_school_metrics():
+    school_ids = list(School.objects.values_list("id", flat=True))
+    for school_id in school_ids:
+        reconcile_school(school_id)
+    return len(school_ids)
+
+
+# Rebuild one rollup day queued by manager.rollups.mark_stale
+@shared_task
+def refresh_rollup_day(school_id, day):
+    return refresh_rollups(school_id, date.fromisoformat(day))
+
+
+# Rebuild the recent rollup days of every school, catching up on writes that skip signals
+@shared_task(base=Singleton)
+def refresh_recent_rollups(days=ROLLUP_RECONCILE_DAYS):
+    end = now().date()
+    start = end - timedelta(days=days)
+    school_ids = list(School.objects.values_list("id", flat=True))
+    for school_id in school_ids:
+        refresh_rollups(school_id, start, end)
+    return len(school_ids)
+
+
+# Store last week's final utilization and this week's so far for every school
+@shared_task(base=Singleton)
+def refresh_teacher_utilization():
+    school_ids = list(School.objects.values_list("id", flat=True))
+    for school_id in school_ids:
+        current = current_week_start(school_id)
+        refresh_week(school_id, current - timedelta(days=7))
+        refresh_week(school_id, current)
+    return len(school_ids)
+
+
+# Build an XLSX export and save it to storage
+@shared_task
+def export_xlsx(kind, school_id, start_date, end_date):
+    name = write_xlsx(kind, school_id, date.fromisoformat(start_date), date.fromisoformat(end_date))
+    return {"school_id": school_id, "name": name}
@@ -8,11 +8,35 @@ insightViewSet = views.InsightViewSet.as_view({
     'get': 'retrieve'
 })
 
+reportViewSet = views.ReportViewSet.as_view({
+    'get': 'retrieve'
+})
+
+utilizationViewSet = views.ReportViewSet.as_view({
+    'get': 'utilization'
+})
+
+exportViewSet = views.ExportViewSet.as_view({
+    'get': 'retrieve'
+})
+
+exportXlsxViewSet = views.ExportViewSet.as_view({
+    'post': 'create_xlsx'
+})
+
+exportJobViewSet = views.ExportViewSet.as_view({
+    'get': 'job'
+})
+
 lessonViewSet = views.LessonViewSet.as_view({
     'get': "list",
     'post': 'create'
 })
 
+lessonSeriesViewSet = views.LessonViewSet.as_view({
+    'post': 'create_series'
+})
+
 lessonDetailViewSet = views.LessonViewSet.as_view({
     'put': "edit",
 })
@@ -40,6 +64,10 @@ staffViewSet = views.StaffViewSet.as_view({
     "post": "create"
 })
 
+staffSearchViewSet = views.StaffViewSet.as_view({
+    'get': "search"
+})
+
 staffDetailViewSet = views.StaffViewSet.as_view({
     'get': "retrieve",
     "put": 'edit',
@@ -50,6 +78,10 @@ staffClientViewSet = views.StaffViewSet.as_view({
     'get': "client"
 })
 
+staffReassignViewSet = views.StaffViewSet.as_view({
+    'post': "reassign"
+})
+
 staffAvailableViewSet = views.StaffViewSet.as_view({
     'get': "get_availables"
 })
@@ -64,6 +96,10 @@ clientViewSet = views.ClientViewSet.as_view({
     "post": "create"
 })
 
+clientSearchViewSet = views.ClientViewSet.as_view({
+    'get': "search"
+})
+
 clientDetailViewSet = views.ClientViewSet.as_view({
     "put": "edit",
     "get": "retrieve",
@@ -116,8 +152,14 @@ schoolSettingsViewSet = views.SchoolSettingsViewSet.as_view({
 # Enter URL path below
 urlpatterns = format_suffix_patterns([
     path('insight', insightViewSet, name='insight'),
+    path('report', reportViewSet, name='report'),
+    path('report/utilization', utilizationViewSet, name='report-utilization'),
+    path('export/jobs/<uuid:job_id>', exportJobViewSet, name='export-job'),
+    path('export/<slug:kind>', exportViewSet, name='export'),
+    path('export/<slug:kind>/xlsx', exportXlsxViewSet, name='export-xlsx'),
     
     path('lesson', lessonViewSet, name='lesson-list'),
+    path('lesson/series', lessonSeriesViewSet, name='lesson-series'),
     path('lesson/<slug:code>', lessonDetailViewSet, name='lesson-detail'),
     path('lesson/<slug:code>/cancel', lessonCancelViewSet, name='lesson-cancel'),
 
@@ -126,12 +168,15 @@ urlpatterns = format_suffix_patterns([
     path('purchase/<slug:uuid>/payment-validation', paymentViewset, name='purchase'),
 
     path('staff', staffViewSet, name='staff-list'),
+    path('staff/search', staffSearchViewSet, name='staff-search'),
     path('staff/<slug:uuid>', staffDetailViewSet, name='staff-detail'),
     path('staff/<slug:uuid>/client', staffClientViewSet, name='staff-client'),
     path('staff/<slug:uuid>/available-time', availableTimeViewSet, name='client-registration'),
+    path('staff/<slug:uuid>/reassign', staffReassignViewSet, name='staff-reassign'),
     path('staff/<slug:uuid>/available', staffAvailableViewSet, name='client-registration'),
 
     path('client', clientViewSet, name='client'),
+    path('client/search', clientSearchViewSet, name='client-search'),
     path('client/<slug:uuid>', clientDetailViewSet, name='client-detail'),
     path('client/<slug:uuid>/registration', clientRegistrationViewSet, name='client-registration'),
 
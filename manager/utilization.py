@@ -0,0 +1,115 @@
+from datetime import timedelta
+from django.db.models import F, Prefetch, Sum
+from django.utils import timezone
+from manager.models import TeacherWeeklyUtilization
+from manager.rollups import local_range
+from school.config import get_school_timezone
+from teacher.models import Lesson, Teacher, UnavailableTimeOneTime
+from utils.schedule_utils import minute_of_day, subtract_intervals
+
+BOOKED_STATUSES = ("CON", "COM")
+
+
+def week_start_of(day):
+    return day - timedelta(days=day.weekday())
+
+
+def current_week_start(school_id):
+    return week_start_of(timezone.localdate(timezone=get_school_timezone(school_id)))
+
+
+def offered_minutes(teacher, week_start):
+    """Minutes of the teacher's weekly AvailableTime left after regular and one-time unavailabilities."""
+    total = 0
+    for offset in range(7):
+        day = week_start + timedelta(days=offset)
+        weekday = str(day.isoweekday())
+        windows = [(minute_of_day(a.start), minute_of_day(a.stop)) for a in teacher.available_time.all() if a.day == weekday]
+        if not windows:
+            continue
+        cuts = [(minute_of_day(u.start), minute_of_day(u.stop)) for u in teacher.unavailable_reg.all() if u.day == weekday]
+        cuts += [(minute_of_day(u.start), minute_of_day(u.stop)) for u in teacher.week_unavailable_once if u.date == day]
+        total += sum(stop - start for start, stop in subtract_intervals(windows, cuts))
+    return total
+
+
+def compute_week(school_id, week_start):
+    """{teacher_id: (offered_minutes, booked_minutes)} of a school's teachers for one week."""
+    week_end = week_start + timedelta(days=6)
+    teachers = Teacher.objects.filter(school_id=school_id).prefetch_related(
+        "available_time",
+        "unavailable_reg",
+        Prefetch(
+            "unavailable_once",
+            queryset=UnavailableTimeOneTime.objects.filter(date__range=(week_start, week_end)),
+            to_attr="week_unavailable_once",
+        ),
+    )
+
+    _, lower, upper = local_range(school_id, week_start, week_end)
+    booked = dict(
+        Lesson.objects.filter(
+            school_id=school_id, teacher__isnull=False, status__in=BOOKED_STATUSES,
+            datetime__gte=lower, datetime__lt=upper,
+        ).values("teacher_id").annotate(
+            booked=Sum(F("end_datetime") - F("datetime")),
+        ).values_list("teacher_id", "booked")
+    )
+    return {
+        teacher.id: (offered_minutes(teacher, week_start), int(booked[teacher.id].total_seconds() // 60) if booked.get(teacher.id) else 0)
+        for teacher in teachers
+    }
+
+
+def refresh_week(school_id, week_start):
+    """Compute and store one week of utilization for every teacher of a school."""
+    rows = [
+        TeacherWeeklyUtilization(teacher_id=teacher_id, week_start=week_start, offered_minutes=offered, booked_minutes=booked)
+        for teacher_id, (offered, booked) in compute_week(school_id, week_start).items()
+    ]
+    TeacherWeeklyUtilization.objects.bulk_create(
+        rows,
+        update_conflicts=True,
+        unique_fields=["teacher", "week_start"],
+        update_fields=["offered_minutes", "booked_minutes", "computed_at"],
+    )
+    return len(rows)
+
+
+def utilization_report(school_id, start, end, teacher_id=None):
+    """
+    Stored teacher-weeks of a school covering start..end. Only the current week
+    is recomputed on read; past weeks are computed once if never stored.
+    """
+    weeks = []
+    week = week_start_of(start)
+    while week <= end:
+        weeks.append(week)
+        week += timedelta(days=7)
+
+    current = current_week_start(school_id)
+    stored = set(
+        TeacherWeeklyUtilization.objects.filter(teacher__school_id=school_id, week_start__in=weeks)
+        .values_list("week_start", flat=True).distinct()
+    )
+    for week in weeks:
+        if week == current or (week < current and week not in stored):
+            refresh_week(school_id, week)
+
+    rows = TeacherWeeklyUtilization.objects.filter(
+        teacher__school_id=school_id, week_start__in=weeks,
+    ).select_related("teacher__user").order_by("week_start", "teacher_id")
+    if teacher_id is not None:
+        rows = rows.filter(teacher_id=teacher_id)
+
+    return [
+        {
+            "teacher_uuid": row.teacher.user.uuid,
+            "teacher_name": row.teacher.user.get_full_name(),
+            "week_start": row.week_start,
+            "offered_minutes": row.offered_minutes,
+            "booked_minutes": row.booked_minutes,
+            "utilization": round(row.booked_minutes / row.offered_minutes, 4) if row.offered_minutes else None,
+        }
+        for row in rows
+    ]
@@ -1,13 +1,21 @@
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.viewsets import ViewSet
 from rest_framework.response import Response
-from django.db.models import Prefetch, Sum, Count
+from django.db.models import Prefetch, Q, Case, When, Value
 from django.db.models.deletion import ProtectedError
 from datetime import datetime
+from uuid import UUID, uuid4
 from student.models import Lesson, CourseRegistration, StudentTeacherRelation, Student, Booking
 from school.models import School, Course, SchoolSettings  # Ensure Admin model is imported
+from school.config import get_school_config
 from teacher.models import Teacher, AvailableTime
 from manager.models import Admin
+from manager.metrics import get_school_metrics
+from manager.rollups import rollup_report, PERIODS
+from manager.utilization import utilization_report
+from manager.exports import EXPORTS, stream_csv
+from manager.tasks import export_xlsx
+from student import services as booking_services
 from manager.serializers import ( 
     CourseRegistrationSerializer, 
     RegistrationDetailSerializer,
@@ -16,8 +24,9 @@ from manager.serializers import (
     CourseDetailSerializer,
     PurchaseSerializer, 
     AvailableTimeSerializer, 
-    LessonSerializer,
+    LessonListProjection,
     EditLessonSerializer,
+    ReassignTeacherSerializer,
     ProfileSerializer,  # Add this import
     SchoolSettingsSerializer,  # Add this import
     SchoolSerializer
@@ -26,42 +35,190 @@ from core.serializers import CreateUserSerializer, UserUpdateSerializer
 from rest_framework import status
 from django.db.utils import IntegrityError
 from internal.permissions import IsManager
+from internal.storage import media_url
+from internal.pagination import KeysetPagination, SearchPagination
+from core.search import search_users, MIN_SEARCH_LENGTH
+from internal.conditional import conditional_list, COURSES, STAFF, CLIENTS
 from django.db import transaction
+from django.http import StreamingHttpResponse
+from django.core.cache import cache
+from django.core.files.storage import default_storage
+from celery.result import AsyncResult
 from django.utils.dateparse import parse_date
 from utils.notification_utils import send_notification
 from utils.schedule_utils import compute_available_time
+from teacher.v2.serializers import CreateLessonSeriesSerializer
+from teacher import services as teacher_services
+from teacher.tasks import queue_notifications
 
 class InsightViewSet(ViewSet):
     permission_classes = [IsAuthenticated, IsManager]
 
     def retrieve(self, request):
-        # Retrieve the Admin instance for the logged-in user
-        admin = Admin.objects.filter(user_id=request.user.id).first()
-        if not admin:
+        # Resolve the logged-in admin and their school
+        principal = request.principal
+        if not principal.admin_id:
             return Response({"error": "Admin not found for the current user."}, status=404)
 
-        total_earnings = CourseRegistration.objects.filter(course__school=admin.school_id).aggregate(
-            total_paid_price=Sum('paid_price')
-        )['total_paid_price']
-        # Fetch and annotate metrics for the specific school
-        school_analytics = School.objects.filter(id=admin.school.id).annotate(
-            purchases=Count("course__registration", distinct=True),
-            staffs=Count("teacher", distinct=True),
-            clients=Count("student", distinct=True),
-            weekly_class=Count("course__lesson", distinct=True),
-        ).first()  # Fetch the first (and only) result for this school
+        # Read the maintained totals, see manager.metrics
+        metrics = get_school_metrics(principal.school_id)
 
         # Prepare the analysis dictionary
         analysis = {
-            "earnings_amount": total_earnings,
-            "staffs": school_analytics.staffs or 0,
-            "clients": school_analytics.clients or 0,
-            "weekly_class": school_analytics.weekly_class or 0,
-            "purchases": school_analytics.purchases or 0,
+            "earnings_amount": metrics.earnings,
+            "staffs": metrics.staffs,
+            "clients": metrics.clients,
+            "weekly_class": metrics.lessons,
+            "purchases": metrics.purchases,
         }
 
         # Return the response
         return Response(analysis, status=200)
+
+
+class ReportViewSet(ViewSet):
+    permission_classes = [IsAuthenticated, IsManager]
+    MAX_RANGE_DAYS = 731
+    MAX_UTILIZATION_DAYS = 183
+
+    def retrieve(self, request):
+        # Validate the date range and grouping
+        start_date = parse_date(request.GET.get("start_date") or "")
+        end_date = parse_date(request.GET.get("end_date") or "")
+        if start_date is None or end_date is None:
+            return Response({"error": "start_date and end_date are required. Use 'YYYY-MM-DD'."}, status=400)
+        if start_date > end_date or (end_date - start_date).days > self.MAX_RANGE_DAYS:
+            return Response({"error": f"Date range must be ordered and at most {self.MAX_RANGE_DAYS} days."}, status=400)
+
+        period = request.GET.get("period", "week")
+        if period not in PERIODS:
+            return Response({"error": f"Invalid period. Valid values are {', '.join(PERIODS)}."}, status=400)
+
+        # Resolve the logged-in admin and their school
+        principal = request.principal
+        if not principal.admin_id:
+            return Response({"error": "Admin not found for the current user."}, status=404)
+
+        # Optional teacher and course filters, scoped to the school
+        teacher_id = course_id = None
+        try:
+            teacher_uuid = UUID(request.GET["teacher_uuid"]) if request.GET.get("teacher_uuid") else None
+            course_uuid = UUID(request.GET["course_uuid"]) if request.GET.get("course_uuid") else None
+        except ValueError:
+            return Response({"error": "Invalid teacher_uuid or course_uuid."}, status=400)
+        if teacher_uuid:
+            teacher_id = Teacher.objects.filter(user__uuid=teacher_uuid, school_id=principal.school_id).values_list("id", flat=True).first()
+            if teacher_id is None:
+                return Response({"error": "Teacher not found."}, status=404)
+        if course_uuid:
+            course_id = Course.objects.filter(uuid=course_uuid, school_id=principal.school_id).values_list("id", flat=True).first()
+            if course_id is None:
+                return Response({"error": "Course not found."}, status=404)
+
+        # Sum the pre-aggregated daily buckets, see manager.rollups
+        report = rollup_report(principal.school_id, start_date, end_date, period, teacher_id, course_id)
+        return Response({"start_date": start_date, "end_date": end_date, "period": period, **report}, status=200)
+
+    def utilization(self, request):
+        # Validate the date range
+        start_date = parse_date(request.GET.get("start_date") or "")
+        end_date = parse_date(request.GET.get("end_date") or "")
+        if start_date is None or end_date is None:
+            return Response({"error": "start_date and end_date are required. Use 'YYYY-MM-DD'."}, status=400)
+        if start_date > end_date or (end_date - start_date).days > self.MAX_UTILIZATION_DAYS:
+            return Response({"error": f"Date range must be ordered and at most {self.MAX_UTILIZATION_DAYS} days."}, status=400)
+
+        # Resolve the logged-in admin and their school
+        principal = request.principal
+        if not principal.admin_id:
+            return Response({"error": "Admin not found for the current user."}, status=404)
+
+        # Optional teacher filter, scoped to the school
+        teacher_id = None
+        if request.GET.get("teacher_uuid"):
+            try:
+                teacher_uuid = UUID(request.GET["teacher_uuid"])
+            except ValueError:
+                return Response({"error": "Invalid teacher_uuid."}, status=400)
+            teacher_id = Teacher.objects.filter(user__uuid=teacher_uuid, school_id=principal.school_id).values_list("id", flat=True).first()
+            if teacher_id is None:
+                return Response({"error": "Teacher not found."}, status=404)
+
+        # Stored teacher-weeks, see manager.utilization
+        weeks = utilization_report(principal.school_id, start_date, end_date, teacher_id)
+        return Response({"utilization": weeks}, status=200)
+
+
+class ExportViewSet(ViewSet):
+    permission_classes = [IsAuthenticated, IsManager]
+    MAX_RANGE_DAYS = 731
+    JOB_TIMEOUT = 60 * 60 * 24  # As long as Celery keeps task results
+
+    def date_range(self, params):
+        """(start_date, end_date, error response)."""
+        start_date = parse_date(params.get("start_date") or "")
+        end_date = parse_date(params.get("end_date") or "")
+        if start_date is None or end_date is None:
+            return None, None, Response({"error": "start_date and end_date are required. Use 'YYYY-MM-DD'."}, status=400)
+        if start_date > end_date or (end_date - start_date).days > self.MAX_RANGE_DAYS:
+            return None, None, Response({"error": f"Date range must be ordered and at most {self.MAX_RANGE_DAYS} days."}, status=400)
+        return start_date, end_date, None
+
+    def retrieve(self, request, kind):
+        """Stream an export as CSV, reading rows through a server-side cursor."""
+        if kind not in EXPORTS:
+            return Response({"error": f"Invalid export. Valid values are {', '.join(EXPORTS)}."}, status=404)
+        start_date, end_date, error = self.date_range(request.GET)
+        if error:
+            return error
+
+        # Resolve the logged-in admin and their school
+        principal = request.principal
+        if not principal.admin_id:
+            return Response({"error": "Admin not found for the current user."}, status=404)
+
+        response = StreamingHttpResponse(
+            stream_csv(kind, principal.school_id, start_date, end_date), content_type="text/csv; charset=utf-8",
+        )
+        response["Content-Disposition"] = f'attachment; filename="{kind}-{start_date}-{end_date}.csv"'
+        return response
+
+    def create_xlsx(self, request, kind):
+        """Queue an XLSX export; poll it with `job`."""
+        if kind not in EXPORTS:
+            return Response({"error": f"Invalid export. Valid values are {', '.join(EXPORTS)}."}, status=404)
+        start_date, end_date, error = self.date_range(request.data)
+        if error:
+            return error
+
+        # Resolve the logged-in admin and their school
+        principal = request.principal
+        if not principal.admin_id:
+            return Response({"error": "Admin not found for the current user."}, status=404)
+
+        # Record the owner before queuing, so a queued job always has one
+        job_id = str(uuid4())
+        cache.set(f"export-job:{job_id}", principal.school_id, self.JOB_TIMEOUT)
+        export_xlsx.apply_async(
+            (kind, principal.school_id, start_date.isoformat(), end_date.isoformat()), task_id=job_id,
+        )
+        return Response({"job_id": job_id}, status=202)
+
+    def job(self, request, job_id):
+        principal = request.principal
+        if not principal.admin_id:
+            return Response({"error": "Admin not found for the current user."}, status=404)
+
+        # Only the school that queued the job may see it, whatever its state
+        if cache.get(f"export-job:{job_id}") != principal.school_id:
+            return Response({"error": "Export not found."}, status=404)
+
+        result = AsyncResult(str(job_id))
+        if result.failed():
+            return Response({"status": "failed"}, status=200)
+        if not result.successful():
+            return Response({"status": "pending"}, status=200)
+        return Response({"status": "done", "url": default_storage.url(result.result["name"])}, status=200)
     
 class LessonViewSet(ViewSet):
     permission_classes = [IsAuthenticated, IsManager]
@@ -86,13 +243,13 @@ class LessonViewSet(ViewSet):
         if lesson_statuses and not set(lesson_statuses).issubset(valid_statuses):
             return Response({"error": f"Invalid lesson statuses. Valid statuses are {list(valid_statuses)}."}, status=400)
 
-        # Get the Admin instance for the logged-in user
-        admin = Admin.objects.filter(user_id=request.user.id).select_related("school").first()
-        if not admin or not admin.school:
+        # Resolve the logged-in admin and their school
+        principal = request.principal
+        if not principal.admin_id:
             return Response({"error": "Admin not found for the current user."}, status=404)
 
         # Build filtering conditions
-        filters = {"course__school": admin.school}
+        filters = {"school_id": principal.school_id}
         if start_date:
             filters["datetime__gte"] = start_date
         if end_date:
@@ -100,29 +257,24 @@ class LessonViewSet(ViewSet):
         if lesson_statuses:
             filters["status__in"] = lesson_statuses
 
-        # Fetch lessons efficiently
-        lessons = (
-            Lesson.objects
-            .select_related("course", "teacher__user")
-            .prefetch_related(
-                Prefetch(
-                    "booking",
-                    queryset=Booking.objects.select_related("student__user"),
-                    to_attr="prefetched_bookings"
-                )
-            )
-            .filter(**filters)
-        )
+        # Project lessons and their bookings straight from flat rows
+        lessons = Lesson.objects.filter(**filters)
+
+        # Page in calendar order when the client asks for it: the page is keyed
+        # on (datetime, id) alone, then projected by id
+        paginator = KeysetPagination("datetime")
+        if paginator.is_requested(request):
+            page = paginator.paginate_queryset(lessons.values("id", "datetime"), request)
+            lessons = Lesson.objects.filter(id__in=[row["id"] for row in page]).order_by(*paginator.ordering)
+            return paginator.get_paginated_response(LessonListProjection(lessons).data)
 
-        # Build response data
-        serialized_data = LessonSerializer(lessons, many=True).data
-        print(serialized_data)
+        serialized_data = LessonListProjection(lessons).data
         return Response(serialized_data, status=200)
 
     def create(self, request):
-        # Retrieve the Admin instance for the logged-in user
-        admin = Admin.objects.filter(user_id=request.user.id).first()
-        if not admin:
+        # Resolve the logged-in admin and their school
+        principal = request.principal
+        if not principal.admin_id:
             return Response({"error": "Admin not found for the current user."}, status=404)
 
         # Validate the request data
@@ -132,6 +284,25 @@ class LessonViewSet(ViewSet):
             return Response(serializer.data, status=201)
         return Response(serializer.errors, status=400)
     
+    def create_series(self, request):
+        principal = request.principal
+        if not principal.admin_id:
+            return Response({"error": "Admin not found for the current user."}, status=404)
+
+        serializer = CreateLessonSeriesSerializer(data=request.data, context={"school_id": principal.school_id})
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=400)
+
+        series = serializer.save()
+        if not series["lessons"]:
+            return Response({"error": "The series conflicts with existing lessons.", **serializer.data}, status=409)
+
+        # Send notifications
+        message = f"Admin has booked {len(series['lessons'])} classes for you. Check your schedule for details."
+        send_notification(serializer.validated_data["student"].user, "New Booking Alert", message)
+        send_notification(serializer.validated_data["teacher"].user, "New Booking Alert", message)
+        return Response(serializer.data, status=201)
+
     def cancel(self, request, code):
         if not code:
             return Response({"error": "Lesson UUID is required."}, status=400)
@@ -164,65 +335,74 @@ class CourseRegistrationViewSet(ViewSet):
     permission_classes = [IsAuthenticated, IsManager]
 
     def list(self, request):
-        # Retrieve the Admin instance for the logged-in user
-        admin = Admin.objects.filter(user_id=request.user.id).first()
-        if not admin:
-            return Response({"error": "Admin not found for the current user."}, status=404)
-
-        # Prefetch data for the admin's school, including registration and related student/course data
-        school = School.objects.prefetch_related(
-            Prefetch(
-                "course",  # Prefetch all courses related to the school
-                queryset=Course.objects.prefetch_related(
-                    Prefetch(
-                        "registration",  # Prefetch registrations related to each course
-                        queryset=CourseRegistration.objects.select_related("student__user", "teacher__user", "course"),
-                        to_attr="prefetched_registrations",  # Store prefetched registrations in this attribute
-                    )
-                ),
-                to_attr="prefetched_courses"  # Store prefetched courses in this attribute
-            )
-        ).filter(id=admin.school.id).first()
-
-        if not school:
-            return Response({"error": "School not found."}, status=404)
+        # Validate filters
+        payment_status = request.GET.get("payment_status")
+        if payment_status and payment_status not in dict(CourseRegistration.PAYMENT_STATUS_CHOICES):
+            return Response({"error": "Invalid payment_status. Valid values are confirm, waiting and denied."}, status=400)
 
-        # Collect registrations from the prefetched courses
-        purchases = [
-            registration
-            for course in getattr(school, "prefetched_courses", [])
-            for registration in getattr(course, "prefetched_registrations", [])
-        ]
+        start_date = parse_date(request.GET["start_date"]) if request.GET.get("start_date") else None
+        end_date = parse_date(request.GET["end_date"]) if request.GET.get("end_date") else None
+        if start_date is None and request.GET.get("start_date"):
+            return Response({"error": "Invalid start_date format. Use 'YYYY-MM-DD'."}, status=400)
+        if end_date is None and request.GET.get("end_date"):
+            return Response({"error": "Invalid end_date format. Use 'YYYY-MM-DD'."}, status=400)
 
-        # Serialize the data using the optimized serializer
-        purchases_data = PurchaseSerializer(purchases, many=True).data
+        # Resolve the logged-in admin and their school
+        principal = request.principal
+        if not principal.admin_id:
+            return Response({"error": "Admin not found for the current user."}, status=404)
 
-        return Response({"purchases": purchases_data})
+        # Flat query over the school's registrations
+        filters = {"course__school_id": principal.school_id}
+        if payment_status:
+            filters["payment_status"] = payment_status
+        if start_date:
+            filters["registered_date__gte"] = start_date
+        if end_date:
+            filters["registered_date__lte"] = end_date
+        if teacher_uuid := request.GET.get("teacher_uuid"):
+            try:
+                filters["teacher__user__uuid"] = UUID(teacher_uuid)
+            except ValueError:
+                return Response({"error": "Invalid teacher_uuid."}, status=400)
+        purchases = CourseRegistration.objects.filter(**filters).select_related("student__user", "teacher__user", "course")
+
+        # Waiting slips first, then the rest, each newest-first
+        waiting = Q(payment_status="waiting")
+        paginator = KeysetPagination("registered_date", descending=True, segments=[waiting, ~waiting])
+        if paginator.is_requested(request):
+            page = paginator.paginate_queryset(purchases, request)
+            return paginator.get_paginated_response(PurchaseSerializer(page, many=True).data)
+
+        purchases = purchases.order_by(
+            Case(When(waiting, then=Value(0)), default=Value(1)), "-registered_date", "-id"
+        )
+        return Response({"purchases": PurchaseSerializer(purchases, many=True).data})
     
     def retrieve(self, request, uuid):
-        admin = Admin.objects.filter(user_id=request.user.id).first()
-        if not admin:
+        principal = request.principal
+        if not principal.admin_id:
             return Response({"error": "Admin not found for the current user."}, status=404)
 
         registration = CourseRegistration.objects.select_related(
             "course",
             "student__user",
             "teacher__user"
-        ).filter(course__school_id=admin.school.id, uuid=uuid).first()
+        ).filter(course__school_id=principal.school_id, uuid=uuid).first()
         if not registration:
             return Response({"error": "Registration not found."}, status=404)
         registration_detail = RegistrationDetailSerializer(registration)
         return Response(registration_detail.data)
 
     def payment_validation(self, request, uuid):
-        # Retrieve the Admin instance for the logged-in user
-        admin = Admin.objects.filter(user_id=request.user.id).first()
-        if not admin:
+        # Resolve the logged-in admin and their school
+        principal = request.principal
+        if not principal.admin_id:
             return Response({"error": "Admin not found for the current user."}, status=404)
 
         # Retrieve the registration by UUID
         try:
-            registration = CourseRegistration.objects.select_related("student__user").get(uuid=uuid, course__school=admin.school)
+            registration = CourseRegistration.objects.select_related("student__user").get(uuid=uuid, course__school_id=principal.school_id)
         except CourseRegistration.DoesNotExist:
             return Response({"error": "Registration not found."}, status=404)
 
@@ -239,7 +419,7 @@ class CourseRegistrationViewSet(ViewSet):
 
             # Retrieve the teacher by UUID and ensure they belong to the admin's school
             try:
-                teacher = Teacher.objects.get(user__uuid=teacher_uuid, school=admin.school)
+                teacher = Teacher.objects.get(user__uuid=teacher_uuid, school_id=principal.school_id)
             except Teacher.DoesNotExist:
                 return Response({"error": "Teacher not found or does not belong to the admin's school."}, status=404)
 
@@ -259,18 +439,18 @@ class CourseRegistrationViewSet(ViewSet):
         return Response({"message": "Payment status and teacher updated successfully."}, status=200)
     
     def edit(self, request, uuid):
-        admin = Admin.objects.filter(user_id=request.user.id).first()
-        if not admin:
+        principal = request.principal
+        if not principal.admin_id:
             return Response({"error": "Admin not found for the current user."}, status=404)
 
-        registration = CourseRegistration.objects.filter(course__school_id=admin.school.id, uuid=uuid).first()
+        registration = CourseRegistration.objects.filter(course__school_id=principal.school_id, uuid=uuid).first()
         if not registration:
             return Response({"error": "Registration not found."}, status=404)
 
         teacher_uuid = request.data.get('teacher_uuid')
         if teacher_uuid:
             try:
-                teacher = Teacher.objects.get(user__uuid=teacher_uuid, school=admin.school)
+                teacher = Teacher.objects.get(user__uuid=teacher_uuid, school_id=principal.school_id)
                 registration.teacher = teacher
             except Teacher.DoesNotExist:
                 return Response({"error": "Teacher not found or does not belong to the admin's school."}, status=404)
@@ -282,11 +462,11 @@ class CourseRegistrationViewSet(ViewSet):
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
     def remove(self, request, uuid):
-        admin = Admin.objects.filter(user_id=request.user.id).first()
-        if not admin:
+        principal = request.principal
+        if not principal.admin_id:
             return Response({"error": "Admin not found for the current user."}, status=404)
 
-        registration = CourseRegistration.objects.filter(course__school_id=admin.school.id, uuid=uuid).first()
+        registration = CourseRegistration.objects.filter(course__school_id=principal.school_id, uuid=uuid).first()
         if not registration:
             return Response({"error": "Registration not found."}, status=404)
 
@@ -296,53 +476,62 @@ class CourseRegistrationViewSet(ViewSet):
 class StaffViewSet(ViewSet):
     permission_classes = [IsAuthenticated, IsManager]
 
+    @conditional_list(STAFF)
     def list(self, request):
-        # Retrieve the Admin instance for the logged-in user
-        admin = Admin.objects.select_related('school').filter(user_id=request.user.id).first()
-        if not admin:
+        # Resolve the logged-in admin and their school
+        principal = request.principal
+        if not principal.admin_id:
             return Response({"error": "Admin not found for the current user."}, status=404)
 
         # Ensure the admin is associated with a school
-        school = admin.school
-        if not school:
+        if not principal.school_id:
             return Response({"error": "Admin is not associated with any school."}, status=404)
 
-        # Prefetch teachers and their user data for the school
-        school = School.objects.prefetch_related(
-            Prefetch(
-                'teacher',
-                queryset=Teacher.objects.select_related('user'),
-                to_attr='cached_teachers'
-            )
-        ).filter(id=school.id).first()
-
-        if not school:
-            return Response({"error": "School not found."}, status=404)
+        # Fetch teachers and their user data for the school
+        teachers = Teacher.objects.select_related('user').filter(school_id=principal.school_id)
 
         # Format the response data for employees
-        employees = [
-            {
-                "profile_picture": teacher.user.profile_image.url if teacher.user.profile_image else "",
-                "first_name": teacher.user.first_name,
-                "last_name": teacher.user.last_name,
-                "uuid": teacher.user.uuid,
-                "phone_number": teacher.user.phone_number,
-                "email": teacher.user.email,
-                "break_time": teacher.teacher_break,
-                "is_manager": teacher.user.is_manager,
-            } for teacher in school.cached_teachers
-        ]
+        employees = [self.employee_row(teacher) for teacher in teachers]
 
         return Response({"employees": employees})
+
+    def search(self, request):
+        # Resolve the logged-in admin and their school
+        principal = request.principal
+        if not principal.admin_id:
+            return Response({"error": "Admin not found for the current user."}, status=404)
+
+        term = request.GET.get("q", "").strip()
+        if len(term) < MIN_SEARCH_LENGTH:
+            return Response({"error": f"Search query must be at least {MIN_SEARCH_LENGTH} characters."}, status=400)
+
+        # Ranked hits among the school's teachers, one page at a time
+        teachers = search_users(Teacher.objects.select_related('user').filter(school_id=principal.school_id), term, "user__")
+        paginator = SearchPagination()
+        page = paginator.paginate_queryset(teachers, request, view=self)
+        return paginator.get_paginated_response([self.employee_row(teacher) for teacher in page])
+
+    @staticmethod
+    def employee_row(teacher):
+        return {
+            "profile_picture": media_url(teacher.user.profile_image),
+            "first_name": teacher.user.first_name,
+            "last_name": teacher.user.last_name,
+            "uuid": teacher.user.uuid,
+            "phone_number": teacher.user.phone_number,
+            "email": teacher.user.email,
+            "break_time": teacher.teacher_break,
+            "is_manager": teacher.user.is_manager,
+        }
     
     def retrieve(self, request, uuid=None):
-        # Retrieve the Admin instance for the logged-in user
-        admin = Admin.objects.filter(user_id=request.user.id).first()
-        if not admin:
+        # Resolve the logged-in admin and their school
+        principal = request.principal
+        if not principal.admin_id:
             return Response({"error": "Admin not found for the current user."}, status=404)
 
         # Retrieve the teacher by primary key (id)
-        teacher = Teacher.objects.get(user__uuid=uuid, school_id=admin.school.id)
+        teacher = Teacher.objects.get(user__uuid=uuid, school_id=principal.school_id)
         if not teacher:
             return Response({"error": "Teacher not found."}, status=404)
 
@@ -354,7 +543,7 @@ class StaffViewSet(ViewSet):
         # Prepare the detailed response for the teacher
         teacher_details = {
             "id": user.uuid,  # Using UUID as a unique identifier
-            "profile_picture": user.profile_image.url if user.profile_image else "",
+            "profile_picture": media_url(user.profile_image),
             "first_name": user.first_name,
             "last_name": user.last_name,  # Full name
             "email": user.email,
@@ -366,9 +555,9 @@ class StaffViewSet(ViewSet):
         return Response({"teacher": teacher_details})
         
     def client(self, request, uuid=None):
-        # Retrieve the Admin instance for the logged-in user
-        admin = Admin.objects.select_related('school').filter(user_id=request.user.id).first()
-        if not admin:
+        # Resolve the logged-in admin and their school
+        principal = request.principal
+        if not principal.admin_id:
             return Response({"error": "Admin not found for the current user."}, status=404)
 
         # Retrieve the teacher by their UUID and ensure they belong to the admin's school
@@ -379,7 +568,7 @@ class StaffViewSet(ViewSet):
                     queryset=StudentTeacherRelation.objects.select_related('student__user'),
                     to_attr='cached_student_relation'
                 )
-            ).get(user__uuid=uuid, school_id=admin.school.id)
+            ).get(user__uuid=uuid, school_id=principal.school_id)
         except Teacher.DoesNotExist:
             return Response({"error": "Teacher not found."}, status=404)
 
@@ -396,16 +585,16 @@ class StaffViewSet(ViewSet):
         return Response({"clients": clients})
 
     def edit(self, request, uuid):
-        # Retrieve the Admin instance for the logged-in user
-        admin = Admin.objects.select_related('school').filter(user_id=request.user.id).first()
-        if not admin:
+        # Resolve the logged-in admin and their school
+        principal = request.principal
+        if not principal.admin_id:
             return Response({"error": "Admin not found for the current user."}, status=404)
 
         break_time = request.data.get('break_time', None)
 
         # Retrieve the teacher by their UUID and ensure they belong to the admin's school
         try:
-            teacher = Teacher.objects.get(user__uuid=uuid, school_id=admin.school.id)
+            teacher = Teacher.objects.get(user__uuid=uuid, school_id=principal.school_id)
             if break_time:
                 teacher.teacher_break = int(break_time)
                 teacher.save()
@@ -422,7 +611,7 @@ class StaffViewSet(ViewSet):
                     
                 if instance.is_manager:
                     # Create Admin instance if it doesn't exist
-                    Admin.objects.get_or_create(user=teacher.user, school=admin.school)
+                    Admin.objects.get_or_create(user=teacher.user, school_id=principal.school_id)
                 else:
                     # Remove Admin instance if it exists
                     Admin.objects.filter(user=teacher.user).delete()
@@ -444,9 +633,9 @@ class StaffViewSet(ViewSet):
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
     
     def create(self, request):
-        # Retrieve the Admin instance for the logged-in user
-        admin = Admin.objects.select_related('school__settings').filter(user_id=request.user.id).first()
-        if not admin:
+        # Resolve the logged-in admin and their school
+        principal = request.principal
+        if not principal.admin_id:
             return Response({"error": "Admin not found for the current user."}, status=404)
 
         # Deserialize the request data for the User (teacher) creation
@@ -466,14 +655,13 @@ class StaffViewSet(ViewSet):
             user.is_manager = is_manager
             user.save()
             
-            # Create the Teacher instance and associate with the School
-            teacher = Teacher.objects.create(user=user, school=admin.school)
+            # Create the Teacher instance with the school's default break
+            config = get_school_config(principal.school_id)
+            teacher = Teacher.objects.create(user=user, school_id=principal.school_id, teacher_break=config.teacher_break)
             available_time_serializer.save(teacher=teacher)
-            teacher.teacher_break = admin.school.settings.teacher_break
-            teacher.save()
             # If the user is a manager, create an Admin instance
             if is_manager:
-                Admin.objects.create(user=user, school=admin.school)
+                Admin.objects.create(user=user, school_id=principal.school_id)
             
             return Response(user_serializer.data, status=status.HTTP_201_CREATED)
         except IntegrityError as e:
@@ -488,9 +676,9 @@ class StaffViewSet(ViewSet):
             return Response({"error": "An error occurred while creating the staff."}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
     
     def get_availables(self, request, uuid):
-        # Retrieve the Admin instance for the logged-in user
-        admin = Admin.objects.select_related('school').filter(user_id=request.user.id).first()
-        if not admin:
+        # Resolve the logged-in admin and their school
+        principal = request.principal
+        if not principal.admin_id:
             return Response({"error": "Admin not found for the current user."}, status=404)
 
         # Extract date and duration from request data
@@ -514,7 +702,7 @@ class StaffViewSet(ViewSet):
             Prefetch('lesson', queryset=Lesson.objects.filter(status__in=["CON", "PENTE"]), to_attr='cached_lessons'),
             Prefetch('course', queryset=Course.objects.filter(is_group=False), to_attr='cached_courses'),
             Prefetch('available_time', queryset=AvailableTime.objects.filter(day=str(date.weekday() + 1)), to_attr='cached_available_times'),  # Prefetch available times
-        ).filter(user__uuid=uuid, school_id=admin.school.id).first()
+        ).filter(user__uuid=uuid, school_id=principal.school_id).first()
 
         if not teacher:
             return Response({"error": "Teacher not found."}, status=404)
@@ -535,11 +723,11 @@ class StaffViewSet(ViewSet):
         return Response(availables, status=200)
     
     def destroy(self, request, uuid):
-        admin = Admin.objects.filter(user_id=request.user.id).first()
-        if not admin:
+        principal = request.principal
+        if not principal.admin_id:
             return Response({"error": "Admin not found for the current user."}, status=404)
 
-        teacher = Teacher.objects.filter(user__uuid=uuid, school=admin.school).first()
+        teacher = Teacher.objects.filter(user__uuid=uuid, school_id=principal.school_id).first()
         if not teacher:
             return Response({"error": "Teacher not found."}, status=404)
         
@@ -548,54 +736,123 @@ class StaffViewSet(ViewSet):
         except ProtectedError:
             return Response({"error": "Cannot delete a student with active registrations."}, status=400)
         return Response({"message": "Staff deleted successfully."}, status=status.HTTP_204_NO_CONTENT)
+
+    def reassign(self, request, uuid):
+        """Move a date range of a teacher's lessons, and optionally their registrations, to another teacher."""
+        principal = request.principal
+        if not principal.admin_id:
+            return Response({"error": "Admin not found for the current user."}, status=404)
+
+        teacher = Teacher.objects.select_related("user").filter(user__uuid=uuid, school_id=principal.school_id).first()
+        if not teacher:
+            return Response({"error": "Teacher not found."}, status=404)
+
+        serializer = ReassignTeacherSerializer(data=request.data)
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=400)
+        data = serializer.validated_data
+
+        target = Teacher.objects.select_related("user").filter(user__uuid=data["to_teacher_uuid"], school_id=principal.school_id).first()
+        if not target:
+            return Response({"error": "Teacher not found or does not belong to the admin's school."}, status=404)
+        if target.pk == teacher.pk:
+            return Response({"error": "Lessons are already assigned to this teacher."}, status=400)
+
+        with transaction.atomic():
+            lessons, registrations, kept, conflicts = teacher_services.reassign(
+                principal.school_id, teacher, target, data["start_date"], data["end_date"],
+                registrations=data["registrations"], skip_conflicts=data["skip_conflicts"],
+            )
+            if conflicts and not data["skip_conflicts"]:
+                return Response({"error": "Some lessons conflict with the new teacher's schedule.", "conflicts": conflicts}, status=409)
+
+            # Notify the students of the moved lessons and the new teacher in batches
+            student_users = set()
+            if lessons:
+                student_users = set(Booking.objects.filter(
+                    lesson__in=lessons, status="COM", student__isnull=False,
+                ).values_list("student__user_id", flat=True))
+                queue_notifications(
+                    student_users, "Teacher Change",
+                    f"Your lessons with {teacher.user.first_name} from {data['start_date']} to {data['end_date']} "
+                    f"are now with {target.user.first_name}. Check your schedule for details.",
+                )
+                queue_notifications(
+                    [target.user_id], "New Lessons Assigned",
+                    f"{len(lessons)} lessons of {teacher.user.first_name} have been assigned to you. Check your schedule for details.",
+                )
+            # Students of moved registrations who were not told above
+            registration_users = {user_id for _, user_id in registrations} - student_users
+            if registration_users:
+                queue_notifications(
+                    registration_users, "Teacher Change",
+                    f"Your course registration with {teacher.user.first_name} is now with {target.user.first_name}.",
+                )
+
+        return Response({
+            "lessons": [lesson.code for lesson in lessons],
+            "registrations": [str(uuid) for uuid, _ in registrations],
+            "kept_registrations": [str(uuid) for uuid, _ in kept],
+            "conflicts": conflicts,
+        }, status=200)
     
 class ClientViewSet(ViewSet):
     permission_classes = [IsAuthenticated, IsManager]
 
+    @conditional_list(CLIENTS)
     def list(self, request):
-        # Retrieve the Admin instance for the logged-in user
-        admin = Admin.objects.select_related('school').filter(user_id=request.user.id).first()
-        if not admin:
+        # Resolve the logged-in admin and their school
+        principal = request.principal
+        if not principal.admin_id:
             return Response({"error": "Admin not found for the current user."}, status=404)
 
         # Ensure the admin is associated with a school
-        school = admin.school
-        if not school:
+        if not principal.school_id:
             return Response({"error": "Admin is not associated with any school."}, status=404)
 
-        # Prefetch teachers and their user data for the school
-        school = School.objects.prefetch_related(
-            Prefetch(
-                'student',
-                queryset=Student.objects.select_related('user'),
-                to_attr="students"
-            )
-        ).filter(id=school.id).first()
-
+        # Fetch students and their user data for the school
+        students = Student.objects.select_related('user').filter(school=principal.school_id)
 
         # Format the response data for employees
-        clients = [
-            {
-                "profile_picture": student.user.profile_image.url if student.user.profile_image  else "",
-                "first_name": student.user.first_name,
-                "last_name": student.user.last_name,
-                "uuid": student.user.uuid,
-                "phone_number": student.user.phone_number,
-                "points": student.points,
-            }
-            for student in school.students
-        ]
+        clients = [self.client_row(student) for student in students]
 
         return Response({"clients": clients})
 
+    def search(self, request):
+        # Resolve the logged-in admin and their school
+        principal = request.principal
+        if not principal.admin_id:
+            return Response({"error": "Admin not found for the current user."}, status=404)
+
+        term = request.GET.get("q", "").strip()
+        if len(term) < MIN_SEARCH_LENGTH:
+            return Response({"error": f"Search query must be at least {MIN_SEARCH_LENGTH} characters."}, status=400)
+
+        # Ranked hits among the school's students, one page at a time
+        students = search_users(Student.objects.select_related('user').filter(school=principal.school_id), term, "user__")
+        paginator = SearchPagination()
+        page = paginator.paginate_queryset(students, request, view=self)
+        return paginator.get_paginated_response([self.client_row(student) for student in page])
+
+    @staticmethod
+    def client_row(student):
+        return {
+            "profile_picture": media_url(student.user.profile_image),
+            "first_name": student.user.first_name,
+            "last_name": student.user.last_name,
+            "uuid": student.user.uuid,
+            "phone_number": student.user.phone_number,
+            "points": student.points,
+        }
+
     def retrieve(self, request, uuid=None):
-        # Retrieve the Admin instance for the logged-in user
-        admin = Admin.objects.filter(user_id=request.user.id).first()
-        if not admin:
+        # Resolve the logged-in admin and their school
+        principal = request.principal
+        if not principal.admin_id:
             return Response({"error": "Admin not found for the current user."}, status=404)
 
         # Retrieve the teacher by primary key (id)
-        student = Student.objects.filter(user__uuid=uuid, school=admin.school).first()
+        student = Student.objects.filter(user__uuid=uuid, school=principal.school_id).first()
 
         if not student:
             return Response({"error": "Student not found."}, status=404)
@@ -608,7 +865,7 @@ class ClientViewSet(ViewSet):
         # Prepare the detailed response for the teacher
         student_detail = {
             "uuid": user.uuid,  # Using UUID as a unique identifier
-            "profile_picture": user.profile_image.url if user.profile_image  else "",
+            "profile_picture": media_url(user.profile_image),
             "first_name": user.first_name,
             "last_name": user.last_name,  # Full name
             "email": user.email,
@@ -619,9 +876,9 @@ class ClientViewSet(ViewSet):
         return Response({"student": student_detail})
     
     def create(self, request):
-        # Retrieve the Admin instance for the logged-in user
-        admin = Admin.objects.select_related('school').filter(user_id=request.user.id).first()
-        if not admin:
+        # Resolve the logged-in admin and their school
+        principal = request.principal
+        if not principal.admin_id:
             return Response({"error": "Admin not found for the current user."}, status=404)
 
         # Deserialize the request data for the User (teacher) creation
@@ -636,7 +893,7 @@ class ClientViewSet(ViewSet):
 
             # Create the Teacher instance and associate with the School
             student = Student.objects.create(user=user)
-            student.school.add(admin.school)
+            student.school.add(principal.school_id)
             if points:
                 try:
                     points = int(points)
@@ -662,17 +919,16 @@ class ClientViewSet(ViewSet):
             return Response({"error": "An error occurred while creating the client."}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
         
     def edit(self, request, uuid):
-        # Retrieve the Admin instance for the logged-in user
-        admin = Admin.objects.select_related('school').filter(user_id=request.user.id).first()
-        if not admin:
+        # Resolve the logged-in admin and their school
+        principal = request.principal
+        if not principal.admin_id:
             return Response({"error": "Admin not found for the current user."}, status=404)
 
         # Ensure the admin is associated with a school
-        school = admin.school
-        if not school:
+        if not principal.school_id:
             return Response({"error": "Admin is not associated with any school."}, status=404)
 
-        student = Student.objects.select_related('user').filter(user__uuid=uuid, school=school).first()
+        student = Student.objects.select_related('user').filter(user__uuid=uuid, school=principal.school_id).first()
         if not student:
             return Response({"error": "Student not found."}, status=status.HTTP_404_NOT_FOUND)
         points = request.data.get('points', None)
@@ -710,9 +966,9 @@ class ClientViewSet(ViewSet):
             return Response({"error": "An error occurred while editing the client."}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
     def list_registration(self, request, uuid):
-        # Retrieve the Admin instance for the logged-in user
-        admin = Admin.objects.filter(user_id=request.user.id).first()
-        if not admin:
+        # Resolve the logged-in admin and their school
+        principal = request.principal
+        if not principal.admin_id:
             return Response({"error": "Admin not found for the current user."}, status=404)
 
         payment_status = request.GET.get("payment_status")
@@ -729,7 +985,7 @@ class ClientViewSet(ViewSet):
                 queryset=queryset,
                 to_attr="registrations"
             )
-            ).get(user__uuid=uuid, school=admin.school)
+            ).get(user__uuid=uuid, school_id=principal.school_id)
         except Student.DoesNotExist:
             return Response({"error": "Student not found."}, status=404)
         if not student:
@@ -766,11 +1022,11 @@ class ClientViewSet(ViewSet):
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
     def destroy(self, request, uuid):
-        admin = Admin.objects.filter(user_id=request.user.id).first()
-        if not admin:
+        principal = request.principal
+        if not principal.admin_id:
             return Response({"error": "Admin not found for the current user."}, status=404)
 
-        student = Student.objects.filter(user__uuid=uuid, school=admin.school).first()
+        student = Student.objects.filter(user__uuid=uuid, school=principal.school_id).first()
         if not student:
             return Response({"error": "Student not found."}, status=404)
 
@@ -784,24 +1040,25 @@ class ClientViewSet(ViewSet):
 class CourseViewset(ViewSet):
     permission_classes = [IsAuthenticated, IsManager]
 
+    @conditional_list(COURSES)
     def list(self, request):
-        # Retrieve the Admin instance for the logged-in user
-        admin = Admin.objects.filter(user_id=request.user.id).first()
-        if not admin:
+        # Resolve the logged-in admin and their school
+        principal = request.principal
+        if not principal.admin_id:
             return Response({"error": "Admin not found for the current user."}, status=404)
 
-        courses = Course.objects.filter(school_id=admin.school_id)
+        courses = Course.objects.filter(school_id=principal.school_id)
         serializer = CourseSerializer(courses, many=True)
         return Response(serializer.data, status=status.HTTP_200_OK)
 
 
     def create(self, request):
-        admin = Admin.objects.filter(user_id=request.user.id).first()
-        if not admin:
+        principal = request.principal
+        if not principal.admin_id:
             return Response({"error": "Admin not found for the current user."}, status=status.HTTP_404_NOT_FOUND)
 
         data = request.data.copy()  # Copy to avoid modifying the original request data
-        data['school_id'] = admin.school.id  # Set the school as the Admin's school
+        data['school_id'] = principal.school_id  # Set the school as the Admin's school
 
         # Pass the updated data to the serializer
         serializer = CourseSerializer(data=data, context={'request': request})
@@ -813,11 +1070,11 @@ class CourseViewset(ViewSet):
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
     def retrieve(self, request, uuid):
-        admin = Admin.objects.filter(user_id=request.user.id).first()
-        if not admin:
+        principal = request.principal
+        if not principal.admin_id:
             return Response({"error": "Admin not found for the current user."}, status=404)
 
-        course = Course.objects.filter(uuid=uuid, school_id=admin.school.id).first()
+        course = Course.objects.filter(uuid=uuid, school_id=principal.school_id).first()
         if not course:
             return Response({"error": "Course not found."}, status=404)
 
@@ -825,11 +1082,11 @@ class CourseViewset(ViewSet):
         return Response(serializer.data, status=status.HTTP_200_OK)
 
     def edit(self, request, uuid):
-        admin = Admin.objects.filter(user_id=request.user.id).first()
-        if not admin:
+        principal = request.principal
+        if not principal.admin_id:
             return Response({"error": "Admin not found for the current user."}, status=404)
 
-        course = Course.objects.filter(uuid=uuid, school_id=admin.school.id).first()
+        course = Course.objects.filter(uuid=uuid, school_id=principal.school_id).first()
         if not course:
             return Response({"error": "Course not found."}, status=404)
 
@@ -840,11 +1097,11 @@ class CourseViewset(ViewSet):
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
     def destroy(self, request, uuid):
-        admin = Admin.objects.filter(user_id=request.user.id).first()
-        if not admin:
+        principal = request.principal
+        if not principal.admin_id:
             return Response({"error": "Admin not found for the current user."}, status=404)
 
-        course = Course.objects.filter(uuid=uuid, school_id=admin.school.id).first()
+        course = Course.objects.filter(uuid=uuid, school_id=principal.school_id).first()
         if not course:
             return Response({"error": "Course not found."}, status=404)
         
@@ -856,21 +1113,21 @@ class CourseViewset(ViewSet):
 
 class AvailableTimeViewSet(ViewSet):
     def list(self, request, uuid=None):
-        # Retrieve the Admin instance for the logged-in user
-        admin = Admin.objects.filter(user_id=request.user.id).first()
-        if not admin:
+        # Resolve the logged-in admin and their school
+        principal = request.principal
+        if not principal.admin_id:
             return Response({"error": "Admin not found for the current user."}, status=404)
 
         # Get teacher_uuid from request parameters
         # Filter available times for the specified teacher in the admin's school
-        available_times = AvailableTime.objects.filter(teacher__user__uuid=uuid, teacher__school=admin.school)
+        available_times = AvailableTime.objects.filter(teacher__user__uuid=uuid, teacher__school_id=principal.school_id)
         serializer = AvailableTimeSerializer(available_times, many=True)
         return Response(serializer.data)
     
     def bulk_manage(self, request, uuid=None):
-        # Retrieve the Admin instance for the logged-in user
-        admin = Admin.objects.filter(user_id=request.user.id).first()
-        if not admin:
+        # Resolve the logged-in admin and their school
+        principal = request.principal
+        if not principal.admin_id:
             return Response({"error": "Admin not found for the current user."}, status=status.HTTP_404_NOT_FOUND)
 
         # Extract request data
@@ -888,7 +1145,7 @@ class AvailableTimeViewSet(ViewSet):
         # **Handle Bulk Updates**
         if update_data:
             update_uuids = [entry.get("uuid") for entry in update_data if entry.get("uuid")]
-            available_times = AvailableTime.objects.filter(uuid__in=update_uuids, teacher__school=admin.school, teacher__user__uuid=teacher_uuid)
+            available_times = AvailableTime.objects.filter(uuid__in=update_uuids, teacher__school_id=principal.school_id, teacher__user__uuid=teacher_uuid)
             available_time_dict = {str(at.uuid): at for at in available_times}
 
             for entry in update_data:
@@ -910,7 +1167,7 @@ class AvailableTimeViewSet(ViewSet):
 
         # **Handle Bulk Deletions**
         if delete_uuids:
-            deleted_count, _ = AvailableTime.objects.filter(uuid__in=delete_uuids, teacher__school=admin.school, teacher__user__uuid=teacher_uuid).delete()
+            deleted_count, _ = AvailableTime.objects.filter(uuid__in=delete_uuids, teacher__school_id=principal.school_id, teacher__user__uuid=teacher_uuid).delete()
         else:
             deleted_count = 0
         # **Handle Bulk Creations**
@@ -919,7 +1176,7 @@ class AvailableTimeViewSet(ViewSet):
                 return Response({"error": "Teacher UUID is required for creation."}, status=status.HTTP_400_BAD_REQUEST)
 
             try:
-                teacher = Teacher.objects.get(user__uuid=teacher_uuid, school=admin.school)
+                teacher = Teacher.objects.get(user__uuid=teacher_uuid, school_id=principal.school_id)
             except Teacher.DoesNotExist:
                 return Response({"error": "Teacher not found or does not belong to the admin's school."}, status=status.HTTP_404_NOT_FOUND)
 
@@ -949,32 +1206,14 @@ class BookingViewSet(ViewSet):
             return Response({"error": "Missed status is required."}, status=status.HTTP_400_BAD_REQUEST)
         if missed not in [True, False]:
             return Response({"error": "Invalid missed status. Use 'true' or 'false'."}, status=status.HTTP_400_BAD_REQUEST)
-        if missed:
-            try:
-                booking = Booking.objects.get(code=code)
-            except Booking.DoesNotExist:
-                return Response({"error": "Booking not found."}, status=status.HTTP_404_NOT_FOUND)
-            booking.registration.lessons_left -= 1
-            booking.registration.save()
-            booking.status = "MIS"
-            booking.save()
-        else:
-            try:
-                booking = Booking.objects.get(code=code)
-            except Booking.DoesNotExist:
-                return Response({"error": "Booking not found."}, status=status.HTTP_404_NOT_FOUND)
-            booking.registration.lessons_left += 1
-            booking.registration.save()
-            booking.status = "CON"
-            booking.save()
-        return Response({"message": "Booking marked as missed."}, status=status.HTTP_200_OK)
-    
-    def check_in(self, request, code=None):
         try:
-            booking = Booking.objects.get(code=code)
+            booking = Booking.objects.select_related("lesson").get(code=code)
         except Booking.DoesNotExist:
             return Response({"error": "Booking not found."}, status=status.HTTP_404_NOT_FOUND)
-
+        booking_services.set_missed(booking, missed)
+        return Response({"message": "Booking marked as missed."}, status=status.HTTP_200_OK)
+    
+    def check_in(self, request, code=None):
         check_in_time = request.data.get("datetime")
         if not check_in_time:
             return Response({"error": "Check-in time is required."}, status=status.HTTP_400_BAD_REQUEST)
@@ -984,13 +1223,14 @@ class BookingViewSet(ViewSet):
         except ValueError:
             return Response({"error": "Invalid check-in time format. Use 'YYYY-MM-DDTHH:MM:SS'."}, status=status.HTTP_400_BAD_REQUEST)
 
-        booking.check_in = check_in_time
-        booking.save()
+        # A single UPDATE; no counters change on check-in
+        if not Booking.objects.filter(code=code).update(check_in=check_in_time):
+            return Response({"error": "Booking not found."}, status=status.HTTP_404_NOT_FOUND)
         return Response({"message": "Check-in successful."}, status=status.HTTP_200_OK)
     
     def check_out(self, request, code=None):
         try:
-            booking = Booking.objects.select_related("registration").get(code=code)
+            booking = Booking.objects.select_related("lesson").get(code=code)
         except Booking.DoesNotExist:
             return Response({"error": "Booking not found."}, status=status.HTTP_404_NOT_FOUND)
 
@@ -1006,45 +1246,32 @@ class BookingViewSet(ViewSet):
         except ValueError:
             return Response({"error": "Invalid check-out time format. Use 'YYYY-MM-DDTHH:MM:SS'."}, status=status.HTTP_400_BAD_REQUEST)
 
-        if not booking.check_out:
-            booking.registration.lessons_left -= 1
-            booking.registration.save()
-        booking.lesson.status = "COM"
-        booking.lesson.save()
-        booking.check_out = check_out_time
-        booking.save()
+        booking_services.check_out(booking, check_out=check_out_time)
         return Response({"message": "Check-out successful."}, status=status.HTTP_200_OK)
 
     def clear(self, request, code=None):
         try:
-            booking = Booking.objects.get(code=code)
+            booking = Booking.objects.select_related("lesson").get(code=code)
         except Booking.DoesNotExist:
             return Response({"error": "Booking not found."}, status=status.HTTP_404_NOT_FOUND)
 
-        if booking.check_out:
-            booking.registration.lessons_left += 1
-            booking.registration.save()
-            booking.lesson.status = "CON"
-            booking.lesson.save()
-        booking.check_in = None
-        booking.check_out = None
-        booking.save()
+        booking_services.clear(booking)
         return Response({"message": "Booking cleared."}, status=status.HTTP_200_OK)
     
 class ProfileViewSet(ViewSet):
     permission_classes = [IsAuthenticated, IsManager]
 
     def retrieve(self, request):
-        admin = Admin.objects.filter(user_id=request.user.id).first()
-        if not admin:
+        principal = request.principal
+        if not principal.admin_id:
             return Response({"error": "Admin not found for the current user."}, status=404)
         
         serializer = ProfileSerializer(instance=request.user)
         return Response(serializer.data)
 
     def update(self, request):
-        admin = Admin.objects.filter(user_id=request.user.id).first()
-        if not admin:
+        principal = request.principal
+        if not principal.admin_id:
             return Response({"error": "Admin not found for the current user."}, status=404)
         
         serializer = ProfileSerializer(instance=request.user, data=request.data, partial=True)
@@ -1054,8 +1281,8 @@ class ProfileViewSet(ViewSet):
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
     def destroy(self, request):
-        admin = Admin.objects.filter(user_id=request.user.id).first()
-        if not admin:
+        principal = request.principal
+        if not principal.admin_id:
             return Response({"error": "Admin not found for the current user."}, status=404)
         
         request.user.delete()
@@ -1065,11 +1292,11 @@ class SchoolSettingsViewSet(ViewSet):
     permission_classes = [IsAuthenticated, IsManager]
 
     def retrieve(self, request):
-        admin = Admin.objects.filter(user_id=request.user.id).first()
-        if not admin:
+        principal = request.principal
+        if not principal.admin_id:
             return Response({"error": "Admin not found for the current user."}, status=404)
 
-        school = School.objects.select_related("settings").prefetch_related("facilities").filter(id=admin.school.id).first()
+        school = School.objects.select_related("settings").prefetch_related("facilities").filter(id=principal.school_id).first()
         settings = school.settings
         facility = school.facilities.first()  # Get the first facility
         
@@ -1091,11 +1318,11 @@ class SchoolSettingsViewSet(ViewSet):
 
 
     def update(self, request):
-        admin = Admin.objects.filter(user_id=request.user.id).first()
-        if not admin:
+        principal = request.principal
+        if not principal.admin_id:
             return Response({"error": "Admin not found for the current user."}, status=404)
 
-        school = School.objects.select_related("settings").prefetch_related("facilities").filter(id=admin.school.id).first()
+        school = School.objects.select_related("settings").prefetch_related("facilities").filter(id=principal.school_id).first()
         
         if not school:
             return Response({"error": "School not found."}, status=404)
@@ -0,0 +1,91 @@
+import datetime
+import pytz
+from dataclasses import dataclass
+from typing import Optional
+from django.core.cache import cache
+from django.db.models import OuterRef, Subquery
+from internal.cache import school_key
+from school.models import School, Facilities
+
+SCHOOL_CONFIG_TIMEOUT = 60 * 60 * 24  # Invalidated by signals, see core.signals
+
+
+@dataclass(frozen=True)
+class SchoolConfig:
+    """
+    Scheduling settings of a school, read from the cache.
+    Defaults apply when the school has no settings or facility.
+    """
+    school_id: int
+    days_ahead: int = 21
+    interval: int = 30
+    cancel_b4_hours: int = 24
+    teacher_break: int = 15
+    capacity: int = 21
+    start: datetime.time = datetime.time(8, 0)
+    stop: datetime.time = datetime.time(15, 0)
+    location: Optional[str] = None
+    timezone: str = "Asia/Bangkok"
+
+
+def school_config_key(school_id):
+    return school_key(school_id, "config")
+
+
+def load_school_config(school_id):
+    """Build the config of a school with a single query."""
+    first_facility = Facilities.objects.filter(school=OuterRef("pk")).order_by("pk")
+    row = School.objects.filter(id=school_id).values(
+        "start",
+        "stop",
+        "location",
+        "timezone",
+        "settings__days_ahead",
+        "settings__interval",
+        "settings__cancel_b4_hours",
+        "settings__teacher_break",
+    ).annotate(
+        capacity=Subquery(first_facility.values("capacity")[:1]),
+    ).first()
+    if row is None:
+        return None
+
+    values = {
+        "start": row["start"],
+        "stop": row["stop"],
+        "location": row["location"],
+        "timezone": row["timezone"],
+        "days_ahead": row["settings__days_ahead"],
+        "interval": row["settings__interval"],
+        "cancel_b4_hours": row["settings__cancel_b4_hours"],
+        "teacher_break": row["settings__teacher_break"],
+        "capacity": row["capacity"],
+    }
+    return SchoolConfig(school_id=school_id, **{key: value for key, value in values.items() if value is not None})
+
+
+def get_school_config(school_id):
+    """Return the cached config of a school, or None if the school does not exist."""
+    if school_id is None:
+        return None
+
+    key = school_config_key(school_id)
+    config = cache.get(key)
+    if config is None:
+        config = load_school_config(school_id)
+        if config is not None:
+            cache.set(key, config, SCHOOL_CONFIG_TIMEOUT)
+    return config
+
+
+def get_school_timezone(school_id):
+    """The school's timezone as a tzinfo, falling back to Asia/Bangkok."""
+    config = get_school_config(school_id)
+    try:
+        return pytz.timezone(config.timezone if config else SchoolConfig.timezone)
+    except pytz.UnknownTimeZoneError:
+        return pytz.timezone(SchoolConfig.timezone)
+
+
+def invalidate_school_config(school_id):
+    cache.delete(school_config_key(school_id))
@@ -0,0 +1,18 @@
+# Generated by Django 4.2.13 on 2026-10-19 09:12
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('school', '0007_school_uuid'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='school',
+            name='timezone',
+            field=models.CharField(default='Asia/Bangkok', max_length=64),
+        ),
+    ]
@@ -36,6 +36,7 @@ class School(models.Model):
     start = models.TimeField(default=datetime.time(8, 0))
     stop = models.TimeField(default=datetime.time(15, 0))
     location = models.CharField(max_length=255, null=True, blank=True)
+    timezone = models.CharField(max_length=64, default="Asia/Bangkok")  # IANA name used to render local times
     settings = models.OneToOneField(SchoolSettings, on_delete=models.CASCADE, related_name="school", null=True, blank=True)
 
     def __str__(self) -> str:
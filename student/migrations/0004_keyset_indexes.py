@@ -0,0 +1,25 @@
+# Generated by Django 4.2.13 on 2026-10-19 16:20
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('student', '0003_student_points'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='booking',
+            index=models.Index(fields=['student', 'booked_datetime', 'id'], name='booking_student_booked_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='courseregistration',
+            index=models.Index(fields=['student', 'registered_date', 'id'], name='reg_student_date_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='courseregistration',
+            index=models.Index(fields=['teacher', 'registered_date', 'id'], name='reg_teacher_date_id_idx'),
+        ),
+    ]
@@ -0,0 +1,21 @@
+# Generated by Django 4.2.13 on 2026-10-19 16:21
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('student', '0004_keyset_indexes'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='courseregistration',
+            index=models.Index(fields=['course', 'registered_date', 'id'], name='reg_course_date_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='courseregistration',
+            index=models.Index(condition=models.Q(('payment_status', 'waiting')), fields=['registered_date', 'id'], name='reg_waiting_date_id_idx'),
+        ),
+    ]
@@ -0,0 +1,25 @@
+# Generated by Django 4.2.13 on 2026-10-19 16:24
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('student', '0005_purchases_feed_indexes'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='booking',
+            index=models.Index(fields=['student', 'status'], name='booking_student_status_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='booking',
+            index=models.Index(fields=['lesson', 'status'], name='booking_lesson_status_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='courseregistration',
+            index=models.Index(fields=['student', 'payment_status'], name='reg_student_payment_idx'),
+        ),
+    ]
@@ -0,0 +1,45 @@
+# Generated by Django 4.2.13 on 2026-10-19 16:25
+
+from django.db import migrations, models
+from django.db.models import OuterRef, Subquery
+import django.db.models.deletion
+
+BATCH_SIZE = 5000
+
+
+def backfill_booking_school(apps, schema_editor):
+    """Copy lesson.school_id onto bookings in id-ordered batches, each committed on its own."""
+    Booking = apps.get_model("student", "Booking")
+    Lesson = apps.get_model("teacher", "Lesson")
+    lesson_school = Subquery(Lesson.objects.filter(id=OuterRef("lesson_id")).values("school_id")[:1])
+
+    last_id = 0
+    while True:
+        ids = list(
+            Booking.objects.filter(id__gt=last_id, school__isnull=True)
+            .order_by("id").values_list("id", flat=True)[:BATCH_SIZE]
+        )
+        if not ids:
+            break
+        Booking.objects.filter(id__in=ids).update(school_id=lesson_school)
+        last_id = ids[-1]
+
+
+class Migration(migrations.Migration):
+    # Batches commit separately
+    atomic = False
+
+    dependencies = [
+        ('school', '0008_school_timezone'),
+        ('student', '0006_hot_query_indexes'),
+        ('teacher', '0005_lesson_school'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='booking',
+            name='school',
+            field=models.ForeignKey(blank=True, editable=False, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='booking', to='school.school'),
+        ),
+        migrations.RunPython(backfill_booking_school, migrations.RunPython.noop),
+    ]
@@ -1,4 +1,5 @@
 from django.db import models
+from django.db.models import Q
 from school.models import Course, School
 from core.models import User
 from teacher.models import Teacher, Lesson
@@ -44,6 +45,21 @@ class CourseRegistration(models.Model):
     )    
     payment_status = models.CharField(max_length=10, choices=PAYMENT_STATUS_CHOICES, default='waiting')
 
+    class Meta:
+        indexes = [
+            # Keyset pagination order, see internal.pagination
+            models.Index(fields=["student", "registered_date", "id"], name="reg_student_date_id_idx"),
+            models.Index(fields=["teacher", "registered_date", "id"], name="reg_teacher_date_id_idx"),
+            models.Index(fields=["course", "registered_date", "id"], name="reg_course_date_id_idx"),
+            models.Index(fields=["student", "payment_status"], name="reg_student_payment_idx"),
+            # Waiting slips are served first in the manager purchases feed
+            models.Index(
+                fields=["registered_date", "id"],
+                condition=Q(payment_status="waiting"),
+                name="reg_waiting_date_id_idx",
+            ),
+        ]
+
     def __str__(self) -> str:
         return f"{self.student.__str__()} {self.course.__str__()} {self.teacher.__str__()}"
     
@@ -114,6 +130,8 @@ class Booking(models.Model):
     code = models.CharField(max_length=12, unique=True)
 
     lesson = models.ForeignKey(to=Lesson, on_delete=models.CASCADE, related_name="booking")
+    # Copy of lesson.school_id, set in save()
+    school = models.ForeignKey(to=School, on_delete=models.CASCADE, related_name="booking", null=True, blank=True, editable=False)
     registration = models.ForeignKey(
         to=CourseRegistration, 
         on_delete=models.CASCADE, 
@@ -153,6 +171,14 @@ class Booking(models.Model):
 
     check_in = models.TimeField(null=True, blank=True)
     check_out = models.TimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            # Keyset pagination order, see internal.pagination
+            models.Index(fields=["student", "booked_datetime", "id"], name="booking_student_booked_id_idx"),
+            models.Index(fields=["student", "status"], name="booking_student_status_idx"),
+            models.Index(fields=["lesson", "status"], name="booking_lesson_status_idx"),
+        ]
     
     def __str__(self):
         if self.user_type == 'student' and self.student:
@@ -175,4 +201,6 @@ class Booking(models.Model):
     def save(self, *args, **kwargs):
         if self.code is None or self.code == "":
             self.code = self._generate_unique_code(12)
+        if self.school_id is None:
+            self.school_id = self.lesson.school_id
         super(Booking, self).save(*args, **kwargs)
@@ -0,0 +1,101 @@
+"""
+Booking lifecycle transitions.
+
+Each transition runs in one transaction as a few guarded UPDATEs with F()
+expressions, so concurrent taps cannot lose counter updates or charge a
+registration twice. Queryset updates skip post_save, so the rollup day is
+marked stale here.
+"""
+from django.db import transaction
+from django.db.models import F
+from manager.metrics import lesson_day
+from manager.rollups import mark_stale
+from student.models import Booking, CourseRegistration
+from teacher.models import Lesson
+
+
+class BookingTransitionError(Exception):
+    """A booking transition whose guard did not match, e.g. a full lesson or a repeated tap."""
+
+
+def charge(registration_id, lessons=1):
+    """Take lessons off a registration, never below zero."""
+    if registration_id is None:
+        return
+    CourseRegistration.objects.filter(pk=registration_id, lessons_left__gte=lessons).update(
+        lessons_left=F("lessons_left") - lessons,
+    )
+
+
+def refund(registration_id, lessons=1):
+    if registration_id is None:
+        return
+    CourseRegistration.objects.filter(pk=registration_id).update(lessons_left=F("lessons_left") + lessons)
+
+
+def touch_rollup(booking):
+    mark_stale(booking.school_id or booking.lesson.school_id, lesson_day(booking.lesson))
+
+
+@transaction.atomic
+def take_seat(lesson):
+    """Claim a seat in a confirmed group lesson, guarded by the course's group size."""
+    seats = Lesson.objects.filter(pk=lesson.pk, status="CON")
+    if lesson.course.group_size is not None:
+        seats = seats.filter(number_of_client__lt=lesson.course.group_size)
+    if not seats.update(number_of_client=F("number_of_client") + 1):
+        raise BookingTransitionError("This lesson has reached the maximum number of clients.")
+
+
+@transaction.atomic
+def cancel(booking, charge_late=False):
+    """Cancel a booking of a pending or confirmed lesson, optionally charging a late cancellation."""
+    lesson = booking.lesson
+    canceled = Booking.objects.filter(pk=booking.pk, lesson__status__in=["PENTE", "CON"]).exclude(status="CAN")
+    if not canceled.update(status="CAN"):
+        raise BookingTransitionError("Only pending or confirmed bookings can be canceled.")
+
+    changes = {"number_of_client": F("number_of_client") - 1}
+    if not lesson.course.is_group:
+        changes["status"] = "CAN"
+    Lesson.objects.filter(pk=lesson.pk).update(**changes)
+
+    if charge_late:
+        charge(booking.registration_id)
+    touch_rollup(booking)
+
+
+@transaction.atomic
+def check_out(booking, **times):
+    """
+    Record check-in/check-out times and complete the lesson. The registration is
+    charged only by the first check-out of the booking.
+    """
+    if Booking.objects.filter(pk=booking.pk, check_out__isnull=True).update(**times):
+        charge(booking.registration_id)
+    else:
+        Booking.objects.filter(pk=booking.pk).update(**times)
+    Lesson.objects.filter(pk=booking.lesson_id).exclude(status="COM").update(status="COM")
+    touch_rollup(booking)
+
+
+@transaction.atomic
+def clear(booking):
+    """Undo check-in and check-out, refunding the lesson if it had been checked out."""
+    if Booking.objects.filter(pk=booking.pk, check_out__isnull=False).update(check_in=None, check_out=None):
+        refund(booking.registration_id)
+        Lesson.objects.filter(pk=booking.lesson_id, status="COM").update(status="CON")
+        touch_rollup(booking)
+    else:
+        Booking.objects.filter(pk=booking.pk).update(check_in=None)
+
+
+@transaction.atomic
+def set_missed(booking, missed):
+    """Mark a booking as a no-show (charging a lesson) or undo it (refunding it)."""
+    if missed:
+        if Booking.objects.filter(pk=booking.pk).exclude(status="MIS").update(status="MIS"):
+            charge(booking.registration_id)
+    elif Booking.objects.filter(pk=booking.pk, status="MIS").update(status="COM"):
+        refund(booking.registration_id)
+    touch_rollup(booking)
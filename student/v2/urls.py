@@ -37,5 +37,6 @@ urlpatterns = [
 
     # Booking routes
     path("bookings", BookingViewSet.as_view({"get": "list", "post": "create"}), name="booking-list"),
+    path("bookings/hold", BookingViewSet.as_view({"post": "hold"}), name="booking-hold"),
     path("bookings/<slug:code>/cancel", BookingViewSet.as_view({"put": "cancel"}), name="booking-list"),
 ]
\ No newline at end of file
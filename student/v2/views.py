@@ -3,9 +3,10 @@ from rest_framework.viewsets import ViewSet
 from rest_framework.decorators import api_view, permission_classes
 from rest_framework.response import Response
 from django.shortcuts import get_object_or_404
+from django.db import transaction
 from django.db.models import Q, F, Prefetch
 from manager.models import Admin
-from student.models import CourseRegistration, Student, StudentTeacherRelation, Booking
+from student.models import CourseRegistration, StudentTeacherRelation, Booking
 from teacher.models import Teacher, Lesson
 from school.models import Course
 from student.v2.serializers import (
@@ -22,9 +23,17 @@ from student.v2.serializers import (
 )
 from django.core.exceptions import ValidationError
 from school.models import School, SchoolSettings
+from school.config import get_school_config
 from internal.permissions import IsStudent
+from internal.storage import media_url
+from internal.conditional import conditional_list, principal_schools, COURSES
+from internal.pagination import KeysetPagination
 from utils.notification_utils import send_notification
+from student import services as booking_services
+from teacher.tasks import reconcile_lesson_seats
+from utils import seats
 from utils.gen_upcomming import generate_upcoming_private
+from utils.hold import SlotHeld, hold_slot, is_held, release_slot
 from datetime import datetime, timedelta
 import pytz
 from django.utils import timezone
@@ -39,10 +48,10 @@ def school_info(request):
     """
     Returns basic school information.
     """
-    school = get_object_or_404(School, id=request.user.student.school.first().id)
+    school = get_object_or_404(School, id=request.principal.school_id)
     return Response({
         "school_name": school.name,
-        "payment_qr_code": school.payment_qr_code.url if school.payment_qr_code else None,
+        "payment_qr_code": media_url(school.payment_qr_code, None),
         "location": school.location,
     })
 
@@ -53,32 +62,21 @@ def check_in(request):
     if not code:
         return Response({"message": "Code is required."}, status=400)
     
-    student = request.user.student
-
     lesson = Lesson.objects.filter(
         code=code,
         status='CON', # Only allow check-in for confirmed lessons
     ).first()
 
     if lesson:
-        booking = Booking.objects.filter(
+        booking = Booking.objects.select_related("lesson").filter(
             lesson=lesson,
-            student=student,
+            student_id=request.principal.student_id,
             status='COM', # Only allow check-in for completed bookings
         ).first()
 
         if booking:
-            if not booking.check_out:
-                booking.registration.lessons_left -= 1
-                booking.registration.save()
-                try:
-                    booking.lesson.status = "COM"
-                    booking.lesson.save()
-                except:
-                    return Response({"message": "Lesson status could not be updated."}, status=400)
-            booking.check_in = datetime.now()
-            booking.check_out = datetime.now()
-            booking.save()
+            checked_at = datetime.now()
+            booking_services.check_out(booking, check_in=checked_at, check_out=checked_at)
             send_notification(lesson.teacher.user, "Check-in Alert", f"{request.user.first_name} has checked in for a class with you. Check your schedule for details.")
             return Response({"message": "Success"}, status=200)
         else:
@@ -142,6 +140,14 @@ class RegistrationViewSet(ViewSet):
             filters['lessons_left__gt'] = 0
 
         courses = CourseRegistration.objects.select_related("course").filter(**filters)
+
+        # Page newest-first when the client asks for it
+        paginator = KeysetPagination("registered_date", descending=True)
+        if paginator.is_requested(request):
+            page = paginator.paginate_queryset(courses, request)
+            ser = ListCourseRegistrationSerializer(instance=page, many=True)
+            return paginator.get_paginated_response(ser.data)
+
         ser = ListCourseRegistrationSerializer(instance=courses, many=True)
         return Response(ser.data, status=200)
 
@@ -154,7 +160,7 @@ class RegistrationViewSet(ViewSet):
 
     def create(self, request):
         data = request.data.copy()
-        data["student_id"] = request.user.student.id
+        data["student_id"] = request.principal.student_id
         ser = CourseRegistrationSerializer(data=data)
         if ser.is_valid():
             obj = ser.save()
@@ -183,29 +189,35 @@ class CourseViewSet(ViewSet):
     """
     permission_classes = [IsAuthenticated, IsStudent]
 
+    @conditional_list(COURSES, schools=principal_schools)
     def list_group(self, request):
         # Get the student associated with the current user
-        student = get_object_or_404(Student, user_id=request.user.id)
+        principal = request.principal
+        if not principal.student_id:
+            return Response({"detail": "Not found."}, status=404)
 
         # Determine is_group filter based on course_type
         is_group = True 
 
         # Filter courses based on school and is_group
-        courses = Course.objects.filter(school_id__in=student.school.all(), is_group=is_group)
+        courses = Course.objects.filter(school_id__in=principal.school_ids, is_group=is_group)
 
         # Serialize the results
         ser = ListCourseSerializer(instance=courses, many=True)
         return Response(ser.data, status=200)
 
+    @conditional_list(COURSES, schools=principal_schools)
     def list_private(self, request):
         # Get the student associated with the current user
-        student = get_object_or_404(Student, user_id=request.user.id)
+        principal = request.principal
+        if not principal.student_id:
+            return Response({"detail": "Not found."}, status=404)
 
         # Determine is_group filter based on course_type
         is_group = False 
 
         # Filter courses based on school and is_group
-        courses = Course.objects.filter(school_id__in=student.school.all(), is_group=is_group)
+        courses = Course.objects.filter(school_id__in=principal.school_ids, is_group=is_group)
 
         # Serialize the results
         ser = ListCourseSerializer(instance=courses, many=True)
@@ -225,7 +237,7 @@ class LessonViewSet(ViewSet):
 
 
     def list_private(self, request):
-        student = request.user.student
+        principal = request.principal
 
         # Fetch the month and year from query parameters
         start_date = request.query_params.get("start_date")
@@ -250,16 +262,19 @@ class LessonViewSet(ViewSet):
                 Prefetch('available_time', to_attr='cached_available_times'),  # Prefetch available times
             ), to_attr='cached_teacher'),
         ).filter(
-            student=student, payment_status="confirm", course__is_group=False
+            student_id=principal.student_id, payment_status="confirm", course__is_group=False
         )
 
         # Serialize and return the lessons
-        lessons = generate_upcoming_private(student.school.first(), registered_courses)
+        config = get_school_config(principal.school_id)
+        if config is None:
+            return Response({"error": "School not found."}, status=404)
+        lessons = generate_upcoming_private(config, registered_courses)
         return Response(lessons, status=200)
 
 
     def list_course(self, request):
-        student = request.user.student
+        student_id = request.principal.student_id
 
         # Fetch the month and year from query parameters
         month = request.query_params.get("month")
@@ -277,11 +292,11 @@ class LessonViewSet(ViewSet):
 
         # Fetch confirmed course registrations with their courses and teachers
         registered_courses = CourseRegistration.objects.filter(
-            student=student, payment_status="confirm", course__is_group=True
+            student_id=student_id, payment_status="confirm", course__is_group=True
         ).values_list("course_id", flat=True)  # Extract only course IDs
 
         # Fetch already booked lesson IDs for the student
-        booked_lessons = Booking.objects.filter(student=student).values_list('lesson_id', flat=True)
+        booked_lessons = Booking.objects.filter(student_id=student_id).values_list('lesson_id', flat=True)
 
         # Filter lessons that match the registered courses, have number_of_client less than group_size, are not booked, and match the specified date range
         lessons = Lesson.objects.filter(
@@ -315,7 +330,6 @@ class BookingViewSet(ViewSet):
     def list(self, request):
         # Get the lesson status from query parameters
         lesson_status = request.query_params.get("status")
-        student = request.user.student
 
         # Validate the lesson status query parameter
         if (lesson_status and lesson_status not in self.VALID_STATUSES):
@@ -328,25 +342,31 @@ class BookingViewSet(ViewSet):
         translated_status = self.VALID_STATUSES.get(lesson_status)
 
         # Apply filters
-        filters = {"student": student}
+        filters = {"student_id": request.principal.student_id}
         if translated_status:
             filters["status"] = "COM"
             filters["lesson__status"] = translated_status
 
         # Query and serialize bookings
         bookings = Booking.objects.filter(**filters).select_related("lesson__course", "lesson__teacher")
+
+        # Page newest-first when the client asks for it
+        paginator = KeysetPagination("booked_datetime", descending=True)
+        if paginator.is_requested(request):
+            page = paginator.paginate_queryset(bookings, request)
+            ser = BookingDetailSerializer(instance=page, many=True)
+            return paginator.get_paginated_response(ser.data)
+
         ser = BookingDetailSerializer(instance=bookings, many=True)
 
         return Response(ser.data, status=200)
     
     def retrieve(self, request, code):
-        student = request.user.student
-
         # Get the booking object
         booking = get_object_or_404(
             Booking.objects.select_related("lesson__course__school", "lesson__teacher"),
             code=code,
-            student=student
+            student_id=request.principal.student_id
         )
 
         # Serialize and return the response
@@ -378,6 +398,12 @@ class BookingViewSet(ViewSet):
                 lesson_datetime = parse_datetime(booking_datetime)
             except (TypeError, ValueError):
                 return Response({"error": "Invalid datetime format."}, status=400)
+            if lesson_datetime is None:
+                return Response({"error": "Invalid datetime format."}, status=400)
+
+            # Reject a slot another student is holding before running the conflict query
+            if is_held(registration.course.school_id, registration.teacher_id, lesson_datetime, lesson_datetime + timedelta(minutes=registration.course.duration), registration.student_id):
+                return Response({"error": "This time slot is being booked by someone else."}, status=409)
 
             try:
                 lesson = Lesson.objects.create(
@@ -402,9 +428,6 @@ class BookingViewSet(ViewSet):
             )
             if registration.course_id != lesson.course_id:
                 return Response({"error": "The registration course couldn't be used for this course."}, status=400)
-            # Check if the lesson is a group course and validate group size
-            if lesson.course.is_group and lesson.number_of_client >= lesson.course.group_size:
-                return Response({"error": "This lesson has reached the maximum number of clients."}, status=400)
             
         # Prepare booking data
         data = {
@@ -417,47 +440,85 @@ class BookingViewSet(ViewSet):
         # Validate and save the booking
         ser = CreateBookingSerializer(data=data)
         if ser.is_valid():
-            ser.save(lesson=lesson)
+            # Group lessons are admitted by the Redis seat gate before Postgres is touched
+            hold = None
             if lesson.course.is_group:
-                lesson.number_of_client += 1  # Update client count only for group courses
-                lesson.status = "CON"
-            lesson.save()
+                try:
+                    hold = seats.acquire(lesson)
+                except seats.SeatsUnavailable as e:
+                    return Response({"error": str(e)}, status=400)
+            try:
+                with transaction.atomic():
+                    # Group lessons claim a seat with a guarded UPDATE before the booking is written
+                    if lesson.course.is_group:
+                        booking_services.take_seat(lesson)
+                    ser.save(lesson=lesson)
+                    transaction.on_commit(lambda: seats.confirm(lesson, hold))
+            except booking_services.BookingTransitionError as e:
+                seats.release(lesson, hold)
+                return Response({"error": str(e)}, status=400)
+            except Exception:
+                seats.release(lesson, hold)
+                raise
+            if not lesson.course.is_group:
+                # The booking consumes the student's hold on the slot
+                release_slot(lesson.school_id, lesson.teacher_id, registration.student_id)
             send_notification(lesson.teacher.user, "New Booking Alert", f"{request.user.first_name} has booked a class with you. Check your schedule for details.")
             return Response({"message": "Booking created successfully."}, status=201)
 
         # Return validation errors if the serializer is invalid
         return Response(ser.errors, status=400)
 
+    def hold(self, request):
+        """Hold a private lesson slot for a few minutes while the student confirms the booking."""
+        registration_uuid = request.data.get("registration_uuid")
+        if not registration_uuid:
+            return Response({"error": "Registration UUID is required."}, status=400)
+        registration = get_object_or_404(
+            CourseRegistration.objects.select_related("course"),
+            uuid=registration_uuid,
+            student_id=request.principal.student_id,
+            payment_status="confirm",
+            course__is_group=False,
+        )
+
+        # Validate datetime
+        try:
+            lesson_datetime = parse_datetime((request.data.get("lesson") or {}).get("datetime"))
+        except (TypeError, ValueError):
+            return Response({"error": "Invalid datetime format."}, status=400)
+        if lesson_datetime is None:
+            return Response({"error": "Invalid datetime format."}, status=400)
+
+        try:
+            expires_at = hold_slot(
+                registration.course.school_id, registration.teacher_id,
+                lesson_datetime, lesson_datetime + timedelta(minutes=registration.course.duration), registration.student_id,
+            )
+        except SlotHeld as e:
+            return Response({"error": str(e)}, status=409)
+        return Response({"expires_at": expires_at}, status=201)
+
     def cancel(self, request, code):
-        student = request.user.student
+        principal = request.principal
 
         # Get the booking object
         booking = get_object_or_404(    
-            Booking.objects.select_related("lesson"),
+            Booking.objects.select_related("lesson__course"),
             code=code,
-            student=student
+            student_id=principal.student_id
         )
 
-        # Check if the booking can be canceled
-        if booking.lesson.status not in ["PENTE", "CON"]:
-            return Response({"error": "Only pending or confirmed bookings can be canceled."}, status=400)
-
-        # Update the booking and lesson status
-        booking.status = "CAN"
-        booking.save()
-
+        # Cancel the booking, charging a lesson when it is too close to start
         lesson = booking.lesson
-        lesson.number_of_client -= 1
-        if not lesson.course.is_group:
-            lesson.status = "CAN"
-        lesson.save()
-
-        school = School.objects.select_related("settings").get(id=student.school.first().id)
-        cancel_b4_hours = school.settings.cancel_b4_hours
-        if lesson.datetime - timedelta(hours=cancel_b4_hours) < timezone.now():
-            if booking.registration.lessons_left > 0:  # Prevent negative balance
-                booking.registration.lessons_left -= 1
-                booking.registration.save()
+        cancel_b4_hours = get_school_config(principal.school_id).cancel_b4_hours
+        late = lesson.datetime - timedelta(hours=cancel_b4_hours) < timezone.now()
+        try:
+            booking_services.cancel(booking, charge_late=late)
+        except booking_services.BookingTransitionError as e:
+            return Response({"error": str(e)}, status=400)
+        if lesson.course.is_group:
+            reconcile_lesson_seats.delay(lesson.id)
         send_notification(lesson.teacher.user, "Class Cancellation", f"{request.user.first_name} has canceled a class with you. Check your schedule for details.")
 
         return Response({"message": "Booking canceled successfully."}, status=200)
@@ -0,0 +1,17 @@
+# Generated by Django 4.2.13 on 2026-10-19 16:20
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('teacher', '0002_teacher_teacher_break'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='lesson',
+            index=models.Index(fields=['datetime', 'id'], name='lesson_datetime_id_idx'),
+        ),
+    ]
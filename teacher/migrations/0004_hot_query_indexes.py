@@ -0,0 +1,25 @@
+# Generated by Django 4.2.13 on 2026-10-19 16:24
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('teacher', '0003_lesson_lesson_datetime_id_idx'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='lesson',
+            index=models.Index(fields=['teacher', 'status', 'datetime'], name='lesson_teacher_status_dt_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='lesson',
+            index=models.Index(fields=['course', 'datetime'], name='lesson_course_datetime_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='lesson',
+            index=models.Index(condition=models.Q(('notified', False), ('status', 'CON')), fields=['datetime'], name='lesson_reminder_due_idx'),
+        ),
+    ]
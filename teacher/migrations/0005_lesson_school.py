@@ -0,0 +1,49 @@
+# Generated by Django 4.2.13 on 2026-10-19 16:25
+
+from django.contrib.postgres.operations import AddIndexConcurrently
+from django.db import migrations, models
+from django.db.models import OuterRef, Subquery
+import django.db.models.deletion
+
+BATCH_SIZE = 5000
+
+
+def backfill_lesson_school(apps, schema_editor):
+    """Copy course.school_id onto lessons in id-ordered batches, each committed on its own."""
+    Lesson = apps.get_model("teacher", "Lesson")
+    Course = apps.get_model("school", "Course")
+    course_school = Subquery(Course.objects.filter(id=OuterRef("course_id")).values("school_id")[:1])
+
+    last_id = 0
+    while True:
+        ids = list(
+            Lesson.objects.filter(id__gt=last_id, school__isnull=True)
+            .order_by("id").values_list("id", flat=True)[:BATCH_SIZE]
+        )
+        if not ids:
+            break
+        Lesson.objects.filter(id__in=ids).update(school_id=course_school)
+        last_id = ids[-1]
+
+
+class Migration(migrations.Migration):
+    # Batches commit separately and the index is built concurrently
+    atomic = False
+
+    dependencies = [
+        ('school', '0008_school_timezone'),
+        ('teacher', '0004_hot_query_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='lesson',
+            name='school',
+            field=models.ForeignKey(blank=True, editable=False, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='lesson', to='school.school'),
+        ),
+        migrations.RunPython(backfill_lesson_school, migrations.RunPython.noop),
+        AddIndexConcurrently(
+            model_name='lesson',
+            index=models.Index(fields=['school', 'datetime'], name='lesson_school_datetime_idx'),
+        ),
+    ]
@@ -120,6 +120,8 @@ class Lesson(models.Model):
     status = models.CharField(choices=STATUS_CHOICES, max_length=5, default="PENTE")
     course = models.ForeignKey(to=Course, on_delete=models.CASCADE, related_name="lesson")
     teacher = models.ForeignKey(to=Teacher, on_delete=models.PROTECT, related_name="lesson", null=True, blank=True)
+    # Copy of course.school_id so school-scoped queries skip the course join; set in save()
+    school = models.ForeignKey(to=School, on_delete=models.CASCADE, related_name="lesson", null=True, blank=True, editable=False)
     
     number_of_client = models.IntegerField(default=0)
 
@@ -127,6 +129,23 @@ class Lesson(models.Model):
     student_event_id = models.CharField(null=True, blank=True)
     teacher_event_id = models.CharField(null=True, blank=True)
 
+    class Meta:
+        indexes = [
+            # Keyset pagination order, see internal.pagination
+            models.Index(fields=["datetime", "id"], name="lesson_datetime_id_idx"),
+            models.Index(fields=["school", "datetime"], name="lesson_school_datetime_idx"),
+            # Conflict and availability checks
+            models.Index(fields=["teacher", "status", "datetime"], name="lesson_teacher_status_dt_idx"),
+            # Per-school scans (upcoming generator, manager lists) via the school's courses
+            models.Index(fields=["course", "datetime"], name="lesson_course_datetime_idx"),
+            # Reminder task: confirmed lessons not notified yet
+            models.Index(
+                fields=["datetime"],
+                condition=models.Q(status="CON", notified=False),
+                name="lesson_reminder_due_idx",
+            ),
+        ]
+
     def generate_unique_code(self, length=8):
         """Generate a unique random code."""
         characters = string.ascii_letters + string.digits
@@ -158,6 +177,8 @@ class Lesson(models.Model):
         with transaction.atomic():  # Ensure database consistency
             if not self.code:
                 self.code = self._generate_unique_code(12)
+            if self.school_id is None:
+                self.school_id = self.course.school_id
             if self.pk is None:
                 self.check_for_conflicts()  # Check for conflicts only if first create
             elif self.has_time_changed():
@@ -0,0 +1,232 @@
+"""
+Recurring lesson series, bulk teacher reassignment and bulk status changes.
+
+A series ("every Tue/Thu 17:00 for N weeks") is expanded into occurrences in
+the school's timezone, checked against the teacher's lessons with one range
+query and an interval sweep, and written with bulk_create. Reassignment and
+bulk confirm/cancel use the same sweep and one guarded UPDATE each. They all
+skip save() and post_save, so codes, the school column, metrics and rollups
+are handled here.
+"""
+import heapq
+from collections import Counter
+from datetime import datetime, timedelta
+from django.db import transaction
+from django.db.models import Exists, OuterRef, Q
+from django.utils import timezone
+from manager.metrics import bump, lesson_day
+from manager.rollups import local_range, mark_stale
+from student.models import Booking, CourseRegistration
+from teacher.models import Lesson, Teacher
+
+ACTIVE_STATUSES = ("CON", "PENTE")
+MAX_SERIES_WEEKS = 52
+MAX_BULK_LESSONS = 200
+
+
+def expand_series(start_date, weekdays, at, weeks, tz):
+    """Aware starts on each of `weekdays` (ISO numbers, Monday is 1) at local time `at`, for `weeks` weeks."""
+    return [
+        timezone.make_aware(datetime.combine(day, at), tz)
+        for day in (start_date + timedelta(days=offset) for offset in range(weeks * 7))
+        if day.isoweekday() in weekdays
+    ]
+
+
+def find_conflicts(teacher_id, spans, statuses=ACTIVE_STATUSES):
+    """
+    {index in spans: code of an overlapping lesson} for (start, end) spans,
+    using one query over the whole series range and a sweep over both lists.
+    """
+    if not spans:
+        return {}
+    existing = Lesson.objects.filter(
+        teacher_id=teacher_id, status__in=statuses,
+        datetime__lt=max(end for _, end in spans), end_datetime__gt=min(start for start, _ in spans),
+    ).order_by("datetime").values_list("datetime", "end_datetime", "code")
+
+    conflicts = {}
+    existing = iter(existing)
+    upcoming = next(existing, None)
+    ongoing = []  # (end, code) of lessons starting before the current span ends
+    for index in sorted(range(len(spans)), key=lambda i: spans[i][0]):
+        start, end = spans[index]
+        while upcoming is not None and upcoming[0] < end:
+            heapq.heappush(ongoing, (upcoming[1], upcoming[2]))
+            upcoming = next(existing, None)
+        while ongoing and ongoing[0][0] <= start:
+            heapq.heappop(ongoing)
+        if ongoing:
+            conflicts[index] = ongoing[0][1]
+    return conflicts
+
+
+def unique_codes(model, count, length=12):
+    """`count` random codes not used by `model` yet, checked with one query per round."""
+    codes = set()
+    while len(codes) < count:
+        candidates = {model().generate_unique_code(length) for _ in range(count - len(codes))}
+        candidates -= set(model.objects.filter(code__in=candidates).values_list("code", flat=True))
+        codes |= candidates
+    return list(codes)
+
+
+def touch_rollups(lessons):
+    for school_id, day in {(lesson.school_id, lesson_day(lesson)) for lesson in lessons}:
+        mark_stale(school_id, day)
+
+
+@transaction.atomic
+def create_series(registration, student, teacher, starts, status="CON", skip_conflicts=False):
+    """
+    Create a lesson and a booking for each start. Returns (lessons, conflicts),
+    conflicts being [{"datetime", "lesson_code"}] per occurrence that overlaps
+    one of the teacher's lessons. Unless skip_conflicts, nothing is created
+    when any occurrence conflicts.
+    """
+    course = registration.course
+    spans = [(start, start + timedelta(minutes=course.duration)) for start in starts]
+
+    # Serialize series creation per teacher between the conflict check and the insert
+    Teacher.objects.select_for_update().filter(pk=teacher.pk).first()
+    found = find_conflicts(teacher.id, spans)
+    conflicts = [{"datetime": spans[index][0], "lesson_code": code} for index, code in sorted(found.items())]
+    if conflicts and not skip_conflicts:
+        return [], conflicts
+
+    free = [span for index, span in enumerate(spans) if index not in found]
+    lessons = Lesson.objects.bulk_create([
+        Lesson(
+            code=code, datetime=start, end_datetime=end, status=status, course=course,
+            teacher=teacher, school_id=course.school_id, number_of_client=1,
+        )
+        for code, (start, end) in zip(unique_codes(Lesson, len(free)), free)
+    ])
+    Booking.objects.bulk_create([
+        Booking(
+            code=code, lesson=lesson, school_id=course.school_id, student=student,
+            registration=registration, user_type="student", status="COM",
+        )
+        for code, lesson in zip(unique_codes(Booking, len(lessons)), lessons)
+    ])
+
+    for day, count in Counter(lesson_day(lesson) for lesson in lessons).items():
+        bump(course.school_id, day, lessons=count)
+        mark_stale(course.school_id, day)
+    return lessons, conflicts
+
+
+@transaction.atomic
+def reassign(school_id, from_teacher, to_teacher, start_date, end_date, registrations=False, skip_conflicts=False):
+    """
+    Move from_teacher's pending and confirmed lessons on the school's local days
+    start_date..end_date to to_teacher, and with `registrations` their active
+    registrations too. Returns (moved lessons, moved registrations, kept
+    registrations, conflicts), registrations as (uuid, student user id) pairs;
+    unless skip_conflicts, nothing moves when a lesson conflicts with one of
+    to_teacher's lessons. A registration still booked on a lesson left with
+    from_teacher stays with from_teacher and is reported as kept.
+    """
+    _, lower, upper = local_range(school_id, start_date, end_date)
+    lessons = list(Lesson.objects.select_for_update().filter(
+        school_id=school_id, teacher=from_teacher, status__in=ACTIVE_STATUSES,
+        datetime__gte=lower, datetime__lt=upper,
+    ).order_by("datetime"))
+
+    Teacher.objects.select_for_update().filter(pk=to_teacher.pk).first()
+    found = find_conflicts(to_teacher.id, [(lesson.datetime, lesson.end_datetime) for lesson in lessons])
+    conflicts = [
+        {"lesson_code": lessons[index].code, "datetime": lessons[index].datetime, "conflict_code": code}
+        for index, code in sorted(found.items())
+    ]
+    if conflicts and not skip_conflicts:
+        return [], [], [], conflicts
+
+    moved = [lesson for index, lesson in enumerate(lessons) if index not in found]
+    Lesson.objects.filter(pk__in=[lesson.pk for lesson in moved]).update(teacher=to_teacher)
+    for lesson in moved:
+        lesson.teacher = to_teacher
+
+    moved_registrations, kept_registrations = [], []
+    if registrations:
+        # Bookings on the lessons left with from_teacher, by registration or by student and course
+        left_behind = Booking.objects.filter(
+            lesson_id__in=[lessons[index].pk for index in found], status="COM",
+        ).filter(
+            Q(registration_id=OuterRef("pk")) | Q(student_id=OuterRef("student_id"), lesson__course_id=OuterRef("course_id")),
+        )
+        active = CourseRegistration.objects.select_for_update(of=("self",)).filter(
+            course__school_id=school_id, teacher=from_teacher, lessons_left__gt=0,
+        ).annotate(left_behind=Exists(left_behind)).values_list("id", "uuid", "student__user_id", "left_behind")
+        moving = []
+        for registration_id, uuid, user_id, kept in active:
+            if kept:
+                kept_registrations.append((uuid, user_id))
+            else:
+                moving.append(registration_id)
+                moved_registrations.append((uuid, user_id))
+        CourseRegistration.objects.filter(pk__in=moving).update(teacher=to_teacher)
+
+    # Rollups are kept per teacher
+    touch_rollups(moved)
+    return moved, moved_registrations, kept_registrations, conflicts
+
+
+@transaction.atomic
+def confirm_lessons(teacher_id, codes):
+    """
+    Confirm the teacher's pending lessons among `codes` with one guarded UPDATE.
+    Private lessons are re-checked against the teacher's confirmed lessons and
+    each other; group lessons never conflict. Returns (confirmed lessons,
+    skipped [{"lesson_code", "reason"}]).
+    """
+    pending = list(Lesson.objects.select_for_update().filter(
+        teacher_id=teacher_id, code__in=codes, status="PENTE",
+    ).select_related("course").order_by("datetime"))
+    skipped = [{"lesson_code": code, "reason": "Not a pending lesson."} for code in sorted(set(codes) - {lesson.code for lesson in pending})]
+
+    private = [lesson for lesson in pending if not lesson.course.is_group]
+    found = find_conflicts(teacher_id, [(lesson.datetime, lesson.end_datetime) for lesson in private], statuses=("CON",))
+    clashing = {private[index].pk: code for index, code in found.items()}
+
+    # Within the batch, an earlier lesson wins over a later one it overlaps
+    latest = None
+    for lesson in private:
+        if lesson.pk in clashing:
+            continue
+        if latest is not None and lesson.datetime < latest.end_datetime:
+            clashing[lesson.pk] = latest.code
+        elif latest is None or lesson.end_datetime > latest.end_datetime:
+            latest = lesson
+
+    confirmed = [lesson for lesson in pending if lesson.pk not in clashing]
+    skipped += [
+        {"lesson_code": lesson.code, "reason": f"Conflicts with lesson {clashing[lesson.pk]}."}
+        for lesson in pending if lesson.pk in clashing
+    ]
+    Lesson.objects.filter(pk__in=[lesson.pk for lesson in confirmed], status="PENTE").update(status="CON")
+    for lesson in confirmed:
+        lesson.status = "CON"
+    touch_rollups(confirmed)
+    return confirmed, skipped
+
+
+@transaction.atomic
+def cancel_lessons(teacher_id, codes):
+    """
+    Cancel the teacher's pending and confirmed lessons among `codes` with one
+    guarded UPDATE. Returns (canceled lessons, skipped [{"lesson_code", "reason"}]).
+    """
+    active = list(Lesson.objects.select_for_update().filter(
+        teacher_id=teacher_id, code__in=codes, status__in=ACTIVE_STATUSES,
+    ).order_by("datetime"))
+    skipped = [
+        {"lesson_code": code, "reason": "Not a pending or confirmed lesson."}
+        for code in sorted(set(codes) - {lesson.code for lesson in active})
+    ]
+
+    Lesson.objects.filter(pk__in=[lesson.pk for lesson in active], status__in=ACTIVE_STATUSES).update(status="CAN")
+    for lesson in active:
+        lesson.status = "CAN"
+    touch_rollups(active)
+    return active, skipped
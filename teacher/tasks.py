@@ -1,16 +1,21 @@
 from celery import shared_task
+from django.db import transaction
 from django.core.mail import send_mail
 from django.db.models import Prefetch
 from student.models import Lesson, Booking
 from datetime import timedelta
 from django.utils import timezone
 from pytz import timezone as ptimezone
-from utils.notification_utils import send_notification
+from utils.notification_utils import send_notification, send_bulk_notification, delete_google_calendar_event
+from core.models import User
+from utils import seats
 from celery_singleton import Singleton
 import pytz
 
 gmt7 = pytz.timezone('Asia/Bangkok')
 
+NOTIFICATION_BATCH = 500  # Users per queued notification task
+
 # Send Notifications
 @shared_task(base=Singleton)
 def send_lesson_notification():
@@ -56,3 +61,61 @@ def send_lesson_notification():
             
         Lesson.objects.bulk_update(upcoming_lessons, fields=["notified"])
     return len(upcoming_lessons)
+
+
+# Reset a group lesson's Redis seat counter from Postgres
+@shared_task(base=Singleton)
+def reconcile_lesson_seats(lesson_id):
+    lesson = Lesson.objects.select_related("course").filter(pk=lesson_id).first()
+    if lesson is None:
+        return None
+    return seats.reconcile(lesson)
+
+
+# Reset the Redis seat counters of upcoming group lessons that have one
+@shared_task(base=Singleton)
+def reconcile_group_seats():
+    lessons = Lesson.objects.select_related("course").filter(
+        course__is_group=True, course__group_size__isnull=False, status="CON", datetime__gte=timezone.now(),
+    ).order_by("id")
+    reconciled = 0
+    batch = []
+    for lesson in lessons.iterator(chunk_size=500):
+        batch.append(lesson)
+        if len(batch) == 500:
+            reconciled += reconcile_batch(batch)
+            batch = []
+    return reconciled + reconcile_batch(batch)
+
+
+def reconcile_batch(lessons):
+    live = seats.has_counter(lessons) if lessons else []
+    for lesson in live:
+        seats.reconcile(lesson)
+    return len(live)
+
+
+# Send one notification to a batch of users
+@shared_task
+def send_notifications(user_ids, title, body):
+    send_bulk_notification(user_ids, title, body)
+    return len(user_ids)
+
+
+# Delete a user's Google calendar events, e.g. after a bulk cancel
+@shared_task
+def delete_calendar_events(user_id, event_ids):
+    user = User.objects.filter(pk=user_id).first()
+    if user is None:
+        return 0
+    for event_id in event_ids:
+        delete_google_calendar_event(user, event_id)
+    return len(event_ids)
+
+
+def queue_notifications(user_ids, title, body):
+    """Queue a notification for many users in batches, once the current transaction commits."""
+    user_ids = sorted(set(user_ids))
+    for offset in range(0, len(user_ids), NOTIFICATION_BATCH):
+        batch = user_ids[offset:offset + NOTIFICATION_BATCH]
+        transaction.on_commit(lambda batch=batch: send_notifications.delay(batch, title, body))
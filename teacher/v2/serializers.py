@@ -6,6 +6,10 @@ import datetime
 from datetime import timedelta
 from dateutil.relativedelta import relativedelta
 from utils.notification_utils import send_notification
+from internal.fields import ZonedDateTimeField
+from internal.storage import media_url
+from school.config import get_school_timezone
+from teacher.services import MAX_SERIES_WEEKS, create_series, expand_series
 \
 class ListCourseSerializer(serializers.ModelSerializer):
     course_name = serializers.CharField(source='name')
@@ -216,6 +220,8 @@ class CreateCourseRegistrationSerializer(serializers.Serializer):
         return attrs
 
 class ListLessonSerializer(serializers.ModelSerializer):
+    datetime = ZonedDateTimeField()
+    end_datetime = ZonedDateTimeField()
     duration = serializers.IntegerField(source="course.duration")
     course_name = serializers.CharField(source="course.name")
     course_description = serializers.CharField(source="course.description")
@@ -227,7 +233,7 @@ class ListLessonSerializer(serializers.ModelSerializer):
 
     class Meta:
         model = Lesson
-        fields = ("datetime", "duration", "student_name", "student_email", "student_phone_number", "course_name", "course_description", "code", "status", "is_group", "profile_image")
+        fields = ("datetime", "end_datetime", "duration", "student_name", "student_email", "student_phone_number", "course_name", "course_description", "code", "status", "is_group", "profile_image")
 
     def get_student_name(self, obj):
         # Assuming `students` is a related_name for the reverse relationship
@@ -249,8 +255,7 @@ class ListLessonSerializer(serializers.ModelSerializer):
         # Assuming `students` is a related_name for the reverse relationship
         first_booking = obj.bookings[:1]
         if first_booking:
-            if first_booking[0].student.user.profile_image:
-                return first_booking[0].student.user.profile_image.url
+            return media_url(first_booking[0].student.user.profile_image, None)
         return None
 
     def get_student_phone_number(self, obj):
@@ -262,6 +267,7 @@ class ListLessonSerializer(serializers.ModelSerializer):
         return None
     
 class LessonDetailSerializer(serializers.ModelSerializer):
+    datetime = ZonedDateTimeField()
     duration = serializers.IntegerField(source="course.duration")
     description = serializers.CharField(source="course.description")
     location = serializers.CharField(source="course.school.location")
@@ -366,6 +372,72 @@ class CreateLessonSerializer(serializers.ModelSerializer):
 
         return lesson
 
+class CreateLessonSeriesSerializer(serializers.Serializer):
+    """A weekly series of private lessons, e.g. every Tue/Thu at 17:00 for 5 weeks."""
+    student_uuid = serializers.UUIDField(write_only=True)
+    registration_uuid = serializers.UUIDField(write_only=True)
+    teacher_uuid = serializers.UUIDField(write_only=True)
+    start_date = serializers.DateField()
+    time = serializers.TimeField()
+    weekdays = serializers.ListField(
+        child=serializers.IntegerField(min_value=1, max_value=7), allow_empty=False, max_length=7,
+    )
+    weeks = serializers.IntegerField(min_value=1, max_value=MAX_SERIES_WEEKS)
+    skip_conflicts = serializers.BooleanField(default=False)
+
+    def validate(self, data):
+        # Everything is looked up within the caller's school
+        school_id = self.context["school_id"]
+        errors = {}
+
+        # Validate Student
+        try:
+            data["student"] = Student.objects.select_related("user").get(user__uuid=data["student_uuid"], school=school_id)
+        except Student.DoesNotExist:
+            errors["student_uuid"] = "Student with this UUID does not exist."
+
+        # Validate Registration
+        try:
+            data["registration"] = CourseRegistration.objects.select_related("course").get(
+                uuid=data["registration_uuid"], course__school_id=school_id, student__user__uuid=data["student_uuid"],
+            )
+        except CourseRegistration.DoesNotExist:
+            errors["registration_uuid"] = "Registration with this UUID does not exist."
+
+        # Validate Teacher
+        try:
+            data["teacher"] = Teacher.objects.select_related("user").get(user__uuid=data["teacher_uuid"], school_id=school_id)
+        except Teacher.DoesNotExist:
+            errors["teacher_uuid"] = "Teacher with this UUID does not exist."
+
+        if errors:
+            raise serializers.ValidationError(errors)
+        registration = data["registration"]
+        if registration.course.is_group:
+            raise serializers.ValidationError({"registration_uuid": "Series are only for private courses."})
+
+        data["starts"] = expand_series(
+            data["start_date"], set(data["weekdays"]), data["time"], data["weeks"], get_school_timezone(school_id),
+        )
+        if registration.lessons_left < len(data["starts"]):
+            raise serializers.ValidationError(
+                {"registration_uuid": f"The registration has {registration.lessons_left} lessons left for {len(data['starts'])} in the series."}
+            )
+        return data
+
+    def create(self, validated_data):
+        lessons, conflicts = create_series(
+            validated_data["registration"], validated_data["student"], validated_data["teacher"], validated_data["starts"],
+            skip_conflicts=validated_data["skip_conflicts"],
+        )
+        return {"lessons": lessons, "conflicts": conflicts}
+
+    def to_representation(self, instance):
+        return {
+            "lessons": [{"code": lesson.code, "datetime": lesson.datetime} for lesson in instance["lessons"]],
+            "conflicts": instance["conflicts"],
+        }
+
 class ListBookingSerializer(serializers.ModelSerializer):
     duration = serializers.IntegerField(source="lesson.course.duration")
     course_name = serializers.CharField(source="lesson.course.name")
@@ -35,6 +35,9 @@ urlpatterns = [
 
     # Lesson endpoints
     path('lessons/', LessonViewset.as_view({'get': 'list', 'post': 'create'}), name='lesson-list'),
+    path('lessons/series', LessonViewset.as_view({'post': 'create_series'}), name='lesson-series'),
+    path('lessons/confirm', LessonViewset.as_view({'post': 'bulk_confirm'}), name='lesson-bulk-confirm'),
+    path('lessons/cancel', LessonViewset.as_view({'post': 'bulk_cancel'}), name='lesson-bulk-cancel'),
     path('lessons/<str:code>', LessonViewset.as_view({'get': 'retrieve'}), name='lesson-retrieve'),
 
     path('lessons/<str:code>/cancel/', LessonViewset.as_view({'put': 'cancel'}), name='lesson-cancel'),
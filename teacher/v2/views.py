@@ -1,6 +1,7 @@
 from django.shortcuts import get_object_or_404
 from django.core.exceptions import ValidationError
 from django.utils import timezone
+from django.db import transaction
 from django.db.utils import IntegrityError
 from django.db.models import Prefetch
 from rest_framework.permissions import IsAuthenticated
@@ -8,27 +9,30 @@ from rest_framework.viewsets import ViewSet
 from rest_framework.response import Response
 from rest_framework import status
 from datetime import timedelta, datetime
-import pytz
-from dateutil.parser import isoparse
 from teacher.models import Teacher, UnavailableTimeOneTime, AvailableTime
 from teacher.v2.serializers import (
     ListCourseSerializer, CourseDetailSerializer, CreateCourseSerializer,
     ListCourseRegistrationSerializer, SimpleListCourseRegistrationSerializer, CourseRegistrationDetailSerializer, CreateCourseRegistrationSerializer,
     ListStudentSerializer, ProfileSerializer,
-    LessonDetailSerializer, ListLessonSerializer, CreateLessonSerializer,
+    LessonDetailSerializer, ListLessonSerializer, CreateLessonSerializer, CreateLessonSeriesSerializer,
     ListBookingSerializer, 
     CreateUnavailableTimeOneTimeSerializer, 
     ListUnavailableTimeOneTimeSerializer
 )
 from student.models import Student, StudentTeacherRelation, CourseRegistration, Lesson, Booking
 from school.models import Course
+from school.config import get_school_timezone
+from internal.conditional import conditional_list, COURSES
+from internal.pagination import KeysetPagination
 from core.serializers import CreateUserSerializer
 from utils.notification_utils import send_notification, create_calendar_event, delete_google_calendar_event
 from internal.permissions import IsTeacher, IsManager
+from teacher import services as teacher_services
+from teacher.services import MAX_BULK_LESSONS
+from teacher.tasks import queue_notifications, delete_calendar_events
 from utils.schedule_utils import compute_available_time
 from rest_framework.decorators import api_view, permission_classes
 
-gmt7 = pytz.timezone('Asia/Bangkok')
 
 @api_view(['GET'])
 @permission_classes([IsAuthenticated, IsTeacher])
@@ -76,9 +80,10 @@ class CourseViewset(ViewSet):
             return [IsAuthenticated(), IsTeacher(), IsManager()]
         return [IsAuthenticated(), IsTeacher()]
     
+    @conditional_list(COURSES)
     def list(self, request):
         teacher_courses = Course.objects.filter(
-            school_id=request.user.teacher.school_id
+            school_id=request.principal.school_id
         )
         serializer = ListCourseSerializer(instance=teacher_courses, many=True)
         return Response(serializer.data)
@@ -168,7 +173,13 @@ class StudentViewSet(ViewSet):
     def list_bookings(self, request, uuid):
         # Get all bookings with optional student filter
         bookings = Booking.objects.select_related("lesson__course__school", "lesson__teacher").filter(student__user__uuid=uuid)
-        
+
+        # Page newest-first when the client asks for it
+        paginator = KeysetPagination("booked_datetime", descending=True)
+        if paginator.is_requested(request):
+            page = paginator.paginate_queryset(bookings, request)
+            return paginator.get_paginated_response(ListBookingSerializer(page, many=True).data)
+
         # Serialize the data (assuming a BookingSerializer exists)
         serializer = ListBookingSerializer(bookings, many=True)
         return Response(serializer.data, status=status.HTTP_200_OK)
@@ -197,6 +208,14 @@ class RegistrationViewset(ViewSet):
         if request.GET.get("has_lesson_left") == "true":
             filters["lessons_left__gt"] = 0
         registrations = CourseRegistration.objects.filter(**filters).select_related("course")
+
+        # Page newest-first when the client asks for it
+        paginator = KeysetPagination("registered_date", descending=True)
+        if paginator.is_requested(request):
+            page = paginator.paginate_queryset(registrations, request)
+            serializer = ListCourseRegistrationSerializer(instance=page, many=True)
+            return paginator.get_paginated_response(serializer.data)
+
         serializer = ListCourseRegistrationSerializer(instance=registrations, many=True)
         return Response(serializer.data)
 
@@ -259,7 +278,9 @@ class LessonViewset(ViewSet):
             except ValueError:
                 return Response({"error": "Invalid month or year"}, status=status.HTTP_400_BAD_REQUEST)
 
+        # Render in the school's local time unless bangkok_time=false
         is_bangkok_time = request.GET.get("bangkok_time", "true").lower() == "true"
+        render_timezone = get_school_timezone(request.principal.school_id) if is_bangkok_time else None
 
         lessons = Lesson.objects.prefetch_related(
             Prefetch(
@@ -269,15 +290,8 @@ class LessonViewset(ViewSet):
             )
         ).select_related("course").filter(**filters).order_by("datetime")
 
-        serializer = ListLessonSerializer(instance=lessons, many=True)
-        response_data = serializer.data
-        if is_bangkok_time:
-            for data in response_data:
-                dt = isoparse(data["datetime"])
-                bangkok_time = timezone.make_naive(dt).astimezone(gmt7)
-                data["datetime"] = bangkok_time.strftime('%Y-%m-%dT%H:%M:%SZ')
-                data["end_datetime"] = bangkok_time.strftime('%Y-%m-%dT%H:%M:%SZ')
-        return Response(response_data, status=status.HTTP_200_OK)
+        serializer = ListLessonSerializer(instance=lessons, many=True, context={"timezone": render_timezone})
+        return Response(serializer.data, status=status.HTTP_200_OK)
 
     def create(self, request):
         data = request.data.copy()
@@ -287,6 +301,20 @@ class LessonViewset(ViewSet):
             serializer.save()
             return Response(serializer.data, status=status.HTTP_201_CREATED)
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+    def create_series(self, request):
+        data = request.data.copy()
+        data["teacher_uuid"] = request.user.uuid
+        serializer = CreateLessonSeriesSerializer(data=data, context={"school_id": request.principal.school_id})
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+        series = serializer.save()
+        if not series["lessons"]:
+            return Response({"error": "The series conflicts with existing lessons.", **serializer.data}, status=status.HTTP_409_CONFLICT)
+        send_notification(serializer.validated_data["student"].user, "New Booking Alert",
+                          f"{request.user.first_name} has booked {len(series['lessons'])} classes with you. Check your schedule for details.")
+        return Response(serializer.data, status=status.HTTP_201_CREATED)
     
     def retrieve(self, request, code):
         filters = {
@@ -294,7 +322,9 @@ class LessonViewset(ViewSet):
             "code": code,  # Filter by the specific lesson code
         }
 
+        # Render in the school's local time unless bangkok_time=false
         is_bangkok_time = request.GET.get("bangkok_time", "true").lower() == "true"
+        render_timezone = get_school_timezone(request.principal.school_id) if is_bangkok_time else None
 
         lesson = get_object_or_404(
             Lesson.objects.prefetch_related(
@@ -307,15 +337,8 @@ class LessonViewset(ViewSet):
             **filters
         )
 
-        serializer = LessonDetailSerializer(instance=lesson)
-        response_data = serializer.data
-
-        if is_bangkok_time:
-            dt = isoparse(response_data["datetime"])
-            bangkok_time = timezone.make_naive(dt).astimezone(gmt7)
-            response_data["datetime"] = bangkok_time.strftime('%Y-%m-%dT%H:%M:%SZ')
-
-        return Response(response_data, status=status.HTTP_200_OK)
+        serializer = LessonDetailSerializer(instance=lesson, context={"timezone": render_timezone})
+        return Response(serializer.data, status=status.HTTP_200_OK)
     
     def cancel(self, request, code):
         lesson = get_object_or_404(
@@ -361,12 +384,51 @@ class LessonViewset(ViewSet):
             send_notification(booking.student.user, "Class Confirmed", f"{request.user.first_name} has confirmed your class. See you there!")
         return Response({"success": "Lesson confirmed successfully."}, status=status.HTTP_200_OK)
 
+    def lesson_codes(self, request):
+        codes = request.data.get("codes")
+        if not isinstance(codes, list) or not codes or not all(isinstance(code, str) for code in codes):
+            return None
+        return codes
+
+    def bulk_confirm(self, request):
+        codes = self.lesson_codes(request)
+        if codes is None:
+            return Response({"error": "codes must be a non-empty list of lesson codes."}, status=status.HTTP_400_BAD_REQUEST)
+        if len(codes) > MAX_BULK_LESSONS:
+            return Response({"error": f"At most {MAX_BULK_LESSONS} lessons per request."}, status=status.HTTP_400_BAD_REQUEST)
+
+        with transaction.atomic():
+            confirmed, skipped = teacher_services.confirm_lessons(request.principal.teacher_id, codes)
+            queue_notifications(
+                Booking.objects.filter(lesson__in=confirmed, student__isnull=False).values_list("student__user_id", flat=True),
+                "Class Confirmed", f"{request.user.first_name} has confirmed your class. See you there!",
+            )
+        return Response({"confirmed": [lesson.code for lesson in confirmed], "skipped": skipped}, status=status.HTTP_200_OK)
+
+    def bulk_cancel(self, request):
+        codes = self.lesson_codes(request)
+        if codes is None:
+            return Response({"error": "codes must be a non-empty list of lesson codes."}, status=status.HTTP_400_BAD_REQUEST)
+        if len(codes) > MAX_BULK_LESSONS:
+            return Response({"error": f"At most {MAX_BULK_LESSONS} lessons per request."}, status=status.HTTP_400_BAD_REQUEST)
+
+        with transaction.atomic():
+            canceled, skipped = teacher_services.cancel_lessons(request.principal.teacher_id, codes)
+            queue_notifications(
+                Booking.objects.filter(lesson__in=canceled, student__isnull=False).values_list("student__user_id", flat=True),
+                "Class Canceled", f"{request.user.first_name} has canceled your class. Please contact us for more information.",
+            )
+            event_ids = [lesson.teacher_event_id for lesson in canceled if lesson.teacher_event_id]
+            if event_ids:
+                transaction.on_commit(lambda: delete_calendar_events.delay(request.user.id, event_ids))
+        return Response({"canceled": [lesson.code for lesson in canceled], "skipped": skipped}, status=status.HTTP_200_OK)
+
 class UnavailableTimeViewSet(ViewSet):
     permission_classes = [IsAuthenticated, IsTeacher]
 
     def create_onetime(self, request):
         data = request.data.copy()
-        data["teacher"] = request.user.teacher.id
+        data["teacher"] = request.principal.teacher_id
         serializer = CreateUnavailableTimeOneTimeSerializer(data=data)
         if serializer.is_valid():
             serializer.save()
@@ -374,8 +436,7 @@ class UnavailableTimeViewSet(ViewSet):
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
     def list(self, request):
-        teacher = request.user.teacher
-        filters = {"teacher": teacher}
+        filters = {"teacher_id": request.principal.teacher_id}
 
         # Fetch unavailable times by month
         month = request.query_params.get("month")
@@ -399,6 +460,6 @@ class UnavailableTimeViewSet(ViewSet):
         }, status=status.HTTP_200_OK)
 
     def remove(self, request, code):
-        onetime_unavailable = get_object_or_404(UnavailableTimeOneTime, code=code, teacher=request.user.teacher)
+        onetime_unavailable = get_object_or_404(UnavailableTimeOneTime, code=code, teacher_id=request.principal.teacher_id)
         onetime_unavailable.delete()
         return Response(status=status.HTTP_204_NO_CONTENT)
\ No newline at end of file
@@ -1,30 +1,27 @@
-from school.models import School, SchoolSettings
+from school.config import SchoolConfig
+from internal.storage import media_url
 from teacher.models import Lesson
 from student.models import CourseRegistration
 from django.utils.timezone import now
 from utils.schedule_utils import compute_available_time
+from utils.hold import held_slots
 from typing import List
 from datetime import timedelta
 from collections import defaultdict
 import bisect
 
 
-def generate_upcoming_private(school: School, registrations: List[CourseRegistration]) -> List[dict]:
-    date_today = now().date()
+def generate_upcoming_private(config: SchoolConfig, registrations: List[CourseRegistration]) -> List[dict]:
+    current_time = now()
+    date_today = current_time.date()
 
-    # Fetch SchoolSettings (handle if missing)
-    try:
-        school_settings = school.settings  # One-to-One relation
-        days_ahead = school_settings.days_ahead
-        interval = school_settings.interval
-        max_capacity = school.facilities.first().capacity  # Default fallback
-    except SchoolSettings.DoesNotExist and AttributeError:
-        days_ahead = 21  # Default fallback
-        interval = 30  # Default fallback
-        max_capacity = 21
+    # Cached school settings (defaults already applied)
+    days_ahead = config.days_ahead
+    interval = config.interval
+    max_capacity = config.capacity
 
     # Fetch all existing lessons in the school
-    school_lessons = Lesson.objects.filter(course__school=school, datetime__gte=date_today)
+    school_lessons = Lesson.objects.filter(school_id=config.school_id, datetime__gte=date_today)
     
     # Track ongoing lessons per time slot and day
     ongoing_lessons_per_day = defaultdict(list)
@@ -43,6 +40,12 @@ def generate_upcoming_private(school: School, registrations: List[CourseRegistra
         available_times = teacher.cached_available_times  
         break_time = teacher.teacher_break
         new_lessons = []
+
+        # Slots other students are holding while they finish booking
+        held = held_slots(
+            config.school_id, teacher.id, current_time, current_time + timedelta(days=days_ahead + 1),
+            exclude=registration.student_id,
+        )
         for available_time in available_times:
             start = available_time.start
             stop = available_time.stop
@@ -66,19 +69,22 @@ def generate_upcoming_private(school: School, registrations: List[CourseRegistra
                             1 for l_start, l_end in existing_lessons if not (lesson_end <= l_start or lesson_start >= l_end)
                         )
                         
-                        if overlapping_count < max_capacity:
-                            new_lessons.append({'datetime': lesson_start})
+                        if overlapping_count >= max_capacity:
+                            continue
+                        if any(lesson_start < h_end and lesson_end > h_start for h_start, h_end in held):
+                            continue
+                        new_lessons.append({'datetime': lesson_start})
                                     
         generated_lessons.append({
             "course_name": course.name,
             "course_description": course.description,
             "registration_uuid": registration.uuid,
-            'instructor_picture': user.profile_image.url if user.profile_image else "",
+            'instructor_picture': media_url(user.profile_image),
             "instructor_name": user.get_full_name(),
             "instructor_phone_number": user.phone_number,
             "instructor_email": user.email,
             "lesson_duration": course.duration,
-            "location": school.location,
+            "location": config.location,
             "lessons": new_lessons
         })
 
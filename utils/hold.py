@@ -1,95 +1,132 @@
-from school.models import School, SchoolSettings
-from teacher.models import Lesson
-from student.models import CourseRegistration
-from django.utils.timezone import now
-from utils.schedule_utils import compute_available_time
-from typing import List
-from datetime import timedelta
-from collections import defaultdict
-import bisect
-
-def generate_upcoming_private(school: School, registrations: List[CourseRegistration]) -> List[dict]:
-    date_today = now().date()
-    
-    # Fetch SchoolSettings (handle if missing)
+"""
+Short-lived holds on private lesson slots.
+
+While a student finishes the booking flow, the slot they picked is held for
+HOLD_SECONDS so other students neither see it nor submit it. Each teacher has
+three Redis keys: a sorted set of holders scored by slot start, a sorted set
+of holders scored by expiry and a hash of slot ends. A student holds at most
+one slot per teacher, and live holds never overlap, so an overlap check only
+needs the closest hold starting before the slot ends: O(log n).
+
+Postgres stays the authority; Lesson.check_for_conflicts still runs on create.
+"""
+import logging
+import time
+from datetime import datetime, timezone
+from internal.cache import get_redis, school_key
+
+logger = logging.getLogger(__name__)
+
+HOLD_SECONDS = 5 * 60
+
+# KEYS: starts, expiries, ends. ARGV: now, start, end, holder, expires at, ttl
+HOLD = """
+local expired = redis.call('ZRANGEBYSCORE', KEYS[2], '-inf', ARGV[1])
+for _, holder in ipairs(expired) do
+    redis.call('ZREM', KEYS[1], holder)
+    redis.call('ZREM', KEYS[2], holder)
+    redis.call('HDEL', KEYS[3], holder)
+end
+local before = redis.call('ZREVRANGEBYSCORE', KEYS[1], '(' .. ARGV[3], '-inf', 'LIMIT', 0, 2)
+for _, holder in ipairs(before) do
+    if holder ~= ARGV[4] then
+        local held_end = redis.call('HGET', KEYS[3], holder)
+        if held_end and tonumber(held_end) > tonumber(ARGV[2]) then
+            return 0
+        end
+        break
+    end
+end
+redis.call('ZADD', KEYS[1], ARGV[2], ARGV[4])
+redis.call('ZADD', KEYS[2], ARGV[5], ARGV[4])
+redis.call('HSET', KEYS[3], ARGV[4], ARGV[3])
+for i = 1, 3 do
+    redis.call('EXPIRE', KEYS[i], ARGV[6])
+end
+return 1
+"""
+
+_scripts = {}
+
+
+class SlotHeld(Exception):
+    """Another student holds an overlapping slot of the teacher."""
+
+
+def hold_keys(school_id, teacher_id):
+    return [school_key(school_id, "holds", teacher_id, part) for part in ("starts", "expiries", "ends")]
+
+
+def hold_script():
+    client = get_redis()
+    if id(client) not in _scripts:
+        _scripts[id(client)] = client.register_script(HOLD)
+    return _scripts[id(client)]
+
+
+def hold_slot(school_id, teacher_id, start, end, holder):
+    """
+    Hold start..end of a teacher for `holder` (a student id), replacing that
+    student's previous hold on the teacher. Returns the expiry as a datetime,
+    or None when Redis is unavailable. Raises SlotHeld on overlap.
+    """
+    now = time.time()
+    expires_at = now + HOLD_SECONDS
+    try:
+        held = hold_script()(
+            keys=hold_keys(school_id, teacher_id),
+            args=[now, start.timestamp(), end.timestamp(), holder, expires_at, HOLD_SECONDS],
+        )
+    except Exception:
+        logger.warning("Slot holds unavailable for teacher %s", teacher_id, exc_info=True)
+        return None
+
+    if not held:
+        raise SlotHeld("This time slot is being booked by someone else.")
+    return datetime.fromtimestamp(expires_at, tz=timezone.utc)
+
+
+def held_slots(school_id, teacher_id, start, end, exclude=None):
+    """Live (start, end) holds of a teacher overlapping start..end, except those of `exclude`."""
+    starts_key, expiries_key, ends_key = hold_keys(school_id, teacher_id)
+    try:
+        pipe = get_redis().pipeline(transaction=False)
+        pipe.zrangebyscore(starts_key, "-inf", f"({end.timestamp()}", withscores=True)
+        pipe.zrangebyscore(expiries_key, time.time(), "+inf")
+        pipe.hgetall(ends_key)
+        starts, live, ends = pipe.execute()
+    except Exception:
+        logger.warning("Slot holds unavailable for teacher %s", teacher_id, exc_info=True)
+        return []
+
+    live = set(live)
+    exclude = None if exclude is None else str(exclude).encode()
+    slots = []
+    for holder, slot_start in starts:
+        if holder not in live or holder == exclude or holder not in ends:
+            continue
+        slot_end = float(ends[holder])
+        if slot_end > start.timestamp():
+            slots.append((
+                datetime.fromtimestamp(slot_start, tz=timezone.utc),
+                datetime.fromtimestamp(slot_end, tz=timezone.utc),
+            ))
+    return slots
+
+
+def is_held(school_id, teacher_id, start, end, holder):
+    """Whether another student holds a slot of the teacher overlapping start..end."""
+    return bool(held_slots(school_id, teacher_id, start, end, exclude=holder))
+
+
+def release_slot(school_id, teacher_id, holder):
+    """Drop a student's hold on a teacher, e.g. once the booking has consumed it."""
+    starts_key, expiries_key, ends_key = hold_keys(school_id, teacher_id)
     try:
-        school_settings = school.settings  # One-to-One relation
-        days_ahead = school_settings.days_ahead
-        interval = school_settings.interval
-        max_capacity = school.facilities.first().capacity  # Default fallback
-    except:
-        days_ahead = 21  # Default fallback
-        interval = 30  # Default fallback
-        max_capacity = 21
-    
-    # Fetch all existing lessons in the school
-    school_lessons = Lesson.objects.filter(course__school=school, datetime__gte=date_today)
-    
-    # Track ongoing lessons per time slot and day
-    ongoing_lessons_per_day = defaultdict(list)
-    for lesson in school_lessons:
-        bisect.insort(ongoing_lessons_per_day[lesson.datetime.date()], (lesson.datetime.time(), lesson.end_datetime.time()))
-    
-    generated_lessons = []
-    for registration in registrations:
-        teacher = registration.cached_teacher  # No need to filter teachers separately
-        user = teacher.user
-        course = registration.course
-        
-        # Cached values to reduce DB calls
-        unavailables = teacher.cached_unavailables
-        lessons = teacher.cached_lessons
-        available_times = teacher.cached_available_times  
-        break_time = teacher.teacher_break
-        new_lessons = []
-        
-        for available_time in available_times:
-            start = available_time.start
-            stop = available_time.stop
-            day_of_week = int(available_time.day)
-            
-            for day_offset in range(days_ahead):
-                current_date = date_today + timedelta(days=day_offset)
-                if current_date.isoweekday() == day_of_week:
-                    
-                    # Get fully booked time slots
-                    full_slots = set()
-                    existing_lessons = ongoing_lessons_per_day[current_date]
-                    
-                    for lesson_start, lesson_end in existing_lessons:
-                        if lesson_start < stop and lesson_end > start:
-                            full_slots.add((lesson_start, lesson_end))
-                    
-                    unavailables = list(unavailables)
-                    unavailables.extend(list(full_slots))
-                    available_slots = compute_available_time(
-                        unavailables, lessons, current_date, start, stop, course.duration, interval, break_time
-                    )
-                    
-                    for slot in available_slots:
-                        lesson_start = slot['start']
-                        lesson_end = lesson_start + timedelta(minutes=course.duration)
-                        
-                        # Skip if the facility has reached its max capacity for overlapping slots
-                        overlapping_count = sum(
-                            1 for l_start, l_end in existing_lessons if not (lesson_end <= l_start or lesson_start >= l_end)
-                        )
-                        
-                        if overlapping_count < max_capacity:
-                            new_lessons.append({'datetime': lesson_start})
-                            bisect.insort(ongoing_lessons_per_day[current_date], (lesson_start, lesson_end))
-
-        generated_lessons.append({
-            "course_name": course.name,
-            "course_description": course.description,
-            "registration_uuid": registration.uuid,
-            'instructor_picture': user.profile_image.url if user.profile_image else "",
-            "instructor_name": user.get_full_name(),
-            "instructor_phone_number": user.phone_number,
-            "instructor_email": user.email,
-            "lesson_duration": course.duration,
-            "location": school.location,
-            "lessons": new_lessons
-        })
-    
-    return generated_lessons
+        pipe = get_redis().pipeline(transaction=True)
+        pipe.zrem(starts_key, holder)
+        pipe.zrem(expiries_key, holder)
+        pipe.hdel(ends_key, holder)
+        pipe.execute()
+    except Exception:
+        logger.warning("Slot hold release failed for teacher %s", teacher_id, exc_info=True)
@@ -132,6 +132,19 @@ def send_notification(user_id, title, body):
         )
 
 
+def send_bulk_notification(user_ids, title, body):
+    """Send one notification to the devices of many users in a single FCM batch."""
+    devices = FCMDevice.objects.filter(user_id__in=user_ids)
+    devices.send_message(
+            message=Message(
+                notification=Notification(
+                    title=title,
+                    body=body
+                ),
+            ),
+        )
+
+
 def send_cancellation_email_html(student_name, tutor_name, lesson_date, lesson_time, duration, mode, student_email):
     # Prepare the email subject
     email_subject = f"Lesson Cancellation : {tutor_name}"
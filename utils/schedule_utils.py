@@ -93,4 +93,34 @@ def generate_unique_code(existing_codes, length=8):
         if code not in existing_codes:
             existing_codes.add(code)  # Append new code to prevent duplicates
             return code
-    
\ No newline at end of file
+    
+def minute_of_day(value):
+    return value.hour * 60 + value.minute
+
+
+def merge_intervals(intervals):
+    """Union of (start, stop) pairs as sorted, non-overlapping pairs."""
+    merged = []
+    for start, stop in sorted(intervals):
+        if merged and start <= merged[-1][1]:
+            merged[-1] = (merged[-1][0], max(merged[-1][1], stop))
+        elif start < stop:
+            merged.append((start, stop))
+    return merged
+
+
+def subtract_intervals(intervals, cuts):
+    """Parts of `intervals` not covered by any of `cuts`; both are (start, stop) pairs."""
+    remaining = merge_intervals(intervals)
+    for cut_start, cut_stop in merge_intervals(cuts):
+        pieces = []
+        for start, stop in remaining:
+            if cut_stop <= start or stop <= cut_start:
+                pieces.append((start, stop))
+                continue
+            if start < cut_start:
+                pieces.append((start, cut_start))
+            if cut_stop < stop:
+                pieces.append((cut_stop, stop))
+        remaining = pieces
+    return remaining
@@ -0,0 +1,163 @@
+"""
+Redis seat gate for group lessons.
+
+Each group lesson has a counter of free seats and a sorted set of pending
+holds scored by expiry. A Lua script admits or rejects a booking attempt in
+O(1) before Postgres is touched; the guarded UPDATE in student.services stays
+the authority and confirms the seat. Expired holds give their seat back on
+the next attempt, and reconcile() resets the counter from Postgres. A counter
+that says full while Postgres has room is reseeded on the spot, and live
+counters are reconciled periodically.
+"""
+import logging
+import time
+import uuid
+from internal.cache import get_redis, school_key
+
+logger = logging.getLogger(__name__)
+
+HOLD_SECONDS = 30  # Long enough for the Postgres confirm step
+KEY_SLACK_SECONDS = 60 * 60 * 24  # Keys outlive the lesson start by a day
+
+# KEYS: free seats, holds. ARGV: now, hold expiry, token, key ttl
+ACQUIRE = """
+if redis.call('EXISTS', KEYS[1]) == 0 then
+    return -1
+end
+local expired = redis.call('ZREMRANGEBYSCORE', KEYS[2], '-inf', ARGV[1])
+if expired > 0 then
+    redis.call('INCRBY', KEYS[1], expired)
+end
+if tonumber(redis.call('GET', KEYS[1])) <= 0 then
+    return 0
+end
+redis.call('DECR', KEYS[1])
+redis.call('ZADD', KEYS[2], ARGV[2], ARGV[3])
+redis.call('EXPIRE', KEYS[1], ARGV[4])
+redis.call('EXPIRE', KEYS[2], ARGV[4])
+return 1
+"""
+
+# KEYS: free seats, holds. ARGV: token. Gives the seat back if the hold was still pending.
+RELEASE = """
+if redis.call('ZREM', KEYS[2], ARGV[1]) == 1 and redis.call('EXISTS', KEYS[1]) == 1 then
+    redis.call('INCR', KEYS[1])
+    return 1
+end
+return 0
+"""
+
+# KEYS: free seats, holds. ARGV: free seats in Postgres, now, key ttl
+RECONCILE = """
+redis.call('ZREMRANGEBYSCORE', KEYS[2], '-inf', ARGV[2])
+local free = tonumber(ARGV[1]) - redis.call('ZCARD', KEYS[2])
+if free < 0 then
+    free = 0
+end
+redis.call('SET', KEYS[1], free, 'EX', ARGV[3])
+return free
+"""
+
+_scripts = {}
+
+
+class SeatsUnavailable(Exception):
+    """The lesson has no free seat left."""
+
+
+def script(source):
+    client = get_redis()
+    key = (id(client), source)
+    if key not in _scripts:
+        _scripts[key] = client.register_script(source)
+    return _scripts[key]
+
+
+def seat_keys(lesson):
+    return [school_key(lesson.school_id, "seats", lesson.id), school_key(lesson.school_id, "seats", lesson.id, "holds")]
+
+
+def key_ttl(lesson):
+    return max(int(lesson.datetime.timestamp() - time.time()), 0) + KEY_SLACK_SECONDS
+
+
+def free_seats(lesson):
+    """Free seats according to Postgres."""
+    return max(lesson.course.group_size - lesson.number_of_client, 0)
+
+
+def acquire(lesson):
+    """
+    Hold a seat of a group lesson and return the hold token. Raises
+    SeatsUnavailable when the lesson is full; returns None when there is no
+    gate for the lesson (no group size, or Redis is down), leaving the
+    decision to Postgres.
+    """
+    if lesson.course.group_size is None:
+        return None
+
+    token = uuid.uuid4().hex
+    keys = seat_keys(lesson)
+    now = time.time()
+    args = [now, now + HOLD_SECONDS, token, key_ttl(lesson)]
+    try:
+        admitted = script(ACQUIRE)(keys=keys, args=args)
+        if admitted == -1:
+            # First attempt since the counter expired: seed it from Postgres
+            reconcile(lesson)
+            admitted = script(ACQUIRE)(keys=keys, args=args)
+    except Exception:
+        logger.warning("Seat gate unavailable for lesson %s", lesson.id, exc_info=True)
+        return None
+
+    if admitted == 0:
+        # A reconcile racing a booking between its commit and its confirm counts
+        # that seat twice; when Postgres still has room, reseed and retry once
+        lesson.refresh_from_db(fields=["number_of_client"])
+        if free_seats(lesson) > 0:
+            try:
+                reconcile(lesson)
+                admitted = script(ACQUIRE)(keys=keys, args=args)
+            except Exception:
+                logger.warning("Seat gate unavailable for lesson %s", lesson.id, exc_info=True)
+                return None
+
+    if admitted != 1:
+        raise SeatsUnavailable("This lesson has reached the maximum number of clients.")
+    return token
+
+
+def confirm(lesson, token):
+    """The seat is now counted in Postgres: drop the hold without giving the seat back."""
+    if token is None:
+        return
+    try:
+        get_redis().zrem(seat_keys(lesson)[1], token)
+    except Exception:
+        logger.warning("Seat confirm failed for lesson %s", lesson.id, exc_info=True)
+
+
+def release(lesson, token):
+    """The booking failed: give the held seat back."""
+    if token is None:
+        return
+    try:
+        script(RELEASE)(keys=seat_keys(lesson), args=[token])
+    except Exception:
+        logger.warning("Seat release failed for lesson %s", lesson.id, exc_info=True)
+
+
+def has_counter(lessons):
+    """The lessons among `lessons` whose seat counter is live in Redis, in one round trip."""
+    lessons = list(lessons)
+    pipe = get_redis().pipeline(transaction=False)
+    for lesson in lessons:
+        pipe.exists(seat_keys(lesson)[0])
+    return [lesson for lesson, exists in zip(lessons, pipe.execute()) if exists]
+
+
+def reconcile(lesson):
+    """Reset the free-seat counter from Postgres, keeping the holds still pending."""
+    if lesson.course.group_size is None:
+        return None
+    return script(RECONCILE)(keys=seat_keys(lesson), args=[free_seats(lesson), time.time(), key_ttl(lesson)])